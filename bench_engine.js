@@ -0,0 +1,350 @@
+// Headless driver for the engine cases of benchmark.py. Loads the compiled
+// grid script and static/seating_engine.js into node's global scope, as a
+// worker would, with a canvas that draws nothing, then times the deployed
+// searches, walker updates and run loop. The spec arrives as JSON on stdin:
+//   { grid, session, pairs, seeds, walkers, walkerRepeats, forecastSeeds, forecastRepeats,
+//     seatOrderSeeds, repairSeeds, blockEvery, plannerPairs, conflictSeeds }
+// and the results leave as JSON on stdout: per-call durations in
+// nanoseconds plus the cells each search expanded and how each run ended.
+// seatOrderSeeds, if given, also returns the seats a run and a forecast
+// hand out for each seed, and repairSeeds checks every repaired route
+// against a fresh search while cells get blocked; plannerPairs compares
+// planner and exact costs on a large grid, and conflictSeeds lists the
+// cells two walkers share in cooperative runs. A zero count or an empty
+// seed list skips that part.
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+
+const spec = JSON.parse(fs.readFileSync(0, 'utf8'));
+
+const pixels = { data: new Uint8ClampedArray(16), addColorStop() {} };
+const context = new Proxy({}, {
+    get: (target, key) => (key in target ? target[key] : () => pixels),
+    set: (target, key, value) => { target[key] = value; return true; }
+});
+globalThis.self = globalThis;
+globalThis.OffscreenCanvas = function (width, height) {
+    this.width = width;
+    this.height = height;
+    this.getContext = () => context;
+};
+globalThis.Path2D = function () { this.moveTo = this.lineTo = () => {}; };
+// Runs are stepped from here, never from a frame callback
+globalThis.requestAnimationFrame = () => 0;
+globalThis.cancelAnimationFrame = () => {};
+self.SEATING_SESSION = spec.session;
+
+vm.runInThisContext(spec.grid);
+vm.runInThisContext(fs.readFileSync(path.join(__dirname, 'static', 'seating_engine.js'), 'utf8'));
+
+let outcome = null;
+globalThis.recordOutcome = (value) => { outcome = value; };
+
+const engine = vm.runInThisContext(`({
+    setup() {
+        host = { progress() {}, time() {}, ended: recordOutcome, metrics() {}, replay() {}, congestion() {}, forecast() {} };
+        attachCanvas(new OffscreenCanvas(CONFIG.cols * CONFIG.cellSize, CONFIG.rows * CONFIG.cellSize + CONFIG.renderOffsetY));
+    },
+    entrances: () => ENTRANCES,
+    seats: () => seats,
+    // Cell path between two cells: A* on small grids, the cluster planner on large ones
+    search: (startX, startY, endX, endY) => (planner || pathEngine).search(startX, startY, endX, endY),
+    lastExpanded: () => (planner || pathEngine).lastExpanded,
+    countSearches(counter) { profiler.countSearch = counter; },
+    startRun,
+    stopRun,
+    step: () => simStep(CONFIG.fixedStep),
+    checkEndConditions,
+    simTime: () => simTime,
+    forecastFill,
+    // Active walkers whose route beyond their waypoint runs through cell,
+    // and whether each already keeps a RouteSearch to repair in place
+    crossing: cell => Array.from(students.active.subarray(0, students.activeCount))
+        .filter(id => routeLoad[cell] > 0 && routeCrosses(id, cell))
+        .map(id => [id, students.routeSearch[id] !== -1]),
+    // Cost of the walker's route from its waypoint, and of a fresh A* search
+    routeCosts(id) {
+        const store = students;
+        const seat = seats[store.seat[id]];
+        const start = routeWaypoint(id);
+        const end = store.pathStart[id] + store.pathLength[id];
+        let route = 0;
+        for (let k = store.pathStart[id] + routeWaypointIndex(id) + 1; k < end; k++) {
+            route += pathEngine.cost[store.pathBuffer[k]];
+        }
+        const fresh = pathEngine.search(start % CONFIG.cols, (start / CONFIG.cols) | 0, seat.x, seat.y)
+            .reduce((sum, i) => sum + pathEngine.cost[i], 0);
+        return [route, fresh];
+    },
+    // An aisle cell on the longest remaining route, halfway along it, or -1
+    blockTarget() {
+        const store = students;
+        let best = -1;
+        let bestLength = 0;
+        for (let k = 0; k < store.activeCount; k++) {
+            const id = store.active[k];
+            const length = store.pathLength[id] - routeWaypointIndex(id) - 1;
+            if (length > bestLength) {
+                best = id;
+                bestLength = length;
+            }
+        }
+        if (best === -1) return -1;
+        const cell = store.pathBuffer[store.pathStart[best] + routeWaypointIndex(best) + (bestLength >> 1)];
+        return pathEngine.type[cell] === CELL_AISLE ? cell : -1;
+    },
+    // Cost the planner reports for a query, what its path adds up to, and
+    // the exact A* cost
+    plannerCosts(startX, startY, endX, endY) {
+        const sum = cells => cells.reduce((total, i) => total + pathEngine.cost[i], 0);
+        const cells = planner.search(startX, startY, endX, endY);
+        return [planner.lastCost, sum(cells), sum(pathEngine.search(startX, startY, endX, endY))];
+    },
+    occupy: k => markSeatOccupied(seats[k].node),
+    // n walkers on their routes to seats 0..n-1, spread over the hall
+    scatter(n, random) {
+        const store = students;
+        for (let k = 0; k < n; k++) {
+            const id = placeStudent(k, k % ENTRANCES.length);
+            addRoute(id);
+            store.x[id] = random() * CONFIG.cols * CONFIG.cellSize;
+            store.y[id] = CONFIG.renderOffsetY + random() * CONFIG.rows * CONFIG.cellSize;
+            store.gridX[id] = pixelToGridX(store.x[id]);
+            store.gridY[id] = pixelToGridY(store.y[id]);
+            store.state[id] = STUDENT_MOVING;
+        }
+    },
+    // One tick of walking and avoidance, without spawning
+    update() {
+        walkerHash.rebuild(students);
+        for (let k = students.activeCount - 1; k >= 0; k--) updateStudent(students.active[k], CONFIG.fixedStep);
+    },
+    // [id, cell] per walker for the cell it holds, as planWindow reserves
+    // them: the one it stands on, or from departure the one it steps into
+    walkerCells() {
+        const store = students;
+        const cells = [];
+        for (let k = 0; k < store.activeCount; k++) {
+            const id = store.active[k];
+            const i = store.pathStart[id] + store.pathIndex[id];
+            const moving = store.pathIndex[id] < store.scheduleEnd[id] && simTick > store.pathDepart[i];
+            cells.push([id, moving ? store.pathBuffer[i] : store.gridY[id] * CONFIG.cols + store.gridX[id]]);
+        }
+        return cells;
+    },
+    // Doors and seats, where walkers may share a cell
+    shared() {
+        const cells = new Set(LAYOUT.seats);
+        ENTRANCES.forEach(e => cells.add(e.y * CONFIG.cols + e.x));
+        return cells;
+    },
+    // Raise cell to a wall's cost, as markSeatOccupied does for a seat
+    block(cell) {
+        pathEngine.cost[cell] = CELL_COSTS[CELL_WALL];
+        entranceFields.forEach(field => field.cellChanged(cell));
+        if (planner) planner.cellChanged(cell);
+        repairRoutes(cell);
+    }
+})`);
+
+const now = () => process.hrtime.bigint();
+
+// Seats in the order chooseArrival hands them out while fn runs
+function seatOrder(fn) {
+    const choose = globalThis.chooseArrival;
+    const order = [];
+    globalThis.chooseArrival = () => {
+        const arrival = choose();
+        order.push(arrival.seat.index);
+        return arrival;
+    };
+    try {
+        fn();
+    } finally {
+        globalThis.chooseArrival = choose;
+    }
+    return order;
+}
+
+// mulberry32, so the pairs depend only on the seed and not on the engine's rng
+function pairRng(seed) {
+    let a = seed >>> 0;
+    return () => {
+        a = (a + 0x6D2B79F5) >>> 0;
+        let t = a;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+function benchSearch(pairs) {
+    const random = pairRng(0);
+    const entrances = engine.entrances();
+    const seats = engine.seats();
+    const samples = [];
+    let expanded = 0;
+    for (let k = 0; k < pairs; k++) {
+        const e = entrances[Math.floor(random() * entrances.length)];
+        const seat = seats[Math.floor(random() * seats.length)];
+        const start = now();
+        engine.search(e.x, e.y, seat.x, seat.y);
+        samples.push(Number(now() - start));
+        expanded += engine.lastExpanded();
+    }
+    return { samples, expanded, searches: pairs };
+}
+
+// One updateStudent pass over n walkers spread over the hall, as
+// benchmark.py's avoidance case times the headless separation pass
+function benchAvoidance(counts, repeats) {
+    const results = {};
+    for (const n of counts) {
+        if (n > engine.seats().length) throw new Error(`${n} walkers need at least ${n} seats`);
+        engine.startRun(0);
+        engine.scatter(n, pairRng(n));
+        for (let k = 0; k < 5; k++) engine.update(); // Warm up the JIT
+        const samples = [];
+        for (let k = 0; k < repeats; k++) {
+            const start = now();
+            engine.update();
+            samples.push(Number(now() - start));
+        }
+        engine.stopRun();
+        results[n] = samples;
+    }
+    return results;
+}
+
+// Whole runs, one simStep at a time; the engine's own search counter
+// collects what placing, repairing and replanning walkers expanded
+function benchSimStep(seeds) {
+    const samples = [];
+    const fillTimes = [];
+    const outcomes = [];
+    let expanded = 0;
+    let searches = 0;
+    engine.countSearches(cells => { searches++; expanded += cells; });
+    for (const seed of seeds) {
+        engine.startRun(seed);
+        let done = false;
+        while (!done) {
+            const start = now();
+            engine.step();
+            samples.push(Number(now() - start));
+            const seconds = engine.simTime();
+            done = engine.checkEndConditions();
+            if (done) fillTimes.push(Math.round(seconds * 1000) / 1000);
+        }
+        outcomes.push(outcome);
+    }
+    return { samples, expanded, searches, fillTimes, outcomes };
+}
+
+function benchForecast(seeds, repeats) {
+    engine.forecastFill(seeds); // Builds the forecast fields once
+    const samples = [];
+    let result = null;
+    for (let k = 0; k < repeats; k++) {
+        const start = now();
+        result = engine.forecastFill(seeds);
+        samples.push(Number(now() - start) / seeds.length);
+    }
+    return { samples, fillTimes: result.seconds.map(s => (s === null ? null : Math.round(s * 1000) / 1000)) };
+}
+
+// All runs go first, so every forecast but the last seed's follows a run
+// of another seed; one that leans on state left over from it diverges
+function benchSeatOrder(seeds) {
+    const runs = seeds.map(seed => seatOrder(() => {
+        engine.startRun(seed);
+        do engine.step(); while (!engine.checkEndConditions());
+    }));
+    return seeds.map((seed, k) => ({ run: runs[k], forecast: seatOrder(() => engine.forecastFill([seed])) }));
+}
+
+// Whole runs that also block an aisle cell every blockEvery ticks; after
+// every repair, each walker whose route crossed the changed cell reports
+// its new route's cost beside a fresh search's, seat changes included
+function checkRepairs(seeds, blockEvery) {
+    const repair = globalThis.repairRoutes;
+    const costs = [];
+    globalThis.repairRoutes = (cell) => {
+        const crossed = engine.crossing(cell);
+        repair(cell);
+        for (const [id, kept] of crossed) costs.push([...engine.routeCosts(id), kept]);
+    };
+    const outcomes = [];
+    try {
+        for (const seed of seeds) {
+            engine.startRun(seed);
+            let ticks = 0;
+            do {
+                engine.step();
+                if (++ticks % blockEvery === 0) {
+                    const cell = engine.blockTarget();
+                    if (cell !== -1) engine.block(cell);
+                }
+            } while (!engine.checkEndConditions());
+            outcomes.push(outcome);
+        }
+    } finally {
+        globalThis.repairRoutes = repair;
+    }
+    return { costs, outcomes };
+}
+
+// Entrance-to-seat queries on a planner grid, asked once in the empty hall
+// and again after every other seat filled: per query the planner's cost,
+// its path's cost and the exact cost. Leaves the hall half full.
+function checkPlanner(pairs) {
+    const random = pairRng(1);
+    const entrances = engine.entrances();
+    const seats = engine.seats();
+    const queries = [];
+    for (let k = 0; k < pairs; k++) {
+        const e = entrances[Math.floor(random() * entrances.length)];
+        const seat = seats[Math.floor(random() * seats.length)];
+        queries.push([e.x, e.y, seat.x, seat.y]);
+    }
+    const empty = queries.map(q => engine.plannerCosts(...q));
+    for (let k = 0; k < seats.length; k += 2) engine.occupy(k);
+    return { empty, halfFull: queries.map(q => engine.plannerCosts(...q)) };
+}
+
+// Whole cooperative runs that look after every tick for two walkers on the
+// same cell outside doors and seats; returns each clash as [tick, cell, a, b]
+function checkConflicts(seeds) {
+    const shared = engine.shared();
+    const conflicts = [];
+    const outcomes = [];
+    for (const seed of seeds) {
+        engine.startRun(seed);
+        let ticks = 0;
+        do {
+            engine.step();
+            ticks++;
+            const holder = new Map();
+            for (const [id, cell] of engine.walkerCells()) {
+                if (shared.has(cell)) continue;
+                if (holder.has(cell)) conflicts.push([ticks, cell, holder.get(cell), id]);
+                holder.set(cell, id);
+            }
+        } while (!engine.checkEndConditions());
+        outcomes.push(outcome);
+    }
+    return { conflicts, outcomes };
+}
+
+engine.setup();
+const results = {};
+if (spec.pairs > 0) results.search = benchSearch(spec.pairs);
+if (spec.seeds.length > 0) results.simStep = benchSimStep(spec.seeds);
+if (spec.walkers) results.avoidance = benchAvoidance(spec.walkers, spec.walkerRepeats);
+if (spec.forecastRepeats > 0) results.forecastFill = benchForecast(spec.forecastSeeds, spec.forecastRepeats);
+if (spec.seatOrderSeeds) results.seatOrders = benchSeatOrder(spec.seatOrderSeeds);
+if (spec.repairSeeds) results.repairs = checkRepairs(spec.repairSeeds, spec.blockEvery);
+if (spec.plannerPairs > 0) results.planner = checkPlanner(spec.plannerPairs);
+if (spec.conflictSeeds) results.conflicts = checkConflicts(spec.conflictSeeds);
+process.stdout.write(JSON.stringify(results));
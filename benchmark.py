@@ -0,0 +1,308 @@
+"""Offline performance benchmarks for the seating engine.
+
+Most cases run against the headless port in ``simulation.py``, which shares
+the browser engine's algorithms (cost fields, bucketed avoidance, seat
+pools), so no browser or network access is needed. The ``engine`` case runs
+the deployed ``static/seating_engine.js`` itself under node (through
+``bench_engine.js``): entrance-to-seat searches (A* on small halls, the
+cluster planner on large ones), ``simStep`` over whole runs, with and
+without cooperative planning, one ``updateStudent`` pass over as many
+walkers as the avoidance case, and ``forecastFill``. Every seeded run must
+fill its hall. It is skipped when node is not installed.
+Each case reports timing percentiles; searches also report cells expanded
+per search, and fills report their simulated fill time, which is
+deterministic for a fixed seed.
+
+    python benchmark.py                  # run and compare with the baseline
+    python benchmark.py --save-baseline  # record the current results
+    python benchmark.py --only fill      # run a subset of the cases
+
+A case regresses when a deterministic count (cells expanded, seats, fill
+time) differs from the baseline. Timings depend on the machine the baseline
+was recorded on, so they are only gated with ``--timings``, after
+``--save-baseline`` on the same hardware; a case then also regresses when
+its median time exceeds the baseline by more than ``--tolerance``.
+
+    python benchmark.py --save-baseline && python benchmark.py --timings
+"""
+
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from layout import LAYOUT_FIELDS, compile_layout
+from simulation import MOVING, SimConfig, Simulation, simulate_many
+
+BASELINE_PATH = Path(__file__).with_name('bench_baseline.json')
+ENGINE_DRIVER = Path(__file__).with_name('bench_engine.js')
+
+FILL_SEEDS = (0, 1, 2)
+BATCH_SEEDS = range(64)
+WALKER_COUNTS = (50, 500, 5000)
+# Median slowdowns smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.01
+
+
+def hall_config(cols, rows, seat_total=10 ** 6):
+    """Large multi-block hall: 8-seat blocks with 2-cell aisles and a cross aisle every 12 rows."""
+    blocks = tuple((x, x + 7) for x in range(2, cols - 9, 10))
+    return SimConfig(
+        cols=cols,
+        rows=rows,
+        seat_total=seat_total,
+        seat_blocks=blocks,
+        aisle_rows=tuple(range(14, rows - 4, 12)),
+        entrances=((1, rows - 1), (cols // 2, rows - 1), (cols - 2, rows - 1)),
+    )
+
+
+def page_layout(config):
+    """Page layout dict of a ``SimConfig``, the inverse of ``layout.layout_config``."""
+    layout = {key: getattr(config, field) for key, field in LAYOUT_FIELDS.items()}
+    layout['seatBlocks'] = [list(block) for block in config.seat_blocks]
+    layout['aisleRows'] = list(config.aisle_rows)
+    layout['entrances'] = [{'x': x, 'y': y} for x, y in config.entrances]
+    return layout
+
+
+def summarize(samples_ns, **extra):
+    """Percentiles of per-operation durations, in milliseconds."""
+    ms = np.asarray(samples_ns, dtype=float) / 1e6
+    stats = {
+        'count': int(len(ms)),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p90_ms': float(np.percentile(ms, 90)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'mean_ms': float(ms.mean()),
+    }
+    stats.update(extra)
+    return stats
+
+
+def timed(fn, *args):
+    start = time.perf_counter_ns()
+    result = fn(*args)
+    return time.perf_counter_ns() - start, result
+
+
+# --- cases ---
+def bench_paths(config, name, pairs=2000, repairs=2000, seed=0):
+    """Field builds, path backtraces over entrance/seat pairs and repairs after seats fill."""
+    rng = np.random.default_rng(seed)
+    sim = Simulation(config, seed)
+    results = {}
+
+    builds = []
+    expanded = []
+    for field_ in sim.fields:
+        before = field_.expanded
+        elapsed, _ = timed(field_.rebuild)
+        builds.append(elapsed)
+        expanded.append(field_.expanded - before)
+    results[f'paths/{name}/field_build'] = summarize(builds, expanded_per_search=round(float(np.mean(expanded)), 3))
+
+    cells = sim.seat_cell[rng.integers(len(sim.seat_cell), size=pairs)].tolist()
+    entrances = rng.integers(len(sim.fields), size=pairs).tolist()
+    lookups = [timed(sim.fields[e].path_to, c)[0] for e, c in zip(entrances, cells)]
+    results[f'paths/{name}/path_to'] = summarize(lookups)
+
+    order = rng.permutation(len(sim.seats))[:repairs]
+    before = sum(f.expanded for f in sim.fields)
+    fills = [timed(sim._occupy, int(seat))[0] for seat in order]
+    per_repair = (sum(f.expanded for f in sim.fields) - before) / (len(order) * len(sim.fields))
+    results[f'paths/{name}/seat_repair'] = summarize(fills, expanded_per_search=round(per_repair, 3))
+    return results
+
+
+def bench_avoidance(config, counts=WALKER_COUNTS, repeats=30, seed=0):
+    """One separation pass with n walkers spread over the hall."""
+    rng = np.random.default_rng(seed)
+    sim = Simulation(config, seed)
+    cfg = sim.config
+    width = cfg.cols * cfg.cell_size
+    height = cfg.rows * cfg.cell_size + cfg.render_offset_y
+    results = {}
+    for n in counts:
+        if n > len(sim.seats):
+            raise ValueError(f'{n} walkers need at least {n} seats, hall has {len(sim.seats)}')
+        sim.x[:n] = rng.random(n) * width
+        sim.y[:n] = cfg.render_offset_y + rng.random(n) * (height - cfg.render_offset_y)
+        sim.state[:n] = MOVING
+        sim.agents = n
+        walkers = np.arange(n)
+        samples = [timed(sim._separation, walkers, walkers)[0] for _ in range(repeats)]
+        results[f'avoidance/{n}_walkers'] = summarize(samples)
+    return results
+
+
+def bench_seat_assignment(config, seed=0):
+    """Pick and take every seat of a large hall, one student at a time."""
+    sim = Simulation(config, seed)
+
+    def assign():
+        seat = sim._pick_seat()
+        sim._take_seat(seat)
+        sim.seat[sim.agents] = seat
+        sim.agents += 1
+
+    samples = [timed(assign)[0] for _ in range(len(sim.seats))]
+    return {'seats/assign_all': summarize(samples, seats=len(sim.seats))}
+
+
+def bench_fill(seeds=FILL_SEEDS):
+    """Full default-hall fills with fixed seeds."""
+    samples = []
+    fill_times = []
+    for seed in seeds:
+        elapsed, result = timed(Simulation(SimConfig(), seed).run)
+        samples.append(elapsed)
+        fill_times.append(round(result.fill_time, 3))
+    return {'fill/default_hall': summarize(samples, fill_times=fill_times)}
+
+
+def bench_batch_fill(seeds=BATCH_SEEDS):
+    """Default-hall fills for many seeds in one batched run, per fill."""
+    elapsed, results = timed(simulate_many, SimConfig(), seeds)
+    # The batch starts with FILL_SEEDS, whose times must match fill/default_hall
+    fill_times = [round(result.fill_time, 3) for result in results[:len(FILL_SEEDS)]]
+    return {'fill/default_hall_batched': summarize([elapsed / len(seeds)], fill_times=fill_times)}
+
+
+def run_engine(layout, config=None, **spec):
+    """Raw results of ``bench_engine.js`` on a layout; ``spec`` holds the driver's other keys."""
+    compiled = compile_layout(layout)
+    spec = {
+        'grid': compiled.to_script()[1],
+        'session': {'layout': {**layout, 'seatTotal': len(compiled.seats)}, 'config': config or {}},
+        'pairs': 0,
+        'seeds': [],
+        'forecastSeeds': [],
+        'forecastRepeats': 0,
+        **spec,
+    }
+    out = subprocess.run(['node', str(ENGINE_DRIVER)], input=json.dumps(spec), capture_output=True,
+                         text=True, check=True).stdout
+    return compiled, json.loads(out)
+
+
+def bench_engine(layout, name, config=None, pairs=2000, seeds=FILL_SEEDS, walkers=(), forecast_seeds=range(1, 11),
+                 repeats=20):
+    """The browser engine under node: path searches, simStep over whole runs, updateStudent and forecastFill."""
+    compiled, runs = run_engine(layout, config, pairs=pairs, seeds=list(seeds), walkers=list(walkers),
+                                walkerRepeats=30, forecastSeeds=list(forecast_seeds), forecastRepeats=repeats)
+
+    def per_search(run):
+        return round(run['expanded'] / max(run['searches'], 1), 3)
+
+    results = {}
+    if 'search' in runs:
+        results[f'engine/{name}/find_path'] = summarize(runs['search']['samples'],
+                                                         expanded_per_search=per_search(runs['search']))
+    if 'simStep' in runs:
+        step = runs['simStep']
+        failed = [seed for seed, outcome in zip(seeds, step['outcomes']) if outcome != 'success']
+        if failed:
+            raise RuntimeError(f'engine/{name}: runs with seeds {failed} did not fill the hall')
+        results[f'engine/{name}/sim_step'] = summarize(step['samples'], expanded_per_search=per_search(step),
+                                                        seats=len(compiled.seats), fill_times=step['fillTimes'],
+                                                        outcomes=step['outcomes'])
+    for n, samples in runs.get('avoidance', {}).items():
+        results[f'engine/{name}/avoidance_{n}_walkers'] = summarize(samples)
+    if 'forecastFill' in runs:
+        forecast = runs['forecastFill']
+        results[f'engine/{name}/forecast_run'] = summarize(forecast['samples'], fill_times=forecast['fillTimes'])
+    return results
+
+
+def bench_engines():
+    if shutil.which('node') is None:
+        print('Skipping the engine case: node is not installed', file=sys.stderr)
+        return {}
+    default = page_layout(SimConfig())
+    cooperative = {'reservation': {'enabled': True}}
+    return {**bench_engine(default, 'default_hall'),
+            **bench_engine(default, 'default_hall_cooperative', cooperative, pairs=0, repeats=0),
+            **bench_engine(page_layout(hall_config(160, 100)), 'large_hall', seeds=(0,), walkers=WALKER_COUNTS)}
+
+
+CASES = {
+    'paths': lambda: {**bench_paths(SimConfig(), 'default_hall'),
+                      **bench_paths(hall_config(160, 100), 'large_hall')},
+    'avoidance': lambda: bench_avoidance(hall_config(160, 100)),
+    'seats': lambda: bench_seat_assignment(hall_config(400, 160)),
+    'fill': lambda: {**bench_fill(), **bench_batch_fill()},
+    'engine': bench_engines,
+}
+
+# Counts that must not change unless the algorithm does
+DETERMINISTIC_KEYS = ('expanded_per_search', 'seats', 'fill_times')
+
+
+def compare(results, baseline, tolerance, timings=False):
+    """Return human-readable regressions against a stored baseline; medians only count with ``timings``."""
+    regressions = []
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            continue
+        slower = stats['p50_ms'] - old['p50_ms']
+        if timings and slower > NOISE_FLOOR_MS and stats['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {stats['p50_ms']:.3f} ms vs baseline {old['p50_ms']:.3f} ms")
+        for key in DETERMINISTIC_KEYS:
+            if key in old and stats.get(key) != old[key]:
+                regressions.append(f'{name}: {key} {stats.get(key)} vs baseline {old[key]}')
+    return regressions
+
+
+def report(results, baseline):
+    print(f"{'case':<48}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'base p50':>10}  extra")
+    for name, stats in results.items():
+        old = baseline.get(name, {}).get('p50_ms')
+        extra = ', '.join(f'{k}={stats[k]}' for k in DETERMINISTIC_KEYS if k in stats)
+        base = f'{old:.3f}' if old is not None else '-'
+        print(f"{name:<48}{stats['p50_ms']:>10.3f}{stats['p90_ms']:>10.3f}{stats['p99_ms']:>10.3f}{base:>10}  {extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--only', nargs='+', choices=sorted(CASES), help='cases to run (default: all)')
+    parser.add_argument('--save-baseline', action='store_true', help=f'write results to {BASELINE_PATH.name}')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed median slowdown before a case counts as a regression (default 0.25)')
+    parser.add_argument('--timings', action='store_true',
+                        help='also gate on median times; only meaningful against a baseline from this machine')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for case in args.only or CASES:
+        results.update(CASES[case]())
+
+    stored = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    baseline = stored.get('results', {})
+    report(results, baseline)
+
+    if args.save_baseline:
+        stored = {
+            'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'processor': platform.machine()},
+            'results': {**baseline, **results},
+        }
+        BASELINE_PATH.write_text(json.dumps(stored, indent=2) + '\n')
+        print(f'Baseline written to {BASELINE_PATH.name}')
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance, args.timings)
+    for line in regressions:
+        print(f'REGRESSION {line}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
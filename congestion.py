@@ -0,0 +1,91 @@
+"""Load the per-cell congestion maps the browser engine keeps for each run.
+
+While a run steps, ``CongestionMap`` in ``static/seating_engine.js`` adds
+one to a cell's dwell count for every walker standing in it, and counts the
+walkers that step into it. When the run ends the totals reach Python in the
+component value (``value["congestion"]``) as base64 little-endian uint32
+arrays; loading them gives ``(rows, cols)`` NumPy arrays laid out like the
+grid, so maps of different layouts or events can be compared directly.
+
+    from congestion import load_congestion
+    heat = load_congestion(value["congestion"])
+    heat.seconds()[y, x]  # student-seconds spent in cell (x, y)
+"""
+
+import base64
+from dataclasses import dataclass
+
+import numpy as np
+
+# Overlay colours, as the engine paints them: yellow for the first walker, red at the busiest cell
+COLD = np.array([255, 220, 0], dtype=np.float64)
+HOT = np.array([255, 0, 0], dtype=np.float64)
+FLOOR = np.array([255, 255, 255], dtype=np.float64)
+
+
+@dataclass
+class CongestionMap:
+    layout: str  # Key of the compiled layout (layout.layout_key)
+    outcome: str
+    dt: float  # Seconds per step
+    ticks: int  # Steps the run took
+    dwell: np.ndarray  # (rows, cols) walker-steps spent in each cell
+    visits: np.ndarray  # (rows, cols) walkers that stepped into each cell
+
+    @property
+    def duration(self):
+        return self.ticks * self.dt
+
+    def seconds(self):
+        """``(rows, cols)`` student-seconds spent in each cell."""
+        return self.dwell * self.dt
+
+    def wait_per_visit(self):
+        """Mean seconds a walker stayed in each cell it entered; 0 where nobody came."""
+        return np.divide(self.seconds(), self.visits, out=np.zeros(self.dwell.shape), where=self.visits > 0)
+
+    def busiest(self, count=5):
+        """The ``count`` cells with the most dwell time, as ``(x, y)`` pairs, busiest first."""
+        cells = np.argsort(self.dwell, axis=None, kind="stable")[::-1][:count]
+        return [(int(c % self.dwell.shape[1]), int(c // self.dwell.shape[1])) for c in cells]
+
+    def summary(self):
+        """One row of totals for comparing runs across layouts."""
+        total = float(self.dwell.sum())
+        top = np.sort(self.dwell, axis=None)[::-1][:max(1, self.dwell.size // 100)]
+        x, y = self.busiest(1)[0]
+        return {
+            "layout": self.layout,
+            "fill time (s)": round(self.duration, 1),
+            "student-seconds walking": round(total * self.dt, 1),
+            "busiest cell": f"({x}, {y})",
+            "busiest cell (s)": round(float(self.dwell[y, x]) * self.dt, 1),
+            "share in busiest 1% of cells": round(float(top.sum()) / total, 3) if total else 0.0,
+        }
+
+    def image(self, cell_px=8):
+        """``(rows * cell_px, cols * cell_px, 3)`` uint8 picture of the map on a white floor."""
+        t = np.sqrt(self.dwell / max(1, int(self.dwell.max())))[..., None]
+        alpha = np.where(t > 0, (60 + 160 * t) / 255, 0)
+        rgb = (1 - alpha) * FLOOR + alpha * ((1 - t) * COLD + t * HOT)
+        return np.repeat(np.repeat(rgb.astype(np.uint8), cell_px, axis=0), cell_px, axis=1)
+
+
+def load_congestion(value):
+    """``CongestionMap`` from the ``congestion`` entry of the component value."""
+    shape = (int(value["rows"]), int(value["cols"]))
+
+    def decode(key):
+        counts = np.frombuffer(base64.b64decode(value[key]), dtype="<u4")
+        if counts.size != shape[0] * shape[1]:
+            raise ValueError(f"Congestion {key} does not match a {shape[1]}x{shape[0]} grid")
+        return counts.reshape(shape)
+
+    return CongestionMap(
+        layout=value["layout"],
+        outcome=value["outcome"],
+        dt=float(value["dt"]),
+        ticks=int(value["ticks"]),
+        dwell=decode("dwell"),
+        visits=decode("visits"),
+    )
@@ -0,0 +1,166 @@
+"""Compile page layouts into the grid tables the browser engine loads.
+
+A layout is a dict of ``utils.DEFAULT_LAYOUT`` keys: seat blocks, cross
+aisles, ``curve`` for rows that wrap around the front (see
+``simulation.build_grid``), any number of entrances and a seat count.
+Compiling it once in Python gives the engine everything ``initGrid`` and
+the path searches used to work out per cell: a 2-bit packed cell-type grid,
+the seat cells in row-major order and CSR tables of the legal moves out of
+and into every cell, with the side-entry rule for seats already applied.
+Results are cached by layout hash, so reruns reuse them. The page loads the
+tables once, as a static script named by its content hash (``to_script``),
+so they never ride along with the per-rerun component arguments.
+
+    from layout import compile_layout
+    compiled = compile_layout(utils.DEFAULT_LAYOUT)
+    exits = compiled.exits[compiled.exit_offsets[c]:compiled.exit_offsets[c + 1]]
+"""
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from simulation import SEAT, WALL, SimConfig, build_grid
+
+# Page layout keys (utils.DEFAULT_LAYOUT) and their SimConfig fields
+LAYOUT_FIELDS = {
+    "cols": "cols",
+    "rows": "rows",
+    "seatTotal": "seat_total",
+    "frontRows": "front_rows",
+    "backRows": "back_rows",
+    "seatBlocks": "seat_blocks",
+    "aisleRows": "aisle_rows",
+    "curve": "curve",
+    "entrances": "entrances",
+}
+
+# Neighbour order of every move table, as the engine expands them: down, right, up, left
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+@dataclass
+class CompiledLayout:
+    key: str  # Hash of the layout this was compiled from
+    cell_type: np.ndarray  # (rows, cols) uint8 cell codes
+    seats: np.ndarray  # Flat cell index per seat, row-major
+    exit_offsets: np.ndarray  # Cell c can step to exits[exit_offsets[c]:exit_offsets[c + 1]]
+    exits: np.ndarray
+    entry_offsets: np.ndarray  # Cell c can be entered from entries[entry_offsets[c]:entry_offsets[c + 1]]
+    entries: np.ndarray
+
+    def packed_cells(self):
+        """Cell codes at 2 bits each, four cells per byte, lowest bits first."""
+        flat = self.cell_type.ravel()
+        quads = np.zeros(-(-len(flat) // 4) * 4, dtype=np.uint8)
+        quads[:len(flat)] = flat
+        return (quads.reshape(-1, 4) << np.array([0, 2, 4, 6], dtype=np.uint8)).sum(axis=1, dtype=np.uint8)
+
+    def to_json(self):
+        """The ``grid`` entry of a page session; arrays are base64 little-endian bytes."""
+        def encode(values, dtype='<i4'):
+            return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+        return {
+            "key": self.key,
+            "cells": encode(self.packed_cells(), np.uint8),
+            "seats": encode(self.seats),
+            "exitOffsets": encode(self.exit_offsets),
+            "exits": encode(self.exits),
+            "entryOffsets": encode(self.entry_offsets),
+            "entries": encode(self.entries),
+        }
+
+    def to_script(self):
+        """``(name, text)`` of a script that sets ``self.SEATING_GRID``; the name hashes the text."""
+        text = f"self.SEATING_GRID = {json.dumps(self.to_json(), separators=(',', ':'))};\n"
+        return f"{hashlib.sha256(text.encode()).hexdigest()[:12]}.js", text
+
+
+def layout_config(layout, **overrides):
+    """``SimConfig`` for a page layout dict such as ``utils.DEFAULT_LAYOUT``."""
+    values = {}
+    for key, value in layout.items():
+        if key == "seatBlocks":
+            value = tuple(tuple(block) for block in value)
+        elif key == "aisleRows":
+            value = tuple(value)
+        elif key == "entrances":
+            value = tuple((e["x"], e["y"]) for e in value)
+        values[LAYOUT_FIELDS[key]] = value
+    values.update(overrides)
+    return SimConfig(**values)
+
+
+def _enterable(cell_type, vertical):
+    # Walls are never entered, seats only from the side
+    return (cell_type != WALL) & ~(vertical & (cell_type == SEAT))
+
+
+def build_move_table(cell_type, reverse=False):
+    """CSR ``(offsets, targets)`` of the legal moves out of each cell, or into it with ``reverse``."""
+    rows, cols = cell_type.shape
+    y, x = np.indices((rows, cols))
+    targets = np.empty((rows, cols, len(DIRECTIONS)), dtype=np.int32)
+    legal = np.empty(targets.shape, dtype=bool)
+    for d, (dx, dy) in enumerate(DIRECTIONS):
+        nx, ny = x + dx, y + dy
+        inside = (nx >= 0) & (nx < cols) & (ny >= 0) & (ny < rows)
+        neighbour = cell_type[np.clip(ny, 0, rows - 1), np.clip(nx, 0, cols - 1)]
+        entered = cell_type if reverse else neighbour
+        legal[..., d] = inside & _enterable(entered, dy != 0)
+        targets[..., d] = ny * cols + nx
+    counts = legal.reshape(rows * cols, -1).sum(axis=1)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int32)
+    return offsets, targets[legal]
+
+
+def layout_key(layout):
+    """Short hash of a layout's canonical JSON."""
+    return hashlib.sha256(json.dumps(layout, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def compile_layout(layout):
+    """``CompiledLayout`` for a page layout dict, cached by layout hash."""
+    return _compile(json.dumps(layout, sort_keys=True))
+
+
+@lru_cache(maxsize=32)
+def _compile(canonical):
+    layout = json.loads(canonical)
+    config = layout_config(layout)
+    cell_type, seats = build_grid(config)
+    for e in layout["entrances"]:
+        x, y = e["x"], e["y"]
+        if not (0 <= x < config.cols and 0 <= y < config.rows):
+            raise ValueError(f"Entrance ({x}, {y}) is outside the grid")
+        if cell_type[y, x] in (SEAT, WALL):
+            raise ValueError(f"Entrance ({x}, {y}) is not on an aisle")
+    exit_offsets, exits = build_move_table(cell_type)
+    entry_offsets, entries = build_move_table(cell_type, reverse=True)
+    return CompiledLayout(
+        key=layout_key(layout),
+        cell_type=cell_type,
+        seats=(seats[:, 1] * config.cols + seats[:, 0]).astype(np.int32),
+        exit_offsets=exit_offsets,
+        exits=exits,
+        entry_offsets=entry_offsets,
+        entries=entries,
+    )
+
+
+if __name__ == '__main__':
+    import time
+
+    from utils import DEFAULT_LAYOUT
+
+    for curve in (0, 3):
+        start = time.perf_counter()
+        compiled = compile_layout({**DEFAULT_LAYOUT, "curve": curve})
+        size = sum(len(v) for v in compiled.to_json().values())
+        print(f'curve {curve}: {len(compiled.seats)} seats, {len(compiled.exits)} moves, '
+              f'{size / 1024:.1f} KB in the session, compiled in {(time.perf_counter() - start) * 1000:.1f} ms')
@@ -0,0 +1,136 @@
+"""Load replay traces recorded by the browser engine.
+
+A finished run's trace (``ReplayRecorder`` in ``static/seating_engine.js``)
+can be downloaded from the page as a ``.srpl`` file, and it reaches Python
+base64-encoded in the component value (``value["replay"]["data"]``).
+Loading never copies the trace: the header, event table, per-tick counts
+and position deltas are NumPy views over the bytes or a memory-mapped file.
+
+    from replay import load_replay
+    trace = load_replay('seating-42.srpl')
+    tick, agent, x, y = trace.positions()
+    busiest = trace.cell_counts()  # walker-ticks per grid cell
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = 0x4C505253  # b'SRPL'
+VERSION = 2  # 2: int32 spawn positions and uint32 per-tick counts
+OUTCOMES = ('success', 'failure', 'reset')
+SPAWN, SEATED = 0, 1
+
+HEADER = np.dtype([
+    ('magic', '<u4'), ('version', '<u2'), ('quant', '<u2'), ('cols', '<u2'), ('rows', '<u2'),
+    ('cell_size', '<f4'), ('render_offset_y', '<f4'), ('dt', '<f4'), ('seed', '<u4'),
+    ('seats', '<u4'), ('ticks', '<u4'), ('agents', '<u4'), ('events', '<u4'), ('samples', '<u4'),
+    ('outcome', 'u1'), ('pad', 'u1', 3),
+])
+EVENT = np.dtype([
+    ('tick', '<u4'), ('agent', '<u4'), ('seat', '<u4'), ('x', '<i4'), ('y', '<i4'),
+    ('kind', 'u1'), ('entrance', 'u1'), ('color', 'u1'), ('pad', 'u1'),
+])
+
+
+@dataclass
+class Replay:
+    header: np.void
+    events: np.ndarray  # EVENT records in time order
+    counts: np.ndarray  # Walkers sampled per tick
+    deltas: np.ndarray  # (samples, 2) int8 steps in 1/quant px, tick-major, walkers by ascending id
+
+    @property
+    def outcome(self):
+        return OUTCOMES[self.header['outcome']]
+
+    @property
+    def duration(self):
+        """Simulated seconds covered by the trace."""
+        return float(self.header['ticks'] * self.header['dt'])
+
+    def spans(self):
+        """Per walker: spawn tick and last sampled tick (the tick it sat down)."""
+        agents = int(self.header['agents'])
+        first = np.zeros(agents, dtype=np.int64)
+        last = np.full(agents, int(self.header['ticks']) - 1, dtype=np.int64)
+        spawn = self.events[self.events['kind'] == SPAWN]
+        seated = self.events[self.events['kind'] == SEATED]
+        first[spawn['agent']] = spawn['tick']
+        last[seated['agent']] = seated['tick']
+        return first, last
+
+    def positions(self):
+        """Decode every sample: ``(tick, agent, x, y)`` arrays in stream order, x and y in canvas px."""
+        first, last = self.spans()
+        lengths = last - first + 1
+        agent = np.repeat(np.arange(len(first)), lengths)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        tick = np.repeat(first, lengths) + np.arange(len(agent)) - starts
+        if len(agent) != len(self.deltas):
+            raise ValueError('Trace events and samples disagree')
+
+        # The stream is tick-major; cumulate each walker's steps in walker-major order
+        stream = np.lexsort((agent, tick))
+        steps = np.empty((len(agent), 2), dtype=np.int32)
+        steps[stream] = self.deltas
+        spawn = self.events[self.events['kind'] == SPAWN]
+        origin = np.zeros((len(first), 2), dtype=np.int32)
+        origin[spawn['agent'], 0] = spawn['x']
+        origin[spawn['agent'], 1] = spawn['y']
+        total = np.cumsum(steps, axis=0)
+        before = np.vstack([np.zeros((1, 2), dtype=total.dtype), total])[starts]
+        quantized = origin[agent] + total - before
+
+        scale = float(self.header['quant'])
+        return (tick[stream], agent[stream],
+                quantized[stream, 0] / scale, quantized[stream, 1] / scale)
+
+    def cell_counts(self):
+        """``(rows, cols)`` array of walker-ticks spent in each grid cell, a congestion map."""
+        _, _, x, y = self.positions()
+        h = self.header
+        cols, rows = int(h['cols']), int(h['rows'])
+        gx = np.clip((x // h['cell_size']).astype(np.int64), 0, cols - 1)
+        gy = np.clip(((y - h['render_offset_y']) // h['cell_size']).astype(np.int64), 0, rows - 1)
+        return np.bincount(gy * cols + gx, minlength=rows * cols).reshape(rows, cols)
+
+
+def load_replay(source):
+    """Open a trace from a bytes-like object or a file path (memory-mapped)."""
+    if isinstance(source, (str, Path)):
+        raw = np.memmap(source, dtype=np.uint8, mode='r')
+    else:
+        raw = np.frombuffer(source, dtype=np.uint8)
+
+    header = raw[:HEADER.itemsize].view(HEADER)[0]
+    if header['magic'] != MAGIC:
+        raise ValueError('Not a seating replay trace')
+    if header['version'] != VERSION:
+        raise ValueError(f"Replay trace version {header['version']} is not supported (expected {VERSION})")
+    events_at = HEADER.itemsize
+    counts_at = events_at + int(header['events']) * EVENT.itemsize
+    deltas_at = counts_at + int(header['ticks']) * 4
+    end = deltas_at + int(header['samples']) * 2
+    if len(raw) < end:
+        raise ValueError('Truncated replay trace')
+    return Replay(
+        header=header,
+        events=raw[events_at:counts_at].view(EVENT),
+        counts=raw[counts_at:deltas_at].view('<u4'),
+        deltas=raw[deltas_at:end].view(np.int8).reshape(-1, 2),
+    )
+
+
+if __name__ == '__main__':
+    import sys
+
+    trace = load_replay(sys.argv[1])
+    h = trace.header
+    print(f"{trace.outcome}: {trace.duration:.1f}s, {h['agents']} walkers, {h['samples']} samples, "
+          f"peak {trace.counts.max()} walking")
+    counts = trace.cell_counts()
+    for cell in np.argsort(counts, axis=None)[::-1][:5]:
+        y, x = divmod(int(cell), int(h['cols']))
+        print(f'cell ({x}, {y}): {counts[y, x]} walker-ticks')
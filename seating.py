@@ -1,6 +1,13 @@
+import base64
+import io
+
+import numpy as np
 import streamlit as st
-import streamlit.components.v1 as components
-from utils import get_game_html
+from congestion import load_congestion
+from layout import compile_layout, layout_config
+from optimizer import optimize_schedule
+from replay import load_replay
+from utils import DEFAULT_LAYOUT, SEAT_POLICIES, seating_game
 
 # Page Configuration
 st.set_page_config(
@@ -45,27 +52,232 @@ with st.sidebar:
     
     **Legend:**
     - ⬜ **White/Grey:** Empty Seat
+    - ⬛ **Dark:** Seat assigned to a student on the way
     - 🟥 **Red:** Occupied Seat
     - 🔵 **Blue Dot:** Student
     - 🚪 **Green:** Entrances
     
     **Movement Mechanics:**
-    - Students spawn at 1 of 3 random back entrances.
+    - Students spawn at 1 of 3 random back entrances (or, with **Admission control**,
+      at the door with the shortest expected time to seat, as fast as the doors clear).
     - **Aisles:** 100% Speed
     - **Empty Seats:** 75% Speed
     - **Occupied Seats:** 25% Speed (Congestion)
-    - Students pause briefly at the entrance and avoid occupying the same tile while moving.
+    - Students pause briefly at the entrance and avoid occupying the same tile while moving:
+      with **Cooperative paths** each one reserves the tiles ahead of it and waits or detours
+      around the others' reservations, otherwise they push each other apart as they walk.
 
     **Controls:**
     Use the buttons inside the game window to Start, Pause/Resume, or Reset the simulation.
+    Enter a **Seed** to replay an identical run, and pick a **Speed** to fast-forward
+    (or run straight to the end without drawing). Pick a **Seat policy** in the sidebar
+    to compare seat orders; each finished run is added to the table below the game.
+    Tick **Profiler** to see per-phase frame timings in the game and charted below it,
+    and **Congestion** to shade the cells where students spend the most time.
     """)
     
+    seat_policy = st.selectbox(
+        "Seat policy",
+        list(SEAT_POLICIES),
+        format_func=SEAT_POLICIES.get,
+        help="How each arriving student picks a seat. Ordered policies fill seats by row or by "
+             "distance from the aisle; the planned order is computed offline (inner seats before "
+             "the ones in front of them, farthest seats first). Finished runs are compared below.",
+    )
+    admission = st.checkbox(
+        "Admission control",
+        help="Adapt the spawn rate to the crowd at the doors and on the aisles, and send each "
+             "student through the entrance with the lowest expected time to seat, instead of "
+             "one student every 0.5 s through a random door.",
+    )
+    cooperative = st.checkbox(
+        "Cooperative paths",
+        value=False,
+        help="Plan each student's next few seconds around the tiles other students have "
+             "reserved, so nobody walks through anybody. Off, students follow their own "
+             "shortest path and a separation force keeps them apart. Planning costs several "
+             "times the simulation time on very large halls.",
+    )
+    curve = st.slider(
+        "Row curve",
+        0, 4, 0,
+        help="Bow the seat rows toward the back at the centre, so they wrap around the front "
+             "like a circular auditorium. A new layout reloads the game and keeps its own best time.",
+    )
+
     st.info("Note: This simulation uses a custom HTML5 Canvas engine embedded in Streamlit to achieve 60FPS smooth animations.")
 
 # Main Game Container
 # We inject the HTML/JS game engine here.
 # The game logic handles the timer, pathfinding, and rendering internally to ensure performance.
-game_html = get_game_html()
+# The engine scripts come from ./static (see .streamlit/config.toml); the
+# component keeps running across reruns, takes sidebar changes as messages and
+# reports runs, profiler snapshots, replays and congestion maps back.
+base_url = st.get_option("server.baseUrlPath").strip("/")
+asset_base = f"/{base_url}/app/static" if base_url else "/app/static"
+
+
+@st.cache_data
+def planned_schedule(layout):
+    plan = optimize_schedule(layout_config(layout))
+    return plan.to_json(), plan.estimated_fill_time
+
+
+@st.cache_data(max_entries=4)
+def replay_trace(trace_id, _data):
+    """Decoded trace per run id; the base64 text itself is never hashed."""
+    trace_bytes = base64.b64decode(_data)
+    return trace_bytes, load_replay(trace_bytes)
+
+
+def keep_payloads(value):
+    # The page sends each trace and congestion map once; keep them until the next run's arrive
+    value = value or {}
+    replay = value.get("replay") or {}
+    if replay.get("data"):
+        st.session_state["replay"] = {"id": replay["id"], "data": replay["data"]}
+    congestion = value.get("congestion") or {}
+    if congestion.get("dwell") and congestion["id"] != st.session_state.get("congestion", {}).get("id"):
+        heat = load_congestion(congestion)
+        st.session_state["congestion"] = {"id": congestion["id"], "map": heat}
+        st.session_state.setdefault("congestion_maps", {})[heat.layout] = heat
+
+
+@st.cache_resource
+def high_scores():
+    """Best fill time in seconds per layout, shared by every session on this server."""
+    return {}
+
+
+layout = {**DEFAULT_LAYOUT, "curve": curve}
+# The compiled layout's key, which the page also stamps on every run it reports
+layout_key = compile_layout(layout).key
+schedule = None
+if seat_policy == "planned":
+    schedule, estimate = planned_schedule(layout)
+    st.caption(f"Playing back a planned seat order; estimated fill time {estimate:.0f} s at 1x.")
+# Store new payloads before rendering, so this render already confirms them to the page
+keep_payloads(st.session_state.get("game"))
+received = {name: st.session_state[name]["id"] for name in ("replay", "congestion") if name in st.session_state}
+game_value = seating_game(
+    layout=layout,
+    asset_base=asset_base,
+    config={
+        "seatPolicy": seat_policy,
+        "admission": {"enabled": admission},
+        "reservation": {"enabled": cooperative},
+    },
+    schedule=schedule,
+    high_score=high_scores().get(layout_key),
+    received=received,
+    key="game",
+)
+game_value = game_value or {}
+keep_payloads(game_value)
+
+# Event-driven, congestion-free fill times for the current seed (or 8 seeds)
+forecast = game_value.get("forecast")
+if forecast:
+    done = [seconds for seconds in forecast["seconds"] if seconds is not None]
+    if done:
+        st.caption(f"Predicted fill time {sum(done) / len(done):.0f} s "
+                   f"({min(done):.0f}-{max(done):.0f} s over {len(done)} seed(s), congestion-free, "
+                   f"{forecast['msPerRun']:.1f} ms per run).")
+
+# Finished runs, kept across page reloads; every run sent back is a success.
+# Until a reloaded page reports, the value still holds the previous layout's
+# runs, so each run only counts toward the layout it was played on.
+runs = st.session_state.setdefault("policy_runs", {})
+for run in game_value.get("runs", []):
+    runs[f"{game_value['loadId']}:{run['id']}"] = run
+    best = high_scores().get(run["layout"])
+    if best is None or run["seconds"] < best:
+        high_scores()[run["layout"]] = run["seconds"]
+
+layout_runs = [run for run in runs.values() if run["layout"] == layout_key]
+if layout_runs:
+    st.subheader("Seat policies")
+    st.caption("Runs on the current layout.")
+    table = {}
+    for run in layout_runs:
+        table.setdefault((run["policy"], run.get("admission", False), run.get("cooperative", False)), []).append(run)
+    st.dataframe(
+        [{"policy": SEAT_POLICIES[name],
+          "admission control": controlled,
+          "cooperative paths": reserved,
+          "runs": len(done),
+          "mean fill time (s)": round(sum(r["seconds"] for r in done) / len(done), 1),
+          "mean path cost": round(sum(r["meanPathCost"] for r in done) / len(done), 2),
+          "peak walkers": max(r["peakWalkers"] for r in done),
+          "seats / minute": round(60 * sum(r["seats"] for r in done) / max(1, sum(r["seconds"] for r in done)), 1)}
+         for (name, controlled, reserved), done in table.items()],
+        hide_index=True,
+    )
+
+# The last finished run's trace: walkers over time and the busiest cells
+if st.session_state.get("replay"):
+    trace_bytes, trace = replay_trace(st.session_state["replay"]["id"], st.session_state["replay"]["data"])
+    header = trace.header
+    st.subheader("Last run replay")
+    st.caption(f"{trace.outcome.capitalize()} after {trace.duration:.0f} s: {header['agents']} students, "
+               f"{len(trace_bytes) / 1024:.0f} KB trace. Scrub it with the slider under the game.")
+    per_second = int(round(1 / header["dt"]))
+    walking = trace.counts[: len(trace.counts) // per_second * per_second].reshape(-1, per_second).mean(axis=1)
+    st.line_chart({"students walking": walking})
+    counts = trace.cell_counts()
+    busiest = np.argsort(counts, axis=None)[::-1][:5]
+    st.dataframe(
+        [{"cell": f"({cell % counts.shape[1]}, {cell // counts.shape[1]})",
+          "student-seconds": round(float(counts.flat[cell] * header["dt"]), 1)}
+         for cell in busiest],
+        hide_index=True,
+    )
+    st.download_button("Download trace (.srpl)", trace_bytes, file_name=f"seating-{header['seed']}.srpl",
+                       help="Load it offline with replay.load_replay (NumPy views, no copies).")
+
+# Where the last run lost time; the latest map per layout is kept to compare layouts
+if st.session_state.get("congestion"):
+    heat = st.session_state["congestion"]["map"]
+    maps = st.session_state["congestion_maps"]
+    st.subheader("Congestion")
+    st.caption(f"Student-seconds per cell over the last run ({heat.outcome}, {heat.duration:.0f} s), "
+               "square-root scale. Tick **Congestion** under the game for the live overlay.")
+    st.image(heat.image())
+    st.dataframe([m.summary() for m in maps.values()], hide_index=True)
+    matrix = io.BytesIO()
+    np.savez(matrix, dwell_seconds=heat.seconds(), visits=heat.visits)
+    st.download_button("Download congestion matrix (.npz)", matrix.getvalue(),
+                       file_name=f"congestion-{heat.layout}.npz",
+                       help="Arrays shaped (rows, cols) like the grid; see congestion.py.")
+
+# Profiler snapshots arrive one per rerun; keep a rolling history to chart
+PROFILE_HISTORY = 300
+history = st.session_state.setdefault("profile_history", [])
+metrics = game_value.get("metrics")
+if metrics and (not history or history[-1]["seq"] != metrics["seq"]):
+    if history and metrics["seq"] < history[-1]["seq"]:
+        history.clear()  # The page was reloaded and restarted its count
+    history.append(metrics)
+    del history[:-PROFILE_HISTORY]
+
+if history:
+    latest = history[-1]
+    st.subheader("Profiler")
+    fps_col, frame_col, active_col, search_col = st.columns(4)
+    fps_col.metric("FPS", f"{latest['fps']:.1f}")
+    frame_col.metric("Frame time", f"{latest['frameMs']['mean']:.1f} ms", f"max {latest['frameMs']['max']:.1f} ms",
+                     delta_color="off")
+    active_col.metric("Active students", latest["active"])
+    search_col.metric("Cells expanded / search", latest["expandedPerSearch"])
 
-components.html(game_html, height=850, scrolling=False)
+    phases = list(latest["phases"])
+    st.caption("Mean milliseconds per frame spent in each phase (exclusive of nested phases)")
+    st.line_chart(
+        {"sim time (s)": [m["simTime"] for m in history],
+         **{name: [m["phases"][name]["mean"] for m in history] for name in phases}},
+        x="sim time (s)",
+        y=phases,
+    )
+    st.caption("Frame intervals in the latest window (ms buckets)")
+    st.bar_chart({"frames": latest["frameHistogram"]})
 
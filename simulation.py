@@ -0,0 +1,752 @@
+"""Headless NumPy port of the auditorium seating simulation.
+
+Reproduces the engine emitted by ``utils.get_game_html`` (grid layout,
+surface speeds, entrance delay, separation-based avoidance and seat
+assignment) without a browser. Agent state lives in NumPy arrays and every
+tick moves and separates all walkers in one batch, so whole fills can be
+run on a server to compare layouts.
+
+Students are updated simultaneously within a tick rather than one after
+another as in the browser loop, so individual trajectories differ slightly
+while fill times stay comparable.
+
+A fill steps at a fixed ``dt`` (1/60 s by default), one batch of NumPy
+calls per tick whatever the crowd size, so its cost follows simulated time
+rather than seats: the default 250-seat hall takes about 8,300 ticks and an
+80x60 hall with 2,912 seats about 92,000. Those calls cost about the same
+for one hall as for dozens, so ``simulate_many`` steps many seeds of a
+layout together (``BatchSimulation``) and each fill costs a fraction of a
+lone run, with the same result. For an estimate that takes no ticks at all
+use ``optimizer.optimize_schedule`` or ``forecastFill`` in the browser
+engine.
+"""
+
+import heapq
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Cell type codes, matching CELL_* in the browser engine
+AISLE, FRONT, SEAT, WALL = 0, 1, 2, 3
+
+# Agent states
+ENTERING, MOVING, SEATED = 0, 1, 2
+
+# Above this many walker/student pairs avoidance switches to bucketed queries
+DENSE_PAIR_LIMIT = 64 * 64
+
+
+@dataclass
+class SimConfig:
+    """Layout and movement parameters, mirroring ``CONFIG`` in the page."""
+
+    cols: int = 32
+    rows: int = 20
+    cell_size: float = 25
+    seat_total: int = 250
+    seat_y_offset: float = 6
+    speed_aisle: float = 2.0
+    speed_empty_seat: float = 1.5
+    speed_occupied_seat: float = 0.5
+    avoidance_radius: float = 22
+    avoidance_weight: float = 0.6
+    render_offset_y: float = 30
+    spawn_interval: float = 0.5
+    entry_delay: tuple = (0.5, 1.0)
+    friend_chance: int = 250
+    front_rows: int = 2
+    back_rows: int = 2
+    seat_blocks: tuple = ((2, 9), (12, 20), (23, 30))
+    aisle_rows: tuple = ()
+    curve: int = 0
+    entrances: tuple = ((2, 19), (16, 19), (29, 19))
+
+
+@dataclass
+class SimResult:
+    fill_time: float
+    ticks: int
+    seated: int
+    seats: int
+    mean_path_cost: float
+    entrance_counts: list = field(default_factory=list)
+
+
+def build_grid(config):
+    """Return ``(cell_type, seats)`` laid out like ``initGrid``.
+
+    ``cell_type`` is a ``(rows, cols)`` uint8 array of cell codes and
+    ``seats`` an ``(n, 2)`` int array of seat ``(x, y)`` in row-major order.
+    With ``config.curve`` the seat rows (and cross aisles) bow that many
+    cells toward the back at the centre column, so they wrap around the
+    front like a circular auditorium. Seats beyond ``config.seat_total``,
+    counted row by row from the front, are turned back into aisle.
+    """
+    cell_type = np.full((config.rows, config.cols), AISLE, dtype=np.uint8)
+    cell_type[:config.front_rows, :] = FRONT
+    y = np.arange(config.rows)[:, None]
+    shift = row_shift(config)[None, :]
+    seating = (y >= config.front_rows + shift) & (y < config.rows - config.back_rows - config.curve + shift)
+    in_block = np.zeros(config.cols, dtype=bool)
+    for x0, x1 in config.seat_blocks:
+        in_block[x0:x1 + 1] = True
+    cell_type[seating & in_block] = SEAT
+    for row in config.aisle_rows:
+        cell_type[(y == row + shift) & (cell_type == SEAT)] = AISLE
+
+    ys, xs = np.nonzero(cell_type == SEAT)
+    if len(xs) > config.seat_total:
+        # Keep the front rows, following the curve
+        extra = np.lexsort((xs, ys - shift[0, xs]))[config.seat_total:]
+        cell_type[ys[extra], xs[extra]] = AISLE
+        ys, xs = np.nonzero(cell_type == SEAT)
+    return cell_type, np.stack([xs, ys], axis=1)
+
+
+def row_shift(config):
+    """Cells each column's seat rows sit behind the straight layout's, for ``config.curve``."""
+    mid = (config.cols - 1) / 2
+    offset = (np.arange(config.cols) - mid) / max(mid, 1)
+    return np.rint(config.curve * (1 - offset ** 2)).astype(np.int64)
+
+
+def cell_cost(cell_type, occupied):
+    """Per-cell step cost, as in ``Node.getCost``."""
+    cost = np.full(cell_type.shape, 100.0)
+    cost[(cell_type == AISLE) | (cell_type == FRONT)] = 1.0
+    seat = cell_type == SEAT
+    cost[seat & ~occupied] = 1.3
+    cost[seat & occupied] = 4.0
+    return cost
+
+
+def build_moves(cell_type):
+    """Precompute legal moves per flat cell index.
+
+    Returns ``(exits, entries)`` where ``exits[u]`` lists cells reachable from
+    ``u`` in one step and ``entries[v]`` the cells ``v`` can be entered from.
+    Seats can only be entered from the side and walls not at all.
+    """
+    rows, cols = cell_type.shape
+    flat = cell_type.ravel()
+    exits = [[] for _ in range(rows * cols)]
+    entries = [[] for _ in range(rows * cols)]
+    for u in range(rows * cols):
+        x, y = u % cols, u // cols
+        for nx, ny, vertical in ((x, y + 1, True), (x + 1, y, False), (x, y - 1, True), (x - 1, y, False)):
+            if not (0 <= nx < cols and 0 <= ny < rows):
+                continue
+            v = ny * cols + nx
+            if flat[v] == WALL or (vertical and flat[v] == SEAT):
+                continue
+            exits[u].append(v)
+            entries[v].append(u)
+    return exits, entries
+
+
+class CostField:
+    """Dijkstra cost-to-come from one entrance, repaired incrementally.
+
+    Port of ``CostField`` in the browser engine: paths are backtraces through
+    ``pred`` and a cost change only re-solves the shortest-path subtree below
+    the changed cell.
+    """
+
+    def __init__(self, origin, cost, exits, entries):
+        self.origin = origin
+        self.cost = cost
+        self.exits = exits
+        self.entries = entries
+        self.dist = [float('inf')] * len(cost)
+        self.pred = [-1] * len(cost)
+        self.expanded = 0  # Cells settled so far, across rebuilds and repairs
+        self.rebuild()
+
+    def rebuild(self):
+        inf = float('inf')
+        self.dist = [inf] * len(self.cost)
+        self.pred = [-1] * len(self.cost)
+        self.dist[self.origin] = 0.0
+        self._propagate([(0.0, self.origin)], None)
+
+    def _propagate(self, heap, region):
+        dist, pred, cost, exits = self.dist, self.pred, self.cost, self.exits
+        heapq.heapify(heap)
+        expanded = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            expanded += 1
+            for v in exits[u]:
+                if region is not None and v not in region:
+                    continue
+                nd = d + cost[v]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = u
+                    heapq.heappush(heap, (nd, v))
+        self.expanded += expanded
+
+    def cell_changed(self, i):
+        """Repair the field after ``cost[i]`` changed."""
+        p = self.pred[i]
+        if i == self.origin or p == -1:
+            return
+        d = self.dist[p] + self.cost[i]
+        if d < self.dist[i]:
+            self.dist[i] = d
+            self._propagate([(d, i)], None)
+        elif d > self.dist[i]:
+            self._raise(i)
+
+    def _raise(self, i):
+        dist, pred, cost = self.dist, self.pred, self.cost
+        region = {i}
+        stack = [i]
+        while stack:
+            u = stack.pop()
+            for v in self.exits[u]:
+                if pred[v] == u and v not in region:
+                    region.add(v)
+                    stack.append(v)
+
+        inf = float('inf')
+        for u in region:
+            dist[u] = inf
+            pred[u] = -1
+        heap = []
+        for u in region:
+            for v in self.entries[u]:
+                if v in region:
+                    continue
+                d = dist[v] + cost[u]
+                if d < dist[u]:
+                    dist[u] = d
+                    pred[u] = v
+            if dist[u] < inf:
+                heap.append((dist[u], u))
+        self._propagate(heap, region)
+
+    def path_to(self, target):
+        """Cells from the entrance (exclusive) to ``target`` (inclusive)."""
+        if self.dist[target] == float('inf'):
+            return []
+        path = []
+        while target != self.origin:
+            path.append(target)
+            target = self.pred[target]
+        path.reverse()
+        return path
+
+
+class SeatPool:
+    """Unordered set of seat indices with O(1) add, remove and random draw."""
+
+    def __init__(self, count):
+        self.items = list(range(count))
+        self.slot = list(range(count))
+
+    def __len__(self):
+        return len(self.items)
+
+    def remove(self, i):
+        slot = self.slot[i]
+        if slot == -1:
+            return
+        last = self.items.pop()
+        if last != i:
+            self.items[slot] = last
+            self.slot[last] = slot
+        self.slot[i] = -1
+
+    def draw(self, r):
+        return self.items[int(r * len(self.items))]
+
+
+class RouteBuffer:
+    """Growable flat array of route cells; agents keep offsets into it."""
+
+    def __init__(self, capacity=64):
+        self.cells = np.zeros(capacity, dtype=np.int64)
+        self.used = 0
+
+    def append(self, path):
+        """Store ``path`` and return its offset."""
+        if self.used + len(path) > len(self.cells):
+            self.cells = np.resize(self.cells, max(len(self.cells) * 2, self.used + len(path)))
+        offset = self.used
+        self.cells[offset:offset + len(path)] = path
+        self.used += len(path)
+        return offset
+
+
+# Per-agent columns, one slot per seat
+AGENT_COLUMNS = (
+    ('x', np.float64), ('y', np.float64), ('state', np.int8), ('delay', np.float64), ('seat', np.int64),
+    ('path_start', np.int64), ('path_len', np.int64), ('path_pos', np.int64), ('entrance', np.int64),
+    ('path_cost', np.float64),
+)
+
+
+class Crowd:
+    """Moves and separates the walkers in the agent columns, one batch per tick.
+
+    ``Simulation`` holds one hall; ``BatchSimulation`` holds several side by
+    side in the same columns, and walkers only push others of their own hall.
+    Subclasses provide ``config``, the columns, ``routes`` and
+    ``seat_offset``, and say which hall an agent is in, how fast it walks on
+    a cell and what happens when it sits down.
+    """
+
+    def _halls(self, agents):
+        """Hall of each agent slot, or None when there is only one hall."""
+        return None
+
+    def _tile_speed(self, agents, cells):
+        raise NotImplementedError
+
+    def _seat_walkers(self, done):
+        raise NotImplementedError
+
+    # --- geometry helpers ---
+    def center_x(self, cells):
+        return (cells % self.config.cols) * self.config.cell_size + self.config.cell_size / 2
+
+    def center_y(self, cells):
+        cfg = self.config
+        return (cells // cfg.cols) * cfg.cell_size + cfg.cell_size / 2 + cfg.render_offset_y
+
+    # --- tick ---
+    def _advance(self, live, dt):
+        """Count down entry delays, then move everyone who may walk."""
+        entering = live[self.state[live] == ENTERING]
+        if len(entering):
+            self.delay[entering] -= dt
+            self.state[entering[self.delay[entering] <= 0]] = MOVING
+
+        # Everyone not seated is an obstacle; only moving agents with a path step
+        walkers = live[(self.state[live] == MOVING) & (self.path_len[live] > 0)]
+        if len(walkers):
+            self._move(walkers, live, dt)
+
+    def _move(self, walkers, live, dt):
+        cfg = self.config
+        cell = self.routes.cells[self.path_start[walkers] + self.path_pos[walkers]]
+        tx = self.center_x(cell)
+        ty = self.center_y(cell) + self.seat_offset[cell]
+        px, py = self.x[walkers], self.y[walkers]
+        dx, dy = tx - px, ty - py
+        dist = np.sqrt(dx * dx + dy * dy)
+        dist[dist == 0] = 0.0001
+
+        # Speed from the tile currently under each walker
+        gx = np.floor(px / cfg.cell_size).astype(np.int64)
+        gy = np.floor((py - cfg.render_offset_y) / cfg.cell_size).astype(np.int64)
+        inside = (gx >= 0) & (gx < cfg.cols) & (gy >= 0) & (gy < cfg.rows)
+        speed = np.full(len(walkers), cfg.speed_aisle)
+        speed[inside] = self._tile_speed(walkers[inside], gy[inside] * cfg.cols + gx[inside])
+        move = np.maximum(speed * dt * 60, 0.05)
+
+        count, avoid_x, avoid_y = self._separation(walkers, live)
+
+        ux, uy = dx / dist, dy / dist
+        crowded = count > 0
+        if crowded.any():
+            c = count[crowded]
+            wx = ux[crowded] + avoid_x[crowded] / c * cfg.avoidance_weight
+            wy = uy[crowded] + avoid_y[crowded] / c * cfg.avoidance_weight
+            wlen = np.sqrt(wx * wx + wy * wy)
+            wlen[wlen == 0] = 1
+            ux[crowded] = wx / wlen
+            uy[crowded] = wy / wlen
+
+        # Reaching the waypoint snaps onto it, as in Student.update
+        arrived = dist < move
+        nx = np.where(arrived, tx, px + ux * move)
+        ny = np.where(arrived, ty, py + uy * move)
+
+        self.x[walkers] = nx
+        self.y[walkers] = ny
+        reached = walkers[arrived]
+        self.path_pos[reached] += 1
+
+        done = reached[self.path_pos[reached] >= self.path_len[reached]]
+        if len(done):
+            self.state[done] = SEATED
+            self._seat_walkers(done)
+
+    def _separation(self, walkers, live):
+        """Sum separation pushes from nearby non-seated students.
+
+        Students are bucketed into a grid at least one avoidance radius wide
+        (like ``SpatialHash`` in the page), one such grid per hall; candidate
+        pairs come from the 3x3 block of buckets around each walker and are
+        reduced with bincount.
+        """
+        cfg = self.config
+        radius = cfg.avoidance_radius
+        if len(walkers) * len(live) <= DENSE_PAIR_LIMIT:
+            return self._separation_dense(walkers, live)
+
+        size = max(cfg.cell_size, radius)
+        bcols = int(np.ceil(cfg.cols * cfg.cell_size / size))
+        brows = int(np.ceil((cfg.rows * cfg.cell_size + cfg.render_offset_y) / size))
+        live_halls = self._halls(live)
+        walker_halls = self._halls(walkers)
+        if live_halls is None:
+            live_halls = walker_halls = 0
+
+        lx, ly = self.x[live], self.y[live]
+        bx = np.clip((lx // size).astype(np.int64), 0, bcols - 1)
+        by = np.clip((ly // size).astype(np.int64), 0, brows - 1)
+        live_keys = (live_halls * brows + by) * bcols + bx
+        order = np.argsort(live_keys, kind='stable')
+        keys = live_keys[order]
+
+        wx, wy = self.x[walkers], self.y[walkers]
+        wbx = np.clip((wx // size).astype(np.int64), 0, bcols - 1)
+        wby = np.clip((wy // size).astype(np.int64), 0, brows - 1)
+        owners, others = [], []
+        for oy in (-1, 0, 1):
+            for ox in (-1, 0, 1):
+                qx, qy = wbx + ox, wby + oy
+                valid = (qx >= 0) & (qx < bcols) & (qy >= 0) & (qy < brows)
+                key = (walker_halls * brows + qy) * bcols + qx
+                lo = np.searchsorted(keys, key, 'left')
+                hi = np.searchsorted(keys, key, 'right')
+                lens = np.where(valid, hi - lo, 0)
+                total = int(lens.sum())
+                if total == 0:
+                    continue
+                owner = np.repeat(np.arange(len(walkers)), lens)
+                first = np.repeat(lo - np.cumsum(lens) + lens, lens)
+                owners.append(owner)
+                others.append(order[first + np.arange(total)])
+
+        n = len(walkers)
+        if not owners:
+            return np.zeros(n, dtype=np.int64), np.zeros(n), np.zeros(n)
+        owner = np.concatenate(owners)
+        other = np.concatenate(others)
+        ax = wx[owner] - lx[other]
+        ay = wy[owner] - ly[other]
+        d2 = ax * ax + ay * ay
+        near = (d2 > 0) & (d2 < radius * radius)
+        owner, ax, ay, d2 = owner[near], ax[near], ay[near], d2[near]
+        d = np.sqrt(d2)
+        push = (radius - d) / radius / d
+        return (np.bincount(owner, minlength=n),
+                np.bincount(owner, ax * push, minlength=n),
+                np.bincount(owner, ay * push, minlength=n))
+
+    def _separation_dense(self, walkers, live):
+        """All-pairs separation; cheaper than bucketing for small crowds."""
+        radius = self.config.avoidance_radius
+        ax = self.x[walkers][:, None] - self.x[live][None, :]
+        ay = self.y[walkers][:, None] - self.y[live][None, :]
+        d2 = ax * ax + ay * ay
+        near = (d2 > 0) & (d2 < radius * radius)
+        live_halls = self._halls(live)
+        if live_halls is not None:
+            near &= self._halls(walkers)[:, None] == live_halls[None, :]
+        d = np.sqrt(np.where(near, d2, 1.0))
+        push = np.where(near, (radius - d) / radius / d, 0.0)
+        return near.sum(axis=1), (ax * push).sum(axis=1), (ay * push).sum(axis=1)
+
+
+class Simulation(Crowd):
+    """Batched headless fill of one auditorium.
+
+    With a ``schedule`` (``(seats, entrances)`` sequences, e.g. from
+    ``optimizer.optimize_schedule``) the k-th student takes ``seats[k]`` via
+    ``entrances[k]`` instead of a random seat and entrance. ``columns`` (the
+    ``AGENT_COLUMNS`` plus ``speed``) and ``routes`` let ``BatchSimulation``
+    keep several halls' agents in shared arrays; by default the hall owns its
+    own.
+    """
+
+    def __init__(self, config=None, seed=None, schedule=None, columns=None, routes=None):
+        self.config = config or SimConfig()
+        self.rng = np.random.default_rng(seed)
+        self.schedule = schedule
+        cfg = self.config
+
+        self.cell_type, self.seats = build_grid(cfg)
+        flat_type = self.cell_type.ravel()
+        n = len(self.seats)
+        if columns is None:
+            columns = {name: np.zeros(n, dtype=dtype) for name, dtype in AGENT_COLUMNS}
+            columns['speed'] = np.zeros(flat_type.shape)
+        self.occupied = np.zeros(flat_type.shape, dtype=bool)
+        self.cost = cell_cost(flat_type, self.occupied).tolist()
+        self.speed = columns['speed']
+        self.speed[:] = np.where(flat_type == SEAT, cfg.speed_empty_seat, cfg.speed_aisle)
+        self.seat_offset = np.where(flat_type == SEAT, cfg.seat_y_offset, 0.0)
+
+        exits, entries = build_moves(self.cell_type)
+        self.fields = [CostField(y * cfg.cols + x, self.cost, exits, entries) for x, y in cfg.entrances]
+
+        self.seat_cell = self.seats[:, 1] * cfg.cols + self.seats[:, 0]
+        self.seat_assigned = np.zeros(n, dtype=bool)
+        self.seat_lookup = {(int(x), int(y)): k for k, (x, y) in enumerate(self.seats)}
+        # All unassigned seats, and those of them with no taken seat beside them
+        self.free_seats = SeatPool(n)
+        self.spaced_seats = SeatPool(n)
+
+        # Agent columns; one agent per seat at most
+        for name, _ in AGENT_COLUMNS:
+            setattr(self, name, columns[name])
+        self.routes = routes or RouteBuffer(max(n * 8, 64))
+
+        self.agents = 0
+        self.seated = 0
+        self.time = 0.0
+        self.ticks = 0
+        self.spawn_timer = 0.0
+
+    # --- seat assignment ---
+    def _pick_seat(self):
+        if not len(self.free_seats):
+            return None
+        if self.schedule is not None:
+            return int(self.schedule[0][self.agents])
+        # Prefer seats with no taken neighbour; once none are left, any free seat
+        pool = self.spaced_seats if len(self.spaced_seats) else self.free_seats
+        target = pool.draw(self.rng.random())
+
+        # Friend rule: 1/friend_chance to sit next to the previous student
+        if self.agents > 0 and self.rng.integers(self.config.friend_chance) == 0:
+            rx, ry = self.seats[self.seat[self.agents - 1]]
+            for nx in (rx - 1, rx + 1):
+                k = self.seat_lookup.get((int(nx), int(ry)))
+                if k is not None and not self.seat_assigned[k]:
+                    target = k
+                    break
+        return target
+
+    def spawn(self):
+        seat = self._pick_seat()
+        if seat is None:
+            return
+        cfg = self.config
+        self._take_seat(seat)
+        a = self.agents
+        self.agents += 1
+
+        if self.schedule is not None:
+            e = int(self.schedule[1][a])
+        else:
+            e = int(self.rng.integers(len(cfg.entrances)))
+        ex, ey = cfg.entrances[e]
+        field_ = self.fields[e]
+        path = field_.path_to(int(self.seat_cell[seat]))
+        self.path_start[a] = self.routes.append(path)
+        self.path_len[a] = len(path)
+
+        self.x[a] = ex * cfg.cell_size + cfg.cell_size / 2
+        self.y[a] = ey * cfg.cell_size + cfg.cell_size / 2 + cfg.render_offset_y
+        self.state[a] = ENTERING
+        self.delay[a] = cfg.entry_delay[0] + self.rng.random() * (cfg.entry_delay[1] - cfg.entry_delay[0])
+        self.seat[a] = seat
+        self.entrance[a] = e
+        self.path_cost[a] = field_.dist[int(self.seat_cell[seat])]
+        self.path_pos[a] = 0
+
+    def _take_seat(self, seat):
+        self.seat_assigned[seat] = True
+        self.free_seats.remove(seat)
+        self.spaced_seats.remove(seat)
+        x, y = self.seats[seat]
+        for nx in (x - 1, x + 1):
+            k = self.seat_lookup.get((int(nx), int(y)))
+            if k is not None:
+                self.spaced_seats.remove(k)
+
+    def _occupy(self, seat):
+        cfg = self.config
+        cell = int(self.seat_cell[seat])
+        self.occupied[cell] = True
+        self.cost[cell] = 4.0
+        self.speed[cell] = cfg.speed_occupied_seat
+        for field_ in self.fields:
+            field_.cell_changed(cell)
+
+    # --- tick ---
+    def _tile_speed(self, agents, cells):
+        return self.speed[cells]
+
+    def _seat_walkers(self, done):
+        for a in done:
+            self._occupy(int(self.seat[a]))
+        self.seated += len(done)
+
+    def step(self, dt):
+        cfg = self.config
+        if self.agents < len(self.seats):
+            self.spawn_timer += dt
+            if self.spawn_timer > cfg.spawn_interval:
+                self.spawn_timer = 0.0
+                self.spawn()
+
+        self._advance(np.flatnonzero(self.state[:self.agents] != SEATED), dt)
+        self.time += dt
+        self.ticks += 1
+
+    def run(self, dt=1 / 60, max_time=3600.0):
+        """Step until every seat is filled (or ``max_time``) and summarise.
+
+        Cost grows with simulated time, not seats: one tick per ``dt``. To
+        fill many seeds at once, use ``BatchSimulation``.
+        """
+        while self.seated < len(self.seats) and self.time < max_time:
+            self.step(dt)
+        return self.result()
+
+    def result(self):
+        """``SimResult`` of the fill so far."""
+        costs = self.path_cost[:self.agents]
+        return SimResult(
+            fill_time=self.time,
+            ticks=self.ticks,
+            seated=self.seated,
+            seats=len(self.seats),
+            mean_path_cost=float(costs.mean()) if len(costs) else 0.0,
+            entrance_counts=np.bincount(self.entrance[:self.agents], minlength=len(self.config.entrances)).tolist(),
+        )
+
+
+class BatchSimulation(Crowd):
+    """Fills of one layout for several seeds, stepped together.
+
+    Each seed gets its own ``Simulation`` hall for seat choice, spawning and
+    cost-field repairs, but the halls' agents live side by side in shared
+    columns, so one tick moves and separates every hall with the same few
+    NumPy calls, so the cost per fill falls as seeds are added. Each hall
+    draws from its own seeded generator in the same order as a lone
+    ``Simulation``, so its result matches ``simulate`` with that seed.
+    """
+
+    def __init__(self, config=None, seeds=(0,), schedule=None):
+        self.config = config or SimConfig()
+        cfg = self.config
+        size = cfg.rows * cfg.cols
+        _, seats = build_grid(cfg)
+        n = len(seats)
+        count = len(seeds)
+        self.hall_seats = n
+        self.hall_cells = size
+        self.columns = {name: np.zeros((count, n), dtype=dtype) for name, dtype in AGENT_COLUMNS}
+        self.columns['state'][:] = SEATED  # Slots nobody has spawned into yet are left alone
+        self.columns['speed'] = np.zeros((count, size))
+        for name, _ in AGENT_COLUMNS:
+            setattr(self, name, self.columns[name].reshape(-1))
+        self.speed = self.columns['speed'].reshape(-1)
+        self.routes = RouteBuffer(max(count * n * 8, 64))
+        self.halls = [Simulation(cfg, seed, schedule, {name: column[h] for name, column in self.columns.items()},
+                                 self.routes)
+                      for h, seed in enumerate(seeds)]
+        self.seat_offset = self.halls[0].seat_offset
+        self.filled = []  # Halls in the order they filled
+        self.time = 0.0
+        self.ticks = 0
+        self.spawn_timer = 0.0
+
+    def _halls(self, agents):
+        return agents // self.hall_seats
+
+    def _tile_speed(self, agents, cells):
+        return self.speed[self._halls(agents) * self.hall_cells + cells]
+
+    def _separation(self, walkers, live):
+        """All-pairs separation per hall, as one (halls, walkers, live) block.
+
+        Each hall's walkers and students are padded to the busiest hall's
+        counts; past ``DENSE_PAIR_LIMIT`` pairs per hall the bucketed query
+        takes over.
+        """
+        halls = len(self.halls)
+        walker_halls, live_halls = self._halls(walkers), self._halls(live)
+        walker_counts = np.bincount(walker_halls, minlength=halls)
+        live_counts = np.bincount(live_halls, minlength=halls)
+        width, depth = int(walker_counts.max()), int(live_counts.max())
+        if width * depth > DENSE_PAIR_LIMIT:
+            return super()._separation(walkers, live)
+
+        # Column of each agent within its hall's row; both lists are sorted by hall
+        walker_col = np.arange(len(walkers)) - np.repeat(np.cumsum(walker_counts) - walker_counts, walker_counts)
+        live_col = np.arange(len(live)) - np.repeat(np.cumsum(live_counts) - live_counts, live_counts)
+        radius = self.config.avoidance_radius
+        # Padding sits far outside every hall, so it never counts as near
+        lx = np.full((halls, depth), -1e9)
+        ly = np.full((halls, depth), -1e9)
+        lx[live_halls, live_col] = self.x[live]
+        ly[live_halls, live_col] = self.y[live]
+        wx = self.x[walkers][:, None]
+        wy = self.y[walkers][:, None]
+        ax = wx - lx[walker_halls]
+        ay = wy - ly[walker_halls]
+        d2 = ax * ax + ay * ay
+        near = (d2 > 0) & (d2 < radius * radius)
+        d = np.sqrt(np.where(near, d2, 1.0))
+        push = np.where(near, (radius - d) / radius / d, 0.0)
+        return near.sum(axis=1), (ax * push).sum(axis=1), (ay * push).sum(axis=1)
+
+    def _seat_walkers(self, done):
+        for a, h in zip((done % self.hall_seats).tolist(), self._halls(done).tolist()):
+            hall = self.halls[h]
+            hall._occupy(int(hall.seat[a]))
+            hall.seated += 1
+            if hall.seated == self.hall_seats:
+                self.filled.append(hall)
+
+    def step(self, dt):
+        # Every hall spawns on the same ticks, as its own Simulation would
+        if self.halls[0].agents < self.hall_seats:
+            self.spawn_timer += dt
+            if self.spawn_timer > self.config.spawn_interval:
+                self.spawn_timer = 0.0
+                for hall in self.halls:
+                    hall.spawn()
+
+        filled = len(self.filled)
+        self._advance(np.flatnonzero(self.state != SEATED), dt)
+        self.time += dt
+        self.ticks += 1
+        # A hall's clock stops on the tick its last student sits down
+        for hall in self.filled[filled:]:
+            hall.time, hall.ticks = self.time, self.ticks
+
+    def run(self, dt=1 / 60, max_time=3600.0):
+        """Step until every hall is filled (or ``max_time``); one ``SimResult`` per seed."""
+        while len(self.filled) < len(self.halls) and self.time < max_time:
+            self.step(dt)
+        for hall in self.halls:
+            if hall.seated < self.hall_seats:
+                hall.time, hall.ticks = self.time, self.ticks
+        return [hall.result() for hall in self.halls]
+
+
+def simulate(config=None, seed=None, dt=1 / 60, schedule=None):
+    """Run one full fill and return its ``SimResult``."""
+    return Simulation(config, seed, schedule).run(dt)
+
+
+def simulate_many(config=None, seeds=(0,), dt=1 / 60, schedule=None):
+    """Full fills for every seed in one batched run; a ``SimResult`` per seed."""
+    return BatchSimulation(config, seeds, schedule).run(dt)
+
+
+if __name__ == '__main__':
+    import time
+
+    start = time.perf_counter()
+    result = simulate(seed=0)
+    print(f'{result.seated}/{result.seats} seated in {result.fill_time:.1f}s simulated '
+          f'({result.ticks} ticks, {time.perf_counter() - start:.2f}s wall)')
+    seeds = range(64)
+    start = time.perf_counter()
+    results = simulate_many(seeds=seeds)
+    wall = time.perf_counter() - start
+    print(f'{len(results)} seeds batched: mean fill {np.mean([r.fill_time for r in results]):.1f}s simulated, '
+          f'{wall:.2f}s wall ({wall / len(results) * 1000:.0f} ms per fill)')
@@ -0,0 +1,3474 @@
+// Engine core: simulation and rendering. It runs either in the page or inside
+// a Web Worker (see seating_worker.js) and never touches the DOM directly.
+// Served as a static asset; per-session layout and config arrive as
+// self.SEATING_SESSION = { layout, config, grid, schedule } before this
+// script runs, grid being the layout as compiled by layout.py. Later config
+// and schedule changes come through updateSession().
+
+// --- Configuration ---
+const CONFIG = {
+    cols: 32, // Grid columns
+    rows: 20, // Grid rows
+    cellSize: 25,
+    seatTotal: 250,
+    frontRows: 2, // Professor area at the top of the grid
+    backRows: 2, // Entrance area at the bottom of the grid
+    seatBlocks: [[2, 9], [12, 20], [23, 30]], // Inclusive x ranges of the seat blocks
+    aisleRows: [], // Cross aisles: rows inside the seating area kept free of seats
+    curve: 0, // Cells the seat rows bow toward the back at the centre (compiled by layout.py)
+    entrances: [
+        {x: 2, y: 19},  // Left Back
+        {x: 16, y: 19}, // Center Back
+        {x: 29, y: 19}  // Right Back
+    ],
+    seatYOffset: 6, // Lower seats within their cell for better visual alignment
+    speeds: {
+        aisle: 2.0,
+        emptySeat: 1.5, // 75%
+        occupiedSeat: 0.5 // 25%
+    },
+    avoidanceRadius: 22, // Pixel radius for collision separation
+    avoidanceWeight: 0.6,
+    renderOffsetY: 30, // Shift entire seating grid downward for better centering
+    paletteSize: 12, // Student colours; draw calls scale with this, not with students
+    pathFocusRadius: 120, // Pixel radius around the cursor in "paths near cursor" mode
+    fixedStep: 1 / 60, // Simulation step in seconds, independent of frame rate
+    maxFrameDelta: 0.1, // Clamp on real frame time so tab stalls can't tunnel students
+    fastForwardBudgetMs: 12, // Wall time per frame spent stepping in "to end" mode
+    frameBudgetMs: 16.6, // Work per frame the governor keeps drawing within; 0 turns it off
+    profileInterval: 2, // Seconds between profiler snapshots sent to the host
+    spawnInterval: 0.5,
+    admission: {
+        enabled: false, // Adapt the spawn interval and entrance choice to congestion
+        minInterval: 0.1, // Spawn interval bounds in seconds
+        maxInterval: 2,
+        doorRadius: 2, // Cells around an entrance counted as its crowd
+        doorCapacity: 4, // Crowd at which a door stops taking more students
+        doorClearTime: 0.75, // Seconds each student ahead adds at the door
+        aisleDensity: 0.25 // Walkers per aisle cell the aisles can carry
+    },
+    reservation: {
+        enabled: false, // Plan walkers around each other in space and time instead of pushing apart
+        slotTime: 0.1, // Seconds per reservation table slot
+        window: 32 // Slots each cooperative plan looks ahead
+    },
+    seatPolicy: 'spacing', // Key of SEAT_POLICIES
+    recordReplay: true, // Keep a scrubbable trace of each run (see ReplayRecorder)
+    heatmapRefresh: 0.25, // Seconds between repaints of the congestion overlay
+    hierarchyMinCells: 4096, // From this grid size on, paths come from the cluster planner
+    clusterSpan: 16, // Longest side of a planner cluster in cells
+    useWorker: true // Run the engine in a Web Worker with an OffscreenCanvas when supported
+};
+
+const CONFIG_DEFAULTS = JSON.stringify(CONFIG);
+
+// Apply the session's layout and config over the defaults; nested objects
+// (speeds, admission, reservation) merge one level deep
+function applySession(session) {
+    Object.assign(CONFIG, JSON.parse(CONFIG_DEFAULTS));
+    [session.layout, session.config].forEach(overrides => {
+        Object.entries(overrides || {}).forEach(([key, value]) => {
+            const current = CONFIG[key];
+            CONFIG[key] = current && typeof current === 'object' && !Array.isArray(current)
+                ? Object.assign({}, current, value)
+                : value;
+        });
+    });
+}
+
+applySession(self.SEATING_SESSION || {});
+
+// --- Utility helpers ---
+const gridCenterX = (x) => x * CONFIG.cellSize + CONFIG.cellSize / 2;
+const gridCenterY = (y) => y * CONFIG.cellSize + CONFIG.cellSize / 2 + CONFIG.renderOffsetY;
+const gridOriginX = (x) => x * CONFIG.cellSize;
+const gridOriginY = (y) => y * CONFIG.cellSize + CONFIG.renderOffsetY;
+const pixelToGridX = (x) => Math.floor(x / CONFIG.cellSize);
+const pixelToGridY = (y) => Math.floor((y - CONFIG.renderOffsetY) / CONFIG.cellSize);
+
+// Bounded student palette so paths and dots can be batched per colour
+const PALETTE = Array.from({ length: CONFIG.paletteSize },
+    (_, i) => `hsl(${Math.round(i * 360 / CONFIG.paletteSize)}, 70%, 50%)`);
+
+// --- Seeded PRNG (mulberry32) ---
+// All simulation randomness goes through rng() so a seed reproduces a run.
+function createRng(seed) {
+    let a = seed >>> 0;
+    return function() {
+        a = (a + 0x6D2B79F5) | 0;
+        let t = Math.imul(a ^ (a >>> 15), 1 | a);
+        t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+// --- Game State ---
+let canvas, ctx;
+let grid = [];
+let seats = [];
+let isRunning = false;
+let isPaused = false;
+let animationId;
+let seatedCount = 0;
+let spawnTimer = 0;
+let lastTime = 0;
+let simTime = 0; // Simulated seconds, advanced only in fixed steps
+let simTick = 0; // Fixed steps taken this run
+let accumulator = 0;
+let simSpeed = 1; // Simulated seconds per real second, or Infinity for "to end"
+let rng = createRng(1);
+let currentSeed = 1;
+let failTriggered = false;
+let firstSeatDeadline = 10; // Simulated seconds a run may go with nobody seated (see firstSeatTimeout)
+let lastReportedSecond = -1;
+let pathCostSum = 0; // Run statistics reported when a run ends
+let peakWalkers = 0;
+
+// Entrances (Grid coordinates)
+const ENTRANCES = CONFIG.entrances;
+
+// Compiled layout from layout.py, set as self.SEATING_GRID by the layout
+// script loaded before this file: cell codes packed 2 bits per cell, the seat
+// cells in row-major order and CSR move tables that already apply the
+// side-entry rule. Like the layout itself it is fixed once loaded.
+function decodeBytes(text) {
+    const binary = atob(text);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    return bytes;
+}
+
+function decodeInt32(text) {
+    const bytes = decodeBytes(text);
+    return new Int32Array(bytes.buffer, 0, bytes.length >> 2);
+}
+
+function loadLayout(compiled) {
+    if (!compiled) throw new Error('No compiled layout loaded (see layout.py)');
+    const packed = decodeBytes(compiled.cells);
+    const cells = new Uint8Array(CONFIG.cols * CONFIG.rows);
+    for (let i = 0; i < cells.length; i++) cells[i] = (packed[i >> 2] >> ((i & 3) * 2)) & 3;
+    return {
+        key: compiled.key,
+        cells,
+        seats: decodeInt32(compiled.seats),
+        exitStart: decodeInt32(compiled.exitOffsets),
+        exits: decodeInt32(compiled.exits),
+        entryStart: decodeInt32(compiled.entryOffsets),
+        entries: decodeInt32(compiled.entries)
+    };
+}
+
+const LAYOUT = loadLayout(self.SEATING_GRID);
+
+// Optional planned arrivals from optimizer.py for the 'planned' seat policy:
+// the k-th student takes seats[k] through entrances[k]
+let SCHEDULE = (self.SEATING_SESSION || {}).schedule || null;
+let pendingSession = null; // From updateSession, applied when the next run starts
+
+class Node {
+    constructor(x, y, type) {
+        this.x = x;
+        this.y = y;
+        this.type = type; // 'aisle', 'seat', 'wall', 'front'
+        this.occupied = false;
+    }
+    
+    getCost() {
+        if (this.type === 'aisle' || this.type === 'front') return 1;
+        if (this.type === 'seat') return this.occupied ? 4 : 1.3; // Higher cost for occupied
+        return 100; // Wall
+    }
+}
+
+// --- Students ---
+// Struct-of-arrays store: one typed-array column per field and routes packed
+// as cell indices into one shared buffer. Seated students are swap-removed
+// from the active list, and all memory is kept and reused across runs.
+const STUDENT_ENTERING = 0;
+const STUDENT_MOVING = 1;
+const STUDENT_SEATED = 2;
+
+class StudentStore {
+    constructor(capacity) {
+        this.capacity = 0;
+        this.count = 0;          // Students spawned this run
+        this.activeCount = 0;    // Students not yet seated
+        this.pathBuffer = new Int32Array(4096);
+        this.pathDepart = new Int32Array(4096); // Scheduled ticks per route entry (see planWindow)
+        this.pathArrive = new Int32Array(4096);
+        this.pathUsed = 0;
+        this.grow(capacity);
+    }
+
+    grow(capacity) {
+        const resize = (column, Type) => {
+            const next = new Type(capacity);
+            if (column) next.set(column.subarray(0, Math.min(column.length, capacity)));
+            return next;
+        };
+        this.x = resize(this.x, Float32Array);
+        this.y = resize(this.y, Float32Array);
+        this.gridX = resize(this.gridX, Int32Array);
+        this.gridY = resize(this.gridY, Int32Array);
+        this.state = resize(this.state, Uint8Array);
+        this.entryDelay = resize(this.entryDelay, Float32Array);
+        this.colorIndex = resize(this.colorIndex, Uint8Array);
+        this.entrance = resize(this.entrance, Uint8Array);
+        this.seat = resize(this.seat, Int32Array);           // Index into seats
+        this.pathStart = resize(this.pathStart, Int32Array); // Offset into pathBuffer
+        this.pathLength = resize(this.pathLength, Int32Array);
+        this.pathIndex = resize(this.pathIndex, Int32Array);
+        this.pathCost = resize(this.pathCost, Float32Array);
+        this.routeSearch = resize(this.routeSearch, Int32Array); // Index into routeSearches, or -1
+        this.scheduleEnd = resize(this.scheduleEnd, Int32Array); // Route entries with reserved times
+        this.waitUntil = resize(this.waitUntil, Int32Array); // Tick before which no plan is tried
+        this.stalls = resize(this.stalls, Uint8Array); // Plans in a row that got no closer
+        this.active = resize(this.active, Int32Array);
+        this.activeSlot = resize(this.activeSlot, Int32Array);
+        this.capacity = capacity;
+    }
+
+    reset(capacity) {
+        if (capacity > this.capacity) this.grow(capacity);
+        this.count = 0;
+        this.activeCount = 0;
+        this.pathUsed = 0;
+    }
+
+    // Returns the buffer offset of `length` free path slots
+    reservePath(length) {
+        if (this.pathUsed + length > this.pathBuffer.length) {
+            const capacity = Math.max(this.pathBuffer.length * 2, this.pathUsed + length);
+            const resize = (buffer) => {
+                const next = new Int32Array(capacity);
+                next.set(buffer.subarray(0, this.pathUsed));
+                return next;
+            };
+            this.pathBuffer = resize(this.pathBuffer);
+            this.pathDepart = resize(this.pathDepart);
+            this.pathArrive = resize(this.pathArrive);
+        }
+        const offset = this.pathUsed;
+        this.pathUsed += length;
+        return offset;
+    }
+
+    add() {
+        if (this.count === this.capacity) this.grow(this.capacity * 2);
+        const id = this.count++;
+        this.activeSlot[id] = this.activeCount;
+        this.active[this.activeCount++] = id;
+        return id;
+    }
+
+    // Swap-remove a seated student from the active list
+    retire(id) {
+        const slot = this.activeSlot[id];
+        const last = this.active[--this.activeCount];
+        this.active[slot] = last;
+        this.activeSlot[last] = slot;
+        this.activeSlot[id] = -1;
+    }
+}
+
+let students = new StudentStore(CONFIG.seatTotal);
+
+const cellCenterX = (cell) => gridCenterX(cell % CONFIG.cols);
+const cellCenterY = (cell) => gridCenterY((cell / CONFIG.cols) | 0) +
+    (pathEngine.type[cell] === CELL_SEAT ? CONFIG.seatYOffset : 0);
+
+function spawnStudent(seatIndex, entranceIndex) {
+    profiler.enter(PHASE_SPAWN);
+    const id = placeStudent(seatIndex, entranceIndex);
+    addRoute(id);
+    if (CONFIG.reservation.enabled) {
+        planWindow(id, simTick + Math.ceil(students.entryDelay[id] / CONFIG.fixedStep));
+    }
+    recorder.spawn(id, seatIndex, entranceIndex, students.colorIndex[id], students.x[id], students.y[id]);
+    profiler.leave();
+    return id;
+}
+
+// Add a student at the entrance with its initial route
+function placeStudent(seatIndex, entranceIndex) {
+    const store = students;
+    const id = store.add();
+    const seat = seats[seatIndex];
+
+    const entrance = ENTRANCES[entranceIndex];
+    store.x[id] = gridCenterX(entrance.x);
+    store.y[id] = gridCenterY(entrance.y);
+    store.gridX[id] = entrance.x;
+    store.gridY[id] = entrance.y;
+    store.entrance[id] = entranceIndex;
+    store.seat[id] = seatIndex;
+    store.state[id] = STUDENT_ENTERING;
+    // From the id, so colours repeat with the seed and take no rng draw
+    store.colorIndex[id] = (Math.imul(id + 1, 0x9E3779B1) >>> 0) % PALETTE.length;
+    store.entryDelay[id] = 0.5 + rng() * 0.5;
+
+    // Initial path is a backtrace through the entrance's cost field,
+    // or a hierarchical search on grids too large for per-entrance fields
+    profiler.enter(PHASE_PATH);
+    if (planner) {
+        const cells = planner.search(entrance.x, entrance.y, seat.x, seat.y);
+        profiler.countSearch(planner.lastExpanded);
+        const offset = store.reservePath(cells.length);
+        store.pathBuffer.set(cells, offset);
+        store.pathStart[id] = offset;
+        store.pathLength[id] = cells.length;
+        store.pathCost[id] = planner.lastCost;
+    } else {
+        const field = entranceFields[entranceIndex];
+        const length = field.pathLength(seat.x, seat.y);
+        const offset = store.reservePath(length);
+        field.writePath(seat.x, seat.y, store.pathBuffer, offset);
+        store.pathStart[id] = offset;
+        store.pathLength[id] = length;
+        store.pathCost[id] = field.costTo(seat.x, seat.y);
+    }
+    profiler.leave();
+    store.pathIndex[id] = 0;
+    store.routeSearch[id] = -1;
+    store.scheduleEnd[id] = 0;
+    store.waitUntil[id] = 0;
+    store.stalls[id] = 0;
+    return id;
+}
+
+// Re-plan from the cell the student is heading for, which stays first on the
+// route. The first re-plan of a student on a small grid starts a RouteSearch
+// that later repairs reuse; planner grids search the cluster graph again.
+function recalculatePath(id) {
+    const store = students;
+    const seat = seats[store.seat[id]];
+    const start = routeWaypoint(id);
+    let cells;
+    if (planner) {
+        cells = planner.search(start % CONFIG.cols, (start / CONFIG.cols) | 0, seat.x, seat.y);
+        profiler.countSearch(planner.lastExpanded);
+    } else {
+        const search = acquireRouteSearch(id);
+        search.plan(start, seat.y * CONFIG.cols + seat.x);
+        profiler.countSearch(search.lastExpanded);
+        cells = search.route();
+    }
+    setRoute(id, start, cells);
+}
+
+function updateStudent(id, dt) {
+    const store = students;
+    if (store.state[id] === STUDENT_SEATED) return;
+    if (CONFIG.reservation.enabled) {
+        followSchedule(id);
+        return;
+    }
+
+    // Entrance delay
+    if (store.state[id] === STUDENT_ENTERING) {
+        store.entryDelay[id] -= dt;
+        if (store.entryDelay[id] > 0) return;
+        store.state[id] = STUDENT_MOVING;
+    }
+
+    if (store.pathLength[id] === 0) return;
+
+    const x = store.x[id];
+    const y = store.y[id];
+    const targetCell = store.pathBuffer[store.pathStart[id] + store.pathIndex[id]];
+    const targetX = cellCenterX(targetCell);
+    const targetY = cellCenterY(targetCell);
+
+    const dx = targetX - x;
+    const dy = targetY - y;
+    const dist = Math.sqrt(dx*dx + dy*dy) || 0.0001;
+
+    // Determine speed based on current tile
+    const currentGridX = pixelToGridX(x);
+    const currentGridY = pixelToGridY(y);
+    let speed = CONFIG.speeds.aisle;
+
+    if (currentGridX >= 0 && currentGridX < CONFIG.cols && currentGridY >= 0 && currentGridY < CONFIG.rows) {
+        const node = grid[currentGridY][currentGridX];
+        if (node.type === 'seat') {
+            speed = node.occupied ? CONFIG.speeds.occupiedSeat : CONFIG.speeds.emptySeat;
+        }
+    }
+
+    // Move
+    let moveStep = Math.max(speed * dt * 60, 0.05); // Normalize to frame rate, avoid micro-steps
+
+    // Separation-based collision avoidance to keep students flowing instead of stopping
+    let avoidanceX = 0;
+    let avoidanceY = 0;
+    let avoidanceCount = 0;
+
+    profiler.enter(PHASE_AVOIDANCE);
+    const radius = CONFIG.avoidanceRadius;
+    const hash = walkerHash;
+    const bx = hash.bucketX(x);
+    const by = hash.bucketY(y);
+    for (let qy = Math.max(by - 1, 0); qy <= Math.min(by + 1, hash.rows - 1); qy++) {
+        for (let qx = Math.max(bx - 1, 0); qx <= Math.min(bx + 1, hash.cols - 1); qx++) {
+            for (let k = hash.head[qy * hash.cols + qx]; k !== -1; k = hash.next[k]) {
+                const other = hash.items[k];
+                if (other === id || store.state[other] === STUDENT_SEATED) continue;
+                const ax = x - store.x[other];
+                const ay = y - store.y[other];
+                const d2 = ax*ax + ay*ay;
+                if (d2 > 0 && d2 < radius * radius) {
+                    const d = Math.sqrt(d2);
+                    const strength = (radius - d) / radius;
+                    avoidanceX += (ax / d) * strength;
+                    avoidanceY += (ay / d) * strength;
+                    avoidanceCount++;
+                }
+            }
+        }
+    }
+    profiler.leave();
+
+    if (dist < moveStep) {
+        reachWaypoint(id, targetCell);
+        return;
+    }
+
+    if (avoidanceCount > 0) {
+        const weight = CONFIG.avoidanceWeight;
+        const desiredX = dx / dist + (avoidanceX / avoidanceCount) * weight;
+        const desiredY = dy / dist + (avoidanceY / avoidanceCount) * weight;
+        const desiredLen = Math.sqrt(desiredX*desiredX + desiredY*desiredY) || 1;
+        store.x[id] = x + (desiredX / desiredLen) * moveStep;
+        store.y[id] = y + (desiredY / desiredLen) * moveStep;
+    } else {
+        store.x[id] = x + (dx / dist) * moveStep;
+        store.y[id] = y + (dy / dist) * moveStep;
+    }
+
+    store.gridX[id] = pixelToGridX(store.x[id]);
+    store.gridY[id] = pixelToGridY(store.y[id]);
+}
+
+// Snap onto the route cell the student was walking to; sit down at the end
+function reachWaypoint(id, cell) {
+    const store = students;
+    store.x[id] = cellCenterX(cell);
+    store.y[id] = cellCenterY(cell);
+    store.gridX[id] = cell % CONFIG.cols;
+    store.gridY[id] = (cell / CONFIG.cols) | 0;
+    store.pathIndex[id]++;
+    routeLoad[cell]--;
+
+    if (store.pathIndex[id] >= store.pathLength[id]) {
+        const seat = seats[store.seat[id]];
+        store.state[id] = STUDENT_SEATED;
+        store.retire(id);
+        releaseRouteSearch(id);
+        if (CONFIG.reservation.enabled) releaseReservations(id);
+        recorder.seated(id, seat.index);
+        markSeatOccupied(seat.node);
+        markSeatDirty(seat);
+        seatedCount++;
+        host.progress(seatedCount, seats.length);
+    }
+}
+
+// Cooperative movement: walk the reserved part of the route on its schedule,
+// straight from cell centre to cell centre, and plan the next window once it
+// runs out. The reservations keep walkers apart, so no avoidance force applies.
+function followSchedule(id) {
+    const store = students;
+    if (store.pathLength[id] === 0) return;
+    if (store.pathIndex[id] >= store.scheduleEnd[id]) {
+        if (simTick < store.waitUntil[id] || !planWindow(id, simTick)) return;
+    }
+
+    const k = store.pathStart[id] + store.pathIndex[id];
+    const depart = store.pathDepart[k];
+    if (simTick <= depart) return; // At the door or waiting for a cell to clear
+    store.state[id] = STUDENT_MOVING;
+    const cell = store.pathBuffer[k];
+    const arrive = store.pathArrive[k];
+    if (simTick >= arrive) {
+        reachWaypoint(id, cell);
+        return;
+    }
+    const from = store.gridY[id] * CONFIG.cols + store.gridX[id];
+    const t = (simTick - depart) / (arrive - depart);
+    store.x[id] = cellCenterX(from) + (cellCenterX(cell) - cellCenterX(from)) * t;
+    store.y[id] = cellCenterY(from) + (cellCenterY(cell) - cellCenterY(from)) * t;
+}
+
+// Append the remaining route of a student to a shared Path2D. With a focus
+// point only segments that touch the focus radius are added.
+function traceStudentPath(id, path, focus) {
+    const store = students;
+    const end = store.pathStart[id] + store.pathLength[id];
+    let i = store.pathStart[id] + store.pathIndex[id];
+    if (i >= end) return;
+
+    // Snap starting point to the current grid center so the path remains
+    // perfectly vertical/horizontal instead of angling from the student's
+    // in-between position.
+    const gx = store.gridX[id];
+    const gy = store.gridY[id];
+    const startNode = grid[gy] ? grid[gy][gx] : null;
+    const startYOffset = startNode && startNode.type === 'seat' ? CONFIG.seatYOffset : 0;
+    let prevX = gridCenterX(gx);
+    let prevY = gridCenterY(gy) + startYOffset;
+    let penDown = false;
+    const r2 = CONFIG.pathFocusRadius * CONFIG.pathFocusRadius;
+    for (; i < end; i++) {
+        const cell = store.pathBuffer[i];
+        const nextX = cellCenterX(cell);
+        const nextY = cellCenterY(cell);
+        const visible = !focus ||
+            (prevX - focus.x) ** 2 + (prevY - focus.y) ** 2 < r2 ||
+            (nextX - focus.x) ** 2 + (nextY - focus.y) ** 2 < r2;
+        if (visible) {
+            if (!penDown) path.moveTo(prevX, prevY);
+            path.lineTo(nextX, nextY);
+        }
+        penDown = visible;
+        prevX = nextX;
+        prevY = nextY;
+    }
+}
+
+// --- Collision Avoidance ---
+// Uniform bucket grid over walking students, rebuilt once per tick.
+// Buckets are at least one avoidance radius wide, so a neighbour query
+// only needs the 3x3 block of buckets around a student.
+class SpatialHash {
+    constructor(bucketSize, width, height) {
+        this.bucketSize = bucketSize;
+        this.cols = Math.ceil(width / bucketSize);
+        this.rows = Math.ceil(height / bucketSize);
+        this.head = new Int32Array(this.cols * this.rows).fill(-1);
+        this.next = new Int32Array(64);
+        this.items = new Int32Array(64); // Student ids
+    }
+
+    bucketX(x) {
+        return Math.min(Math.max(Math.floor(x / this.bucketSize), 0), this.cols - 1);
+    }
+
+    bucketY(y) {
+        return Math.min(Math.max(Math.floor(y / this.bucketSize), 0), this.rows - 1);
+    }
+
+    // Bucket every active (not seated) student of a StudentStore
+    rebuild(store) {
+        const count = store.activeCount;
+        this.head.fill(-1);
+        if (this.next.length < count) {
+            this.next = new Int32Array(count * 2);
+            this.items = new Int32Array(count * 2);
+        }
+        for (let k = 0; k < count; k++) {
+            const id = store.active[k];
+            const b = this.bucketY(store.y[id]) * this.cols + this.bucketX(store.x[id]);
+            this.items[k] = id;
+            this.next[k] = this.head[b];
+            this.head[b] = k;
+        }
+    }
+}
+
+let walkerHash = null;
+
+// --- A* Pathfinding ---
+// Cell type codes used by the typed-array path engine
+const CELL_AISLE = 0;
+const CELL_FRONT = 1;
+const CELL_SEAT = 2;
+const CELL_WALL = 3;
+const CELL_CODES = { aisle: CELL_AISLE, front: CELL_FRONT, seat: CELL_SEAT, wall: CELL_WALL };
+const CELL_TYPES = ['aisle', 'front', 'seat', 'wall']; // Node type per code
+const CELL_COSTS = [1, 1, 1.3, 100]; // Node.getCost() of an empty cell per code
+
+// Binary min-heap of cell indices ordered by an external key array.
+// pos[i] is the heap slot of cell i and enables decrease-key.
+class CellHeap {
+    constructor(size) {
+        this.items = new Int32Array(size);
+        this.pos = new Int32Array(size).fill(-1);
+        this.size = 0;
+        this.keys = null;
+    }
+
+    reset(keys) {
+        this.size = 0;
+        this.keys = keys;
+    }
+
+    push(i) {
+        this.items[this.size] = i;
+        this.pos[i] = this.size;
+        this.size++;
+        this.siftUp(this.size - 1);
+    }
+
+    pop() {
+        const top = this.items[0];
+        this.size--;
+        if (this.size > 0) {
+            const last = this.items[this.size];
+            this.items[0] = last;
+            this.pos[last] = 0;
+            this.siftDown(0);
+        }
+        this.pos[top] = -1;
+        return top;
+    }
+
+    decrease(i) {
+        this.siftUp(this.pos[i]);
+    }
+
+    // Re-position cell i after its key moved in either direction
+    update(i) {
+        this.siftUp(this.pos[i]);
+        this.siftDown(this.pos[i]);
+    }
+
+    remove(i) {
+        const slot = this.pos[i];
+        this.size--;
+        this.pos[i] = -1;
+        if (slot === this.size) return;
+        const last = this.items[this.size];
+        this.items[slot] = last;
+        this.pos[last] = slot;
+        this.update(last);
+    }
+
+    // Empty a heap that was not drained, so pos is -1 everywhere again
+    clear() {
+        for (let k = 0; k < this.size; k++) this.pos[this.items[k]] = -1;
+        this.size = 0;
+    }
+
+    siftUp(slot) {
+        const items = this.items;
+        const keys = this.keys;
+        const item = items[slot];
+        const key = keys[item];
+        while (slot > 0) {
+            const parentSlot = (slot - 1) >> 1;
+            const parentItem = items[parentSlot];
+            if (keys[parentItem] <= key) break;
+            items[slot] = parentItem;
+            this.pos[parentItem] = slot;
+            slot = parentSlot;
+        }
+        items[slot] = item;
+        this.pos[item] = slot;
+    }
+
+    siftDown(slot) {
+        const items = this.items;
+        const keys = this.keys;
+        const size = this.size;
+        const item = items[slot];
+        const key = keys[item];
+        while (true) {
+            let child = 2 * slot + 1;
+            if (child >= size) break;
+            if (child + 1 < size && keys[items[child + 1]] < keys[items[child]]) child++;
+            if (keys[items[child]] >= key) break;
+            items[slot] = items[child];
+            this.pos[items[slot]] = slot;
+            slot = child;
+        }
+        items[slot] = item;
+        this.pos[item] = slot;
+    }
+}
+
+// Flat typed-array mirror of the grid with a binary-heap A*.
+// Per-search state is invalidated by bumping a generation stamp instead of
+// resetting every cell, so a search only touches the cells it expands.
+// Moves come from the compiled layout's CSR tables: cell i steps to
+// exits[exitStart[i]] .. exits[exitStart[i + 1] - 1] and is entered from
+// the same range of entries, both in down, right, up, left order.
+class PathEngine {
+    constructor(cols, rows, layout) {
+        const size = cols * rows;
+        this.cols = cols;
+        this.rows = rows;
+        this.size = size;
+        this.exitStart = layout.exitStart;
+        this.exits = layout.exits;
+        this.entryStart = layout.entryStart;
+        this.entries = layout.entries;
+        this.type = new Uint8Array(size);
+        this.cost = new Float32Array(size);   // Node.getCost() of each cell
+        this.speed = new Uint8Array(size);    // Speed class: aisle, empty seat, occupied seat (see moveTicks)
+        this.g = new Float64Array(size);
+        this.f = new Float64Array(size);
+        this.parent = new Int32Array(size);
+        this.seen = new Uint32Array(size);    // generation that last touched the cell
+        this.closed = new Uint32Array(size);  // generation that last closed the cell
+        this.open = new CellHeap(size);
+        this.generation = 0;
+        this.lastExpanded = 0;
+    }
+
+    // The empty hall, straight from the layout's cell codes
+    load(cells) {
+        this.type.set(cells);
+        for (let i = 0; i < this.size; i++) {
+            this.cost[i] = CELL_COSTS[cells[i]];
+            this.speed[i] = cells[i] === CELL_SEAT ? 1 : 0;
+        }
+    }
+
+    // Re-read type and cost of a single node (e.g. after a seat becomes occupied)
+    updateCell(node) {
+        const i = node.y * this.cols + node.x;
+        this.type[i] = CELL_CODES[node.type];
+        this.cost[i] = node.getCost();
+        this.speed[i] = node.type !== 'seat' ? 0 : (node.occupied ? 2 : 1);
+        return i;
+    }
+
+    // Whether a student may step from cell `from` into the adjacent cell `to`.
+    // Seats can only be entered from the side.
+    canEnter(from, to) {
+        const type = this.type[to];
+        if (type === CELL_WALL) return false;
+        return type !== CELL_SEAT || (to !== from + this.cols && to !== from - this.cols);
+    }
+
+    nextGeneration() {
+        this.generation++;
+        if (this.generation === 0xFFFFFFFF) {
+            this.seen.fill(0);
+            this.closed.fill(0);
+            this.generation = 1;
+        }
+        return this.generation;
+    }
+
+    // Relax the legal move current -> next
+    relax(current, next, gen, endX, endY) {
+        if (this.closed[next] === gen) return;
+
+        const tentativeG = this.g[current] + this.cost[next];
+        if (this.seen[next] === gen) {
+            if (tentativeG >= this.g[next]) return;
+            this.g[next] = tentativeG;
+            this.f[next] = tentativeG + Math.abs(next % this.cols - endX) + Math.abs(((next / this.cols) | 0) - endY);
+            this.parent[next] = current;
+            this.open.decrease(next);
+        } else {
+            this.seen[next] = gen;
+            this.g[next] = tentativeG;
+            this.f[next] = tentativeG + Math.abs(next % this.cols - endX) + Math.abs(((next / this.cols) | 0) - endY);
+            this.parent[next] = current;
+            this.open.push(next);
+        }
+    }
+
+    // Returns the cell indices from start (exclusive) to end (inclusive), or []
+    search(startX, startY, endX, endY) {
+        const cols = this.cols;
+        const open = this.open;
+        const start = startY * cols + startX;
+        const end = endY * cols + endX;
+        const gen = this.nextGeneration();
+
+        open.reset(this.f);
+        this.lastExpanded = 0;
+        this.seen[start] = gen;
+        this.g[start] = 0;
+        this.f[start] = Math.abs(startX - endX) + Math.abs(startY - endY);
+        this.parent[start] = -1;
+        open.push(start);
+
+        while (open.size > 0) {
+            const current = open.pop();
+            if (current === end) {
+                const path = [];
+                for (let i = current; i !== start; i = this.parent[i]) path.push(i);
+                return path.reverse();
+            }
+            this.closed[current] = gen;
+            this.lastExpanded++;
+
+            for (let k = this.exitStart[current]; k < this.exitStart[current + 1]; k++) {
+                this.relax(current, this.exits[k], gen, endX, endY);
+            }
+        }
+        return []; // No path
+    }
+}
+
+// Dijkstra cost-to-come field from one entrance over the whole grid.
+// A path to any cell is a backtrace through `pred`. When a cell's cost
+// changes only the cells whose shortest path runs through it are repaired.
+class CostField {
+    constructor(engine, originX, originY) {
+        this.engine = engine;
+        this.origin = originY * engine.cols + originX;
+        this.dist = new Float64Array(engine.size);
+        this.pred = new Int32Array(engine.size);
+        this.mark = new Uint32Array(engine.size);
+        this.stamp = 0;
+        this.heap = new CellHeap(engine.size);
+        this.affected = new Int32Array(engine.size);
+        this.lastExpanded = 0;
+        this.rebuild();
+    }
+
+    rebuild() {
+        this.dist.fill(Infinity);
+        this.pred.fill(-1);
+        this.dist[this.origin] = 0;
+        this.heap.reset(this.dist);
+        this.heap.push(this.origin);
+        this.propagate(0);
+    }
+
+    // Drain the heap, relaxing edges; with a stamp only marked cells are relaxed
+    propagate(stamp) {
+        const engine = this.engine;
+        const dist = this.dist;
+        const heap = this.heap;
+        const exits = engine.exits;
+        while (heap.size > 0) {
+            const u = heap.pop();
+            this.lastExpanded++;
+            for (let k = engine.exitStart[u]; k < engine.exitStart[u + 1]; k++) {
+                const v = exits[k];
+                if (stamp && this.mark[v] !== stamp) continue;
+                const d = dist[u] + engine.cost[v];
+                if (d < dist[v]) {
+                    const queued = heap.pos[v] !== -1;
+                    dist[v] = d;
+                    this.pred[v] = u;
+                    if (queued) heap.decrease(v);
+                    else heap.push(v);
+                }
+            }
+        }
+    }
+
+    // Call after engine.cost[i] changed; lastExpanded counts the cells it re-solved
+    cellChanged(i) {
+        this.lastExpanded = 0;
+        const p = this.pred[i];
+        if (i === this.origin || p === -1) return;
+        const d = this.dist[p] + this.engine.cost[i];
+        if (d > this.dist[i]) {
+            this.raise(i);
+        } else if (d < this.dist[i]) {
+            this.dist[i] = d;
+            this.heap.reset(this.dist);
+            this.heap.push(i);
+            this.propagate(0);
+        }
+    }
+
+    // Cost increase: invalidate the shortest-path subtree under i and
+    // re-run Dijkstra inside it, seeded from its unaffected boundary.
+    raise(i) {
+        const engine = this.engine;
+        const dist = this.dist;
+        const pred = this.pred;
+        const affected = this.affected;
+        const stamp = ++this.stamp;
+
+        let count = 0;
+        let head = 0;
+        affected[count++] = i;
+        this.mark[i] = stamp;
+        while (head < count) {
+            const u = affected[head++];
+            for (let k = engine.exitStart[u]; k < engine.exitStart[u + 1]; k++) {
+                const v = engine.exits[k];
+                if (pred[v] === u && this.mark[v] !== stamp) {
+                    this.mark[v] = stamp;
+                    affected[count++] = v;
+                }
+            }
+        }
+
+        for (let k = 0; k < count; k++) dist[affected[k]] = Infinity;
+
+        this.heap.reset(dist);
+        for (let k = 0; k < count; k++) {
+            const u = affected[k];
+            for (let j = engine.entryStart[u]; j < engine.entryStart[u + 1]; j++) {
+                const v = engine.entries[j];
+                if (this.mark[v] === stamp) continue;
+                const d = dist[v] + engine.cost[u];
+                if (d < dist[u]) {
+                    dist[u] = d;
+                    pred[u] = v;
+                }
+            }
+            if (dist[u] < Infinity) this.heap.push(u);
+            else pred[u] = -1;
+        }
+        this.propagate(stamp);
+    }
+
+    // Number of steps from the entrance to (x, y); 0 if unreachable
+    pathLength(x, y) {
+        const target = y * this.engine.cols + x;
+        if (this.dist[target] === Infinity) return 0;
+        let length = 0;
+        for (let i = target; i !== this.origin; i = this.pred[i]) length++;
+        return length;
+    }
+
+    // Write the cells from the entrance (exclusive) to (x, y) (inclusive) into out
+    writePath(x, y, out, offset) {
+        const target = y * this.engine.cols + x;
+        let k = offset + this.pathLength(x, y);
+        for (let i = target; k > offset; i = this.pred[i]) out[--k] = i;
+    }
+
+    costTo(x, y) {
+        return this.dist[y * this.engine.cols + x];
+    }
+}
+
+// D* Lite search rooted at one student's seat: g[s] is the cost from s to
+// the seat, and the student's cell is the search start. After a cell's cost
+// changes only the vertices whose values depended on it are re-solved, and
+// the start may move between repairs (km keeps the queued keys valid).
+// Keys fold D* Lite's [k1, k2] pair into k1 + k2 * KEY_TIE.
+const KEY_TIE = 1e-6;
+
+class RouteSearch {
+    constructor(engine) {
+        this.engine = engine;
+        this.g = new Float64Array(engine.size);
+        this.rhs = new Float64Array(engine.size);
+        this.key = new Float64Array(engine.size);
+        this.heap = new CellHeap(engine.size);
+        this.start = -1;
+        this.last = -1; // Start when km was last brought up to date
+        this.goal = -1;
+        this.km = 0;
+        this.lastExpanded = 0;
+    }
+
+    distance(a, b) {
+        const cols = this.engine.cols;
+        return Math.abs(a % cols - b % cols) + Math.abs(((a / cols) | 0) - ((b / cols) | 0));
+    }
+
+    calcKey(s) {
+        const m = Math.min(this.g[s], this.rhs[s]);
+        return m + this.distance(this.start, s) + this.km + m * KEY_TIE;
+    }
+
+    // Full search from start to goal
+    plan(start, goal) {
+        this.g.fill(Infinity);
+        this.rhs.fill(Infinity);
+        this.heap.clear();
+        this.heap.reset(this.key);
+        this.start = this.last = start;
+        this.goal = goal;
+        this.km = 0;
+        this.rhs[goal] = 0;
+        this.key[goal] = this.calcKey(goal);
+        this.heap.push(goal);
+        this.lastExpanded = 0;
+        this.computePath();
+    }
+
+    // The student moved on to cell start
+    moveTo(start) {
+        this.km += this.distance(this.last, start);
+        this.start = this.last = start;
+    }
+
+    // Cheapest way on from s: entering a neighbour plus its cost to the seat
+    lookahead(s) {
+        const engine = this.engine;
+        let best = Infinity;
+        for (let k = engine.exitStart[s]; k < engine.exitStart[s + 1]; k++) {
+            const v = engine.exits[k];
+            const d = engine.cost[v] + this.g[v];
+            if (d < best) best = d;
+        }
+        return best;
+    }
+
+    updateVertex(s) {
+        if (s !== this.goal) this.rhs[s] = this.lookahead(s);
+        const queued = this.heap.pos[s] !== -1;
+        if (this.g[s] !== this.rhs[s]) {
+            this.key[s] = this.calcKey(s);
+            if (queued) this.heap.update(s);
+            else this.heap.push(s);
+        } else if (queued) {
+            this.heap.remove(s);
+        }
+    }
+
+    updatePredecessors(u) {
+        const engine = this.engine;
+        for (let k = engine.entryStart[u]; k < engine.entryStart[u + 1]; k++) {
+            this.updateVertex(engine.entries[k]);
+        }
+    }
+
+    computePath() {
+        const heap = this.heap;
+        const start = this.start;
+        while (heap.size > 0 &&
+               (this.key[heap.items[0]] < this.calcKey(start) || this.rhs[start] !== this.g[start])) {
+            const u = heap.items[0];
+            const key = this.calcKey(u);
+            this.lastExpanded++;
+            if (this.key[u] < key) {
+                this.key[u] = key;
+                heap.update(u);
+            } else if (this.g[u] > this.rhs[u]) {
+                this.g[u] = this.rhs[u];
+                heap.remove(u);
+                this.updatePredecessors(u);
+            } else {
+                this.g[u] = Infinity;
+                this.updateVertex(u);
+                this.updatePredecessors(u);
+            }
+        }
+    }
+
+    // Queue the vertices affected by a change of engine.cost[u]; call
+    // computePath() before reading the route again
+    cellChanged(u) {
+        this.lastExpanded = 0;
+        if (this.g[u] === Infinity && this.rhs[u] === Infinity) return; // Never reached; nothing depends on it
+        this.updatePredecessors(u);
+    }
+
+    // Cells after the start up to the seat (inclusive), or [] if unreachable
+    route() {
+        const engine = this.engine;
+        const cells = [];
+        let s = this.start;
+        while (s !== this.goal) {
+            if (cells.length >= engine.size) return [];
+            let best = -1;
+            let bestCost = Infinity;
+            for (let k = engine.exitStart[s]; k < engine.exitStart[s + 1]; k++) {
+                const v = engine.exits[k];
+                const d = engine.cost[v] + this.g[v];
+                if (d < bestCost) {
+                    best = v;
+                    bestCost = d;
+                }
+            }
+            if (best === -1) return [];
+            cells.push(best);
+            s = best;
+        }
+        return cells;
+    }
+}
+
+// Cluster-bounded Dijkstra used by the hierarchical planner. Forward searches
+// leave pred[v] pointing back toward the origin; reverse searches measure the
+// cost of reaching the origin and leave pred[v] pointing forward to it.
+class ClusterSearch {
+    constructor(engine, clusterOf) {
+        this.engine = engine;
+        this.clusterOf = clusterOf;
+        this.dist = new Float64Array(engine.size);
+        this.pred = new Int32Array(engine.size);
+        this.seen = new Uint32Array(engine.size);
+        this.generation = 0;
+        this.heap = new CellHeap(engine.size);
+        this.origin = -1;
+    }
+
+    run(origin, reverse) {
+        const engine = this.engine;
+        const cluster = this.clusterOf[origin];
+        const dist = this.dist;
+        const heap = this.heap;
+        const start = reverse ? engine.entryStart : engine.exitStart;
+        const moves = reverse ? engine.entries : engine.exits;
+        const gen = ++this.generation;
+        this.origin = origin;
+        heap.reset(dist);
+        this.seen[origin] = gen;
+        dist[origin] = 0;
+        this.pred[origin] = -1;
+        heap.push(origin);
+        while (heap.size > 0) {
+            const u = heap.pop();
+            for (let k = start[u]; k < start[u + 1]; k++) {
+                const v = moves[k];
+                if (this.clusterOf[v] !== cluster) continue;
+                const d = dist[u] + (reverse ? engine.cost[u] : engine.cost[v]);
+                if (this.seen[v] !== gen) {
+                    this.seen[v] = gen;
+                    dist[v] = d;
+                    this.pred[v] = u;
+                    heap.push(v);
+                } else if (d < dist[v]) {
+                    dist[v] = d;
+                    this.pred[v] = u;
+                    heap.decrease(v);
+                }
+            }
+        }
+    }
+
+    costTo(i) {
+        return this.seen[i] === this.generation ? this.dist[i] : Infinity;
+    }
+
+    // Forward search: cells from the origin (exclusive) to i (inclusive)
+    pathTo(i) {
+        const path = [];
+        for (let c = i; c !== this.origin; c = this.pred[c]) path.push(c);
+        return path.reverse();
+    }
+
+    // Reverse search: cells after i up to the origin (inclusive)
+    pathFrom(i, out) {
+        for (let c = this.pred[i]; c !== -1; c = this.pred[c]) out.push(c);
+    }
+}
+
+// Cluster boundaries along one axis: every layout break, plus extra cuts so
+// no cluster is longer than maxSpan. Returns the cluster index of each line.
+function clusterIndex(extent, breaks, maxSpan) {
+    const cuts = [...new Set(breaks.filter(b => b > 0 && b < extent))].sort((a, b) => a - b);
+    const index = new Int32Array(extent);
+    let cluster = 0;
+    let start = 0;
+    for (let i = 0; i < extent; i++) {
+        if (i > 0 && (cuts.includes(i) || i - start >= maxSpan)) {
+            cluster++;
+            start = i;
+        }
+        index[i] = cluster;
+    }
+    return index;
+}
+
+// Hierarchical A* (HPA*): the grid is cut into clusters along the seat blocks,
+// cross aisles and front/back areas. Cells where a student can cross between
+// clusters become portal nodes; intra-cluster portal costs are computed per
+// cluster on demand and refined paths between portals are cached until a
+// cost inside the cluster changes. A search runs over the portal graph and
+// only the start and goal clusters are searched cell by cell.
+class HierarchicalPlanner {
+    constructor(engine, xBreaks, yBreaks, maxSpan) {
+        this.engine = engine;
+        const cx = clusterIndex(engine.cols, xBreaks, maxSpan);
+        const cy = clusterIndex(engine.rows, yBreaks, maxSpan);
+        const clusterCols = cx[engine.cols - 1] + 1;
+        this.clusterCount = clusterCols * (cy[engine.rows - 1] + 1);
+        this.clusterOf = new Int32Array(engine.size);
+        for (let i = 0; i < engine.size; i++) {
+            this.clusterOf[i] = cy[(i / engine.cols) | 0] * clusterCols + cx[i % engine.cols];
+        }
+        this.fromStart = new ClusterSearch(engine, this.clusterOf);
+        this.toGoal = new ClusterSearch(engine, this.clusterOf);
+        this.scratch = new ClusterSearch(engine, this.clusterOf);
+        this.lastExpanded = 0;
+        this.lastCost = Infinity;
+        this.build();
+    }
+
+    // Place portals; call again after cell types change (costs alone only dirty clusters)
+    build() {
+        const engine = this.engine;
+        const cols = engine.cols;
+        this.nodeOf = new Int32Array(engine.size).fill(-1);
+        this.nodeCell = [];
+        this.crossTo = []; // Per node: portal nodes in a neighbouring cluster it can step into
+        this.clusterNodes = Array.from({ length: this.clusterCount }, () => []);
+
+        // Vertical cluster borders are crossed by horizontal moves and vice versa
+        for (let x = 1; x < cols; x++) {
+            if (this.clusterOf[x] !== this.clusterOf[x - 1]) this.scanBorder(x - 1, 1, cols, engine.rows);
+        }
+        for (let y = 1; y < engine.rows; y++) {
+            if (this.clusterOf[y * cols] !== this.clusterOf[(y - 1) * cols]) this.scanBorder((y - 1) * cols, cols, 1, cols);
+        }
+
+        const count = this.nodeCell.length;
+        this.edgeTo = new Array(count);
+        this.edgeCost = new Array(count);
+        this.pathCache = Array.from({ length: count }, () => new Map());
+        this.dirty = new Uint8Array(this.clusterCount).fill(1);
+        this.refreshes = new Uint32Array(this.clusterCount);
+        this.onPath = new Uint32Array(engine.size); // Refresh of its cluster that last routed a portal pair through the cell
+
+        // Portal graph search state; the last two slots are the query's start and goal
+        this.start = count;
+        this.goal = count + 1;
+        this.g = new Float64Array(count + 2);
+        this.f = new Float64Array(count + 2);
+        this.parent = new Int32Array(count + 2);
+        this.seen = new Uint32Array(count + 2);
+        this.closed = new Uint32Array(count + 2);
+        this.generation = 0;
+        this.open = new CellHeap(count + 2);
+    }
+
+    // Walk one border: cell a on the near side, a + across on the far side,
+    // stepping by `along`. Contiguous crossings with the same directions form
+    // one entrance with a portal in the middle, or at both ends when long; a
+    // run also breaks wherever a side cannot be walked along the border
+    // (e.g. a column of seats, which are only entered sideways).
+    scanBorder(first, across, along, length) {
+        const engine = this.engine;
+        let runStart = -1;
+        for (let k = 0; k <= length; k++) {
+            const a = first + k * along;
+            const b = a + across;
+            const forward = k < length && engine.canEnter(a, b);
+            const backward = k < length && engine.canEnter(b, a);
+            const crossing = forward || backward;
+            const continues = crossing && runStart !== -1 &&
+                forward === engine.canEnter(a - along, a - along + across) &&
+                backward === engine.canEnter(a - along + across, a - along) &&
+                this.clusterOf[a] === this.clusterOf[a - along] &&
+                this.clusterOf[b] === this.clusterOf[b - along] &&
+                engine.canEnter(a - along, a) && engine.canEnter(a, a - along) &&
+                engine.canEnter(b - along, b) && engine.canEnter(b, b - along);
+            if (runStart !== -1 && !continues) {
+                const runEnd = k - 1;
+                if (runEnd - runStart + 1 >= 6) {
+                    this.addCrossing(first + runStart * along, across);
+                    this.addCrossing(first + runEnd * along, across);
+                } else {
+                    this.addCrossing(first + ((runStart + runEnd) >> 1) * along, across);
+                }
+                runStart = -1;
+            }
+            if (crossing && runStart === -1) runStart = k;
+        }
+    }
+
+    addCrossing(a, across) {
+        const b = a + across;
+        const na = this.portal(a);
+        const nb = this.portal(b);
+        if (this.engine.canEnter(a, b)) this.crossTo[na].push(nb);
+        if (this.engine.canEnter(b, a)) this.crossTo[nb].push(na);
+    }
+
+    portal(cell) {
+        let node = this.nodeOf[cell];
+        if (node === -1) {
+            node = this.nodeCell.length;
+            this.nodeOf[cell] = node;
+            this.nodeCell.push(cell);
+            this.crossTo.push([]);
+            this.clusterNodes[this.clusterOf[cell]].push(node);
+        }
+        return node;
+    }
+
+    // Call after engine.cost[i] went up (seats only get costlier between
+    // builds); off every portal-to-portal path the cluster's costs still hold
+    cellChanged(i) {
+        const c = this.clusterOf[i];
+        if (this.onPath[i] === this.refreshes[c]) this.dirty[c] = 1;
+    }
+
+    // Recompute the portal-to-portal costs of a cluster
+    refreshCluster(c) {
+        const nodes = this.clusterNodes[c];
+        const search = this.scratch;
+        const stamp = ++this.refreshes[c];
+        for (const n of nodes) {
+            const origin = this.nodeCell[n];
+            search.run(origin, false);
+            const to = [];
+            const cost = [];
+            for (const m of nodes) {
+                const d = search.costTo(this.nodeCell[m]);
+                if (m !== n && d < Infinity) {
+                    to.push(m);
+                    cost.push(d);
+                    for (let cell = this.nodeCell[m]; cell !== origin; cell = search.pred[cell]) {
+                        this.onPath[cell] = stamp;
+                    }
+                }
+            }
+            this.edgeTo[n] = to;
+            this.edgeCost[n] = cost;
+            this.pathCache[n].clear();
+        }
+        this.dirty[c] = 0;
+    }
+
+    // Cached cell path between two portals of the same cluster
+    clusterPath(n, m) {
+        let path = this.pathCache[n].get(m);
+        if (!path) {
+            this.scratch.run(this.nodeCell[n], false);
+            path = this.scratch.pathTo(this.nodeCell[m]);
+            this.pathCache[n].set(m, path);
+        }
+        return path;
+    }
+
+    nextGeneration() {
+        this.generation++;
+        if (this.generation === 0xFFFFFFFF) {
+            this.seen.fill(0);
+            this.closed.fill(0);
+            this.generation = 1;
+        }
+        return this.generation;
+    }
+
+    relax(current, next, cost, gen, endX, endY) {
+        if (this.closed[next] === gen) return;
+        const tentativeG = this.g[current] + cost;
+        const cell = next === this.goal ? -1 : this.nodeCell[next];
+        const h = cell === -1 ? 0 : Math.abs(cell % this.engine.cols - endX) + Math.abs(((cell / this.engine.cols) | 0) - endY);
+        if (this.seen[next] === gen) {
+            if (tentativeG >= this.g[next]) return;
+            this.g[next] = tentativeG;
+            this.f[next] = tentativeG + h;
+            this.parent[next] = current;
+            this.open.decrease(next);
+        } else {
+            this.seen[next] = gen;
+            this.g[next] = tentativeG;
+            this.f[next] = tentativeG + h;
+            this.parent[next] = current;
+            this.open.push(next);
+        }
+    }
+
+    // Same contract as PathEngine.search: cells from start (exclusive) to end
+    // (inclusive), or [] when unreachable. lastCost holds the path's cost.
+    search(startX, startY, endX, endY) {
+        const cols = this.engine.cols;
+        const startCell = startY * cols + startX;
+        const endCell = endY * cols + endX;
+        const goalCluster = this.clusterOf[endCell];
+        this.lastExpanded = 0;
+        this.lastCost = 0;
+        if (startCell === endCell) return [];
+
+        this.fromStart.run(startCell, false);
+        this.toGoal.run(endCell, true);
+        for (const c of [this.clusterOf[startCell], goalCluster]) {
+            if (this.dirty[c]) this.refreshCluster(c);
+        }
+
+        const open = this.open;
+        const gen = this.nextGeneration();
+        open.reset(this.f);
+        this.seen[this.start] = gen;
+        this.g[this.start] = 0;
+        this.f[this.start] = Math.abs(startX - endX) + Math.abs(startY - endY);
+        this.parent[this.start] = -1;
+        open.push(this.start);
+
+        while (open.size > 0) {
+            const current = open.pop();
+            if (current === this.goal) break;
+            this.closed[current] = gen;
+            this.lastExpanded++;
+
+            if (current === this.start) {
+                for (const m of this.clusterNodes[this.clusterOf[startCell]]) {
+                    const d = this.fromStart.costTo(this.nodeCell[m]);
+                    if (d < Infinity) this.relax(current, m, d, gen, endX, endY);
+                }
+                const direct = this.fromStart.costTo(endCell);
+                if (direct < Infinity) this.relax(current, this.goal, direct, gen, endX, endY);
+                continue;
+            }
+
+            const cell = this.nodeCell[current];
+            const cluster = this.clusterOf[cell];
+            if (this.dirty[cluster]) this.refreshCluster(cluster);
+            const to = this.edgeTo[current];
+            const cost = this.edgeCost[current];
+            for (let k = 0; k < to.length; k++) this.relax(current, to[k], cost[k], gen, endX, endY);
+            for (const m of this.crossTo[current]) {
+                this.relax(current, m, this.engine.cost[this.nodeCell[m]], gen, endX, endY);
+            }
+            if (cluster === goalCluster) {
+                const d = this.toGoal.costTo(cell);
+                if (d < Infinity) this.relax(current, this.goal, d, gen, endX, endY);
+            }
+        }
+        // Drop leftovers so the heap's slot index stays clean for the next query
+        while (open.size > 0) open.pop();
+
+        if (this.seen[this.goal] !== gen) {
+            this.lastCost = Infinity;
+            return [];
+        }
+        this.lastCost = this.g[this.goal];
+
+        const route = [];
+        for (let n = this.parent[this.goal]; n !== this.start; n = this.parent[n]) route.push(n);
+        route.reverse();
+        if (route.length === 0) return this.fromStart.pathTo(endCell);
+
+        // Refine: start cluster and goal cluster cell by cell, cached paths in between
+        const path = this.fromStart.pathTo(this.nodeCell[route[0]]);
+        for (let k = 1; k < route.length; k++) {
+            const prev = route[k - 1];
+            const next = route[k];
+            if (this.clusterOf[this.nodeCell[prev]] === this.clusterOf[this.nodeCell[next]]) {
+                const leg = this.clusterPath(prev, next);
+                for (let j = 0; j < leg.length; j++) path.push(leg[j]);
+            } else {
+                path.push(this.nodeCell[next]);
+            }
+        }
+        this.toGoal.pathFrom(this.nodeCell[route[route.length - 1]], path);
+        return path;
+    }
+}
+
+let pathEngine = null;
+let entranceFields = []; // One CostField per entry in ENTRANCES (small grids)
+let planner = null; // HierarchicalPlanner, used instead of the fields on large grids
+
+// Path cost from an entrance without a search: exact on cost fields,
+// Manhattan distance on planner grids
+function entranceEstimate(e, seat) {
+    if (!planner) return entranceFields[e].costTo(seat.x, seat.y);
+    return Math.abs(seat.x - ENTRANCES[e].x) + Math.abs(seat.y - ENTRANCES[e].y);
+}
+
+function markSeatOccupied(node) {
+    profiler.enter(PHASE_PATH);
+    node.occupied = true;
+    const i = pathEngine.updateCell(node);
+    entranceFields.forEach(field => {
+        field.cellChanged(i);
+        profiler.countSearch(field.lastExpanded);
+    });
+    if (planner) planner.cellChanged(i);
+    repairRoutes(i);
+    profiler.leave();
+}
+
+// --- Route Repair ---
+// Seats only get costlier as they fill, so a walker's remaining route stays
+// optimal unless the changed cell lies on it. routeLoad[i] counts remaining
+// routes through cell i, so most changes skip the walker scan. A walker
+// re-planned once keeps its RouteSearch, which every later change repairs
+// in place and re-solves only when its route is hit again.
+let routeLoad = null;
+let routeSearches = []; // Every RouteSearch allocated for this grid
+let freeRouteSearches = [];
+
+function acquireRouteSearch(id) {
+    if (students.routeSearch[id] === -1) {
+        if (freeRouteSearches.length === 0) {
+            routeSearches.push(new RouteSearch(pathEngine));
+            freeRouteSearches.push(routeSearches.length - 1);
+        }
+        students.routeSearch[id] = freeRouteSearches.pop();
+    }
+    return routeSearches[students.routeSearch[id]];
+}
+
+function releaseRouteSearch(id) {
+    if (students.routeSearch[id] === -1) return;
+    freeRouteSearches.push(students.routeSearch[id]);
+    students.routeSearch[id] = -1;
+}
+
+// Route entry the student is committed to: the cell it is walking to, or
+// the last cell of its reserved schedule. The route continues from there.
+function routeWaypointIndex(id) {
+    return Math.max(students.pathIndex[id], students.scheduleEnd[id] - 1);
+}
+
+function routeWaypoint(id) {
+    return students.pathBuffer[students.pathStart[id] + routeWaypointIndex(id)];
+}
+
+function addRoute(id, delta = 1) {
+    const store = students;
+    const end = store.pathStart[id] + store.pathLength[id];
+    for (let k = store.pathStart[id] + store.pathIndex[id]; k < end; k++) {
+        routeLoad[store.pathBuffer[k]] += delta;
+    }
+}
+
+// Whether the route beyond the student's waypoint runs through cell
+function routeCrosses(id, cell) {
+    const store = students;
+    const end = store.pathStart[id] + store.pathLength[id];
+    for (let k = store.pathStart[id] + routeWaypointIndex(id) + 1; k < end; k++) {
+        if (store.pathBuffer[k] === cell) return true;
+    }
+    return false;
+}
+
+// Replace the route after its waypoint (start) with cells; the scheduled
+// entries up to the waypoint are kept with their times
+function setRoute(id, start, cells) {
+    const store = students;
+    addRoute(id, -1);
+    const from = store.pathStart[id] + store.pathIndex[id];
+    const keep = routeWaypointIndex(id) - store.pathIndex[id] + 1;
+    const length = keep + cells.length;
+    const offset = length <= store.pathLength[id] ? store.pathStart[id] : store.reservePath(length);
+    store.pathBuffer.copyWithin(offset, from, from + keep);
+    store.pathDepart.copyWithin(offset, from, from + keep);
+    store.pathArrive.copyWithin(offset, from, from + keep);
+    store.pathBuffer.set(cells, offset + keep);
+    store.scheduleEnd[id] = Math.max(store.scheduleEnd[id] - store.pathIndex[id], 0);
+    store.pathStart[id] = offset;
+    store.pathLength[id] = length;
+    store.pathIndex[id] = 0;
+    addRoute(id);
+}
+
+// Call after the cost of cell changed (a seat was taken)
+function repairRoutes(cell) {
+    const store = students;
+    if (routeLoad[cell] === 0 && freeRouteSearches.length === routeSearches.length) return;
+    for (let k = 0; k < store.activeCount; k++) {
+        const id = store.active[k];
+        if (store.pathLength[id] === 0) continue;
+        const crossed = routeLoad[cell] > 0 && routeCrosses(id, cell);
+        const r = store.routeSearch[id];
+        if (r === -1) {
+            if (crossed) recalculatePath(id);
+            continue;
+        }
+        const search = routeSearches[r];
+        search.moveTo(routeWaypoint(id));
+        search.cellChanged(cell);
+        if (crossed) {
+            search.computePath();
+            setRoute(id, search.start, search.route());
+        }
+        profiler.countSearch(search.lastExpanded);
+    }
+}
+
+// --- Cooperative Pathfinding ---
+// Windowed cooperative A* (WHCA*): each walker reserves the cells it will
+// pass for the next few seconds in a space-time table, and later walkers
+// plan around those reservations by waiting or detouring. Beyond the window
+// a walker follows its ordinary route, the abstract plan that guides the
+// windowed search, and it plans the next window when it gets there.
+
+// Walker ids per (slot, cell) for the next `depth` slots, a ring of layers
+// recycled as time passes
+class ReservationTable {
+    constructor(size, depth) {
+        this.size = size;
+        this.depth = depth;
+        this.holders = new Int32Array(size * depth); // Student id + 1, 0 when free
+        this.slot = 0; // Oldest slot still held
+        this.slotTicks = 1;
+    }
+
+    reset(slotTicks) {
+        this.holders.fill(0);
+        this.slot = 0;
+        this.slotTicks = slotTicks;
+    }
+
+    slotOf(tick) {
+        return Math.floor(tick / this.slotTicks);
+    }
+
+    // Forget the slots before `slot`; their layers are reused past the horizon
+    advance(slot) {
+        if (slot - this.slot >= this.depth) {
+            this.holders.fill(0);
+            this.slot = slot;
+        }
+        for (; this.slot < slot; this.slot++) {
+            const at = (this.slot % this.depth) * this.size;
+            this.holders.fill(0, at, at + this.size);
+        }
+    }
+
+    // Whether nobody but id holds cell in slots from..to
+    isFree(cell, from, to, id) {
+        const last = Math.min(to, this.slot + this.depth - 1);
+        for (let s = Math.max(from, this.slot); s <= last; s++) {
+            const holder = this.holders[(s % this.depth) * this.size + cell];
+            if (holder !== 0 && holder !== id + 1) return false;
+        }
+        return true;
+    }
+
+    // Claim the free slots from..to of cell; an earlier claim wins
+    reserve(cell, from, to, id) {
+        const last = Math.min(to, this.slot + this.depth - 1);
+        for (let s = Math.max(from, this.slot); s <= last; s++) {
+            const i = (s % this.depth) * this.size + cell;
+            if (this.holders[i] === 0) this.holders[i] = id + 1;
+        }
+    }
+
+    release(cell, id) {
+        for (let i = cell; i < this.holders.length; i += this.size) {
+            if (this.holders[i] === id + 1) this.holders[i] = 0;
+        }
+    }
+}
+
+const SPACE_TIME_MAX_EXPANDED = 4096;
+const SPACE_TIME_MAX_STATES = SPACE_TIME_MAX_EXPANDED * 5 + 1; // A wait and four steps per expansion
+
+// A* over (cell, slot) states up to `window` slots ahead. A state keeps the
+// earliest tick it is reached at within its slot. Moves take their walking
+// time and need the target cell free from departure to arrival; waiting
+// holds the current cell to the next slot. Only the states a search reaches
+// are stored, hashed by slot * size + cell, so memory does not grow with
+// the grid.
+class SpaceTimeSearch {
+    constructor(engine, window) {
+        this.engine = engine;
+        this.window = window;
+        this.key = new Int32Array(SPACE_TIME_MAX_STATES); // Slot offset * size + cell
+        this.tick = new Float64Array(SPACE_TIME_MAX_STATES); // Arrival tick (the cost)
+        this.f = new Float64Array(SPACE_TIME_MAX_STATES);
+        this.parent = new Int32Array(SPACE_TIME_MAX_STATES);
+        this.closed = new Uint8Array(SPACE_TIME_MAX_STATES);
+        this.count = 0; // States reached by this search
+        this.open = new CellHeap(SPACE_TIME_MAX_STATES);
+        const bits = Math.ceil(Math.log2(SPACE_TIME_MAX_STATES * 2));
+        this.shift = 32 - bits;
+        this.bucket = new Int32Array(1 << bits); // State index, valid where bucketGen is current
+        this.bucketGen = new Uint32Array(1 << bits);
+        this.generation = 0;
+        this.lastExpanded = 0;
+        this.minTicks = 1; // Ticks per cell assumed by the heuristic
+        // The plan found: cell, departure and arrival tick per move
+        this.cells = [];
+        this.departs = [];
+        this.arrives = [];
+        this.endTick = 0;
+        this.routeMark = new Uint32Array(engine.size); // Generation that put the cell on the route
+        this.routeIndex = new Int32Array(engine.size);
+    }
+
+    nextGeneration() {
+        this.generation++;
+        if (this.generation === 0xFFFFFFFF) {
+            this.bucketGen.fill(0);
+            this.routeMark.fill(0);
+            this.generation = 1;
+        }
+        return this.generation;
+    }
+
+    // Plan the given route cells in order at walking pace, ignoring the table
+    walk(start, departTick, route, from, to) {
+        this.cells.length = 0;
+        this.departs.length = 0;
+        this.arrives.length = 0;
+        let tick = departTick;
+        for (let k = from, prev = start; k <= to; prev = route[k++]) {
+            this.cells.push(route[k]);
+            this.departs.push(tick);
+            tick += moveTicks(prev, route[k]);
+            this.arrives.push(tick);
+        }
+        this.endTick = tick;
+    }
+
+    // State index for key, added unreached (tick Infinity) if new
+    stateOf(key, gen) {
+        const mask = this.bucket.length - 1;
+        let b = Math.imul(key, 0x9E3779B1) >>> this.shift;
+        while (this.bucketGen[b] === gen) {
+            const state = this.bucket[b];
+            if (this.key[state] === key) return state;
+            b = (b + 1) & mask;
+        }
+        const state = this.count++;
+        this.bucketGen[b] = gen;
+        this.bucket[b] = state;
+        this.key[state] = key;
+        this.tick[state] = Infinity;
+        this.closed[state] = 0;
+        return state;
+    }
+
+    relax(from, key, tick, estimate, gen) {
+        const to = this.stateOf(key, gen);
+        if (this.closed[to] || tick >= this.tick[to]) return;
+        const reached = this.tick[to] !== Infinity;
+        this.tick[to] = tick;
+        this.f[to] = tick + estimate;
+        this.parent[to] = from;
+        if (reached) this.open.decrease(to);
+        else this.open.push(to);
+    }
+
+    // Plan for student id from cell start, leaving no earlier than departTick,
+    // along route[from..to]: to route[to] or, if that can't be reached inside
+    // the window, to the route cell farthest along it can reach. Returns the
+    // route index the plan ends at, from - 1 if it gets nowhere.
+    plan(id, table, start, now, departTick, route, from, to) {
+        const engine = this.engine;
+        const size = engine.size;
+        const cols = engine.cols;
+        const open = this.open;
+        const base = table.slotOf(now);
+        const horizon = base + this.window;
+        const goal = route[to];
+        const goalX = goal % cols;
+        const goalY = (goal / cols) | 0;
+        const estimate = (cell) =>
+            (Math.abs(cell % cols - goalX) + Math.abs(((cell / cols) | 0) - goalY)) * this.minTicks;
+        const gen = this.nextGeneration();
+        for (let k = from; k <= to; k++) {
+            this.routeMark[route[k]] = gen;
+            this.routeIndex[route[k]] = k;
+        }
+        const indexOf = (cell) => (this.routeMark[cell] === gen ? this.routeIndex[cell] : from - 1);
+
+        open.reset(this.f);
+        this.lastExpanded = 0;
+        this.count = 0;
+        const first = Math.min(table.slotOf(departTick), horizon) - base;
+        const origin = this.stateOf(first * size + start, gen);
+        this.tick[origin] = departTick;
+        this.f[origin] = departTick + estimate(start);
+        this.parent[origin] = -1;
+        open.push(origin);
+
+        let best = origin;
+        let bestIndex = from - 1;
+        while (open.size > 0) {
+            const state = open.pop();
+            const key = this.key[state];
+            const cell = key % size;
+            const tick = this.tick[state];
+            const index = indexOf(cell);
+            if (index > bestIndex || (index === bestIndex && tick < this.tick[best])) {
+                best = state;
+                bestIndex = index;
+            }
+            if (cell === goal) break;
+            this.closed[state] = 1;
+            if (++this.lastExpanded >= SPACE_TIME_MAX_EXPANDED) break;
+            const slot = base + ((key / size) | 0);
+            if (slot === horizon) continue;
+
+            // Wait for the next slot
+            if (table.isFree(cell, slot + 1, slot + 1, id)) {
+                this.relax(state, key + size, (slot + 1) * table.slotTicks, this.f[state] - tick, gen);
+            }
+            // Step to a neighbour
+            for (let a = engine.exitStart[cell]; a < engine.exitStart[cell + 1]; a++) {
+                const next = engine.exits[a];
+                const arrive = tick + moveTicks(cell, next);
+                const arriveSlot = table.slotOf(arrive);
+                if (arriveSlot > horizon || !table.isFree(next, slot, arriveSlot, id)) continue;
+                this.relax(state, (arriveSlot - base) * size + next, arrive, estimate(next), gen);
+            }
+        }
+        open.clear();
+
+        this.cells.length = 0;
+        this.departs.length = 0;
+        this.arrives.length = 0;
+        this.endTick = this.tick[best];
+        for (let state = best; this.parent[state] !== -1; state = this.parent[state]) {
+            const prev = this.parent[state];
+            const cell = this.key[state] % size;
+            if (this.key[prev] % size === cell) continue; // A wait
+            this.cells.push(cell);
+            this.departs.push(this.tick[prev]);
+            this.arrives.push(this.tick[state]);
+        }
+        this.cells.reverse();
+        this.departs.reverse();
+        this.arrives.reverse();
+        return bestIndex;
+    }
+}
+
+let reservations = null;
+let spaceTime = null;
+
+// Ticks to walk between the centres of adjacent cells, per direction (side,
+// down, up) and the speed class of both cells (aisle, empty seat, occupied
+// seat), as in updateStudent: half the way at each cell's speed
+const moveTickTable = new Int32Array(27);
+
+function buildMoveTicks() {
+    const speeds = [CONFIG.speeds.aisle, CONFIG.speeds.emptySeat, CONFIG.speeds.occupiedSeat];
+    const perTick = CONFIG.fixedStep * 60;
+    for (let dir = 0; dir < 3; dir++) {
+        for (let a = 0; a < 3; a++) {
+            for (let b = 0; b < 3; b++) {
+                const rise = (b > 0 ? CONFIG.seatYOffset : 0) - (a > 0 ? CONFIG.seatYOffset : 0);
+                const dx = dir === 0 ? CONFIG.cellSize : 0;
+                const dy = [0, CONFIG.cellSize, -CONFIG.cellSize][dir] + rise;
+                const half = Math.sqrt(dx*dx + dy*dy) / 2 / perTick;
+                moveTickTable[(dir * 3 + a) * 3 + b] =
+                    Math.max(Math.ceil(half / speeds[a] + half / speeds[b] - 1e-9), 1);
+            }
+        }
+    }
+}
+
+// `speed` holds the speed class per cell; the forecast passes its own
+function moveTicks(from, to, speed = pathEngine.speed) {
+    const dir = to === from + CONFIG.cols ? 1 : (to === from - CONFIG.cols ? 2 : 0);
+    return moveTickTable[(dir * 3 + speed[from]) * 3 + speed[to]];
+}
+
+// Drop every reservation of a student ahead of it
+function releaseReservations(id) {
+    const store = students;
+    reservations.release(store.gridY[id] * CONFIG.cols + store.gridX[id], id);
+    const end = store.pathStart[id] + store.scheduleEnd[id];
+    for (let k = store.pathStart[id] + store.pathIndex[id]; k < end; k++) {
+        reservations.release(store.pathBuffer[k], id);
+    }
+}
+
+// Plans in a row without getting closer before a student stops yielding
+const MAX_STALLED_PLANS = 10;
+const END_HOLD_SLOTS = 2;
+
+// Plan the student's next window from the cell it stands on, leaving no
+// earlier than departTick, and reserve it. The search aims at the route cell
+// a window's walk ahead and the rest of the route follows the plan.
+// Returns false if the student has to wait instead; it then holds its cell
+// until it tries again.
+function planWindow(id, departTick) {
+    const store = students;
+    const table = reservations;
+    profiler.enter(PHASE_PATH);
+    releaseReservations(id);
+    const route = store.pathBuffer;
+    const start = store.gridY[id] * CONFIG.cols + store.gridX[id];
+    const first = store.pathStart[id] + store.pathIndex[id];
+    const end = store.pathStart[id] + store.pathLength[id];
+    const reach = CONFIG.reservation.window * table.slotTicks;
+    let target = first;
+    for (let prev = start, ticks = 0; target < end - 1; target++) {
+        ticks += moveTicks(prev, route[target]);
+        if (ticks >= reach) break;
+        prev = route[target];
+    }
+
+    let last;
+    if (store.stalls[id] < MAX_STALLED_PLANS) {
+        last = spaceTime.plan(id, table, start, simTick, departTick, route, first, target);
+        profiler.countSearch(spaceTime.lastExpanded);
+        store.stalls[id] = last >= first ? 0 : store.stalls[id] + 1;
+    } else {
+        // Boxed in: squeeze past along the route, as walkers do without reservations
+        spaceTime.walk(start, departTick, route, first, target);
+        last = target;
+        store.stalls[id] = 0;
+    }
+
+    const moves = spaceTime.cells;
+    const now = table.slotOf(simTick);
+    if (last < first) {
+        store.waitUntil[id] = Math.max(spaceTime.endTick, (now + 1) * table.slotTicks);
+        table.reserve(start, now, table.slotOf(store.waitUntil[id]), id);
+        profiler.leave();
+        return false;
+    }
+
+    const rest = route.slice(last + 1, end);
+    addRoute(id, -1);
+    const length = moves.length + rest.length;
+    const offset = length <= store.pathLength[id] ? store.pathStart[id] : store.reservePath(length);
+    store.pathBuffer.set(moves, offset);
+    store.pathDepart.set(spaceTime.departs, offset);
+    store.pathArrive.set(spaceTime.arrives, offset);
+    store.pathBuffer.set(rest, offset + moves.length);
+    store.pathStart[id] = offset;
+    store.pathLength[id] = length;
+    store.pathIndex[id] = 0;
+    store.scheduleEnd[id] = moves.length;
+    addRoute(id);
+
+    // Each cell is held from the move into it until the move out of it; the
+    // last one a little past the arrival, when the next window is planned
+    table.reserve(start, now, table.slotOf(spaceTime.departs[0]), id);
+    for (let k = 0; k < moves.length; k++) {
+        const leave = k + 1 < moves.length
+            ? table.slotOf(spaceTime.departs[k + 1])
+            : table.slotOf(spaceTime.arrives[k]) + END_HOLD_SLOTS;
+        table.reserve(moves[k], table.slotOf(spaceTime.departs[k]), leave, id);
+    }
+    profiler.leave();
+    return true;
+}
+
+// --- Initialization ---
+// Nodes and seats come straight from the compiled LAYOUT; the existing Node
+// and seat objects are reused when the grid size is unchanged
+function initGrid() {
+    resetGrid();
+    renderLayers();
+}
+
+// The empty hall: grid, seat pools and path state, without repainting
+function resetGrid() {
+    // LAYOUT never changes within a page, so only seats need resetting on a rerun
+    if (grid.length !== CONFIG.rows || grid[0].length !== CONFIG.cols) {
+        grid = [];
+        for (let y = 0; y < CONFIG.rows; y++) {
+            const row = [];
+            for (let x = 0; x < CONFIG.cols; x++) {
+                row.push(new Node(x, y, CELL_TYPES[LAYOUT.cells[y * CONFIG.cols + x]]));
+            }
+            grid.push(row);
+        }
+    }
+    seats.length = 0;
+
+    for (let k = 0; k < LAYOUT.seats.length; k++) {
+        const cell = LAYOUT.seats[k];
+        const node = grid[(cell / CONFIG.cols) | 0][cell % CONFIG.cols];
+        if (!node.seat) node.seat = {x: node.x, y: node.y, node: node};
+        node.occupied = false;
+        node.seat.assigned = false;
+        node.seat.index = k;
+        seats.push(node.seat);
+    }
+
+    if (!pathEngine || pathEngine.cols !== CONFIG.cols || pathEngine.rows !== CONFIG.rows) {
+        pathEngine = new PathEngine(CONFIG.cols, CONFIG.rows, LAYOUT);
+        entranceFields = [];
+        routeSearches = [];
+        routeLoad = new Int32Array(pathEngine.size);
+    }
+    routeLoad.fill(0);
+    freeRouteSearches = routeSearches.map((_, r) => r);
+    pathEngine.load(LAYOUT.cells);
+
+    if (CONFIG.reservation.enabled) {
+        const window = CONFIG.reservation.window;
+        if (!spaceTime || spaceTime.engine !== pathEngine || spaceTime.window !== window) {
+            spaceTime = new SpaceTimeSearch(pathEngine, window);
+            reservations = new ReservationTable(pathEngine.size, END_HOLD_SLOTS + window + 1);
+        }
+        reservations.reset(Math.max(Math.round(CONFIG.reservation.slotTime / CONFIG.fixedStep), 1));
+    }
+    buildMoveTicks();
+    if (spaceTime) spaceTime.minTicks = Math.min(...moveTickTable);
+
+    resetSeatPools();
+
+    if (!walkerHash) {
+        walkerHash = new SpatialHash(
+            Math.max(CONFIG.cellSize, CONFIG.avoidanceRadius),
+            CONFIG.cols * CONFIG.cellSize,
+            CONFIG.rows * CONFIG.cellSize + CONFIG.renderOffsetY
+        );
+    }
+
+    if (CONFIG.cols * CONFIG.rows >= CONFIG.hierarchyMinCells) {
+        // Full-grid fields per entrance get too costly; plan over clusters instead
+        entranceFields = [];
+        if (planner && planner.engine === pathEngine) {
+            planner.build();
+        } else {
+            // One cluster column per seat block with half of each neighbouring aisle,
+            // one cluster row per stretch between cross aisles
+            const blocks = CONFIG.seatBlocks.slice().sort((a, b) => a[0] - b[0]);
+            const xBreaks = blocks.slice(1).map(([x0], k) => (blocks[k][1] + 1 + x0) >> 1);
+            const yBreaks = [CONFIG.frontRows, CONFIG.rows - CONFIG.backRows].concat(CONFIG.aisleRows);
+            planner = new HierarchicalPlanner(pathEngine, xBreaks, yBreaks, CONFIG.clusterSpan);
+        }
+    } else {
+        planner = null;
+        if (entranceFields.length === ENTRANCES.length) {
+            entranceFields.forEach(field => field.rebuild());
+        } else {
+            entranceFields = ENTRANCES.map(e => new CostField(pathEngine, e.x, e.y));
+        }
+    }
+}
+
+// --- Profiler ---
+// Exclusive wall time per phase (a nested phase pauses the one around it),
+// a frame-interval histogram, search effort and crowd size. Costs nothing
+// while disabled; while enabled a snapshot goes to host.metrics once per
+// CONFIG.profileInterval seconds.
+const PHASE_SPAWN = 0;
+const PHASE_ASSIGN = 1;
+const PHASE_PATH = 2;
+const PHASE_UPDATE = 3;
+const PHASE_AVOIDANCE = 4;
+const PHASE_DRAW = 5;
+const PHASE_NAMES = ['spawn', 'assign', 'path', 'update', 'avoidance', 'draw'];
+const FRAME_BUCKETS_MS = [8, 16.7, 20, 33.3, 50, 100]; // Upper bounds; one more bucket above
+
+class Profiler {
+    constructor() {
+        this.enabled = false;
+        this.stack = new Int32Array(8);
+        this.depth = 0;
+        this.mark = 0;
+        this.frame = new Float64Array(PHASE_NAMES.length);   // This frame, ms
+        this.total = new Float64Array(PHASE_NAMES.length);   // This window, ms
+        this.peak = new Float64Array(PHASE_NAMES.length);    // Worst frame in this window, ms
+        this.histogram = new Uint32Array(FRAME_BUCKETS_MS.length + 1);
+        this.resetWindow();
+        this.lastTimestamp = -1;
+    }
+
+    setEnabled(enabled) {
+        this.enabled = enabled;
+        this.restart();
+    }
+
+    // Drop partial measurements, e.g. when a run starts
+    restart() {
+        this.depth = 0;
+        this.lastTimestamp = -1;
+        this.resetWindow();
+    }
+
+    resetWindow() {
+        this.total.fill(0);
+        this.peak.fill(0);
+        this.histogram.fill(0);
+        this.frames = 0;
+        this.intervalSum = 0;
+        this.intervalMax = 0;
+        this.workSum = 0;
+        this.workMax = 0;
+        this.searches = 0;
+        this.expanded = 0;
+        this.windowStart = performance.now();
+    }
+
+    enter(phase) {
+        if (!this.enabled) return;
+        const now = performance.now();
+        if (this.depth > 0) this.frame[this.stack[this.depth - 1]] += now - this.mark;
+        this.stack[this.depth++] = phase;
+        this.mark = now;
+    }
+
+    leave() {
+        if (!this.enabled || this.depth === 0) return;
+        const now = performance.now();
+        this.frame[this.stack[--this.depth]] += now - this.mark;
+        this.mark = now;
+    }
+
+    countSearch(expanded) {
+        if (!this.enabled) return;
+        this.searches++;
+        this.expanded += expanded;
+    }
+
+    // Frame boundaries; timestamp is the requestAnimationFrame time
+    beginFrame(timestamp) {
+        if (!this.enabled) return;
+        if (this.lastTimestamp >= 0) {
+            const interval = timestamp - this.lastTimestamp;
+            let bucket = 0;
+            while (bucket < FRAME_BUCKETS_MS.length && interval > FRAME_BUCKETS_MS[bucket]) bucket++;
+            this.histogram[bucket]++;
+            this.intervalSum += interval;
+            this.intervalMax = Math.max(this.intervalMax, interval);
+        }
+        this.lastTimestamp = timestamp;
+        this.frameStart = performance.now();
+        this.frame.fill(0);
+    }
+
+    endFrame() {
+        if (!this.enabled) return;
+        const now = performance.now();
+        const work = now - this.frameStart;
+        this.frames++;
+        this.workSum += work;
+        this.workMax = Math.max(this.workMax, work);
+        for (let p = 0; p < PHASE_NAMES.length; p++) {
+            this.total[p] += this.frame[p];
+            this.peak[p] = Math.max(this.peak[p], this.frame[p]);
+        }
+        if (now - this.windowStart >= CONFIG.profileInterval * 1000) {
+            host.metrics(this.snapshot(now));
+            this.resetWindow();
+        }
+    }
+
+    snapshot(now) {
+        const frames = Math.max(this.frames, 1);
+        const intervals = this.histogram.reduce((a, b) => a + b, 0);
+        const round = (ms) => Math.round(ms * 1000) / 1000;
+        const phases = {};
+        PHASE_NAMES.forEach((name, p) => {
+            phases[name] = { mean: round(this.total[p] / frames), max: round(this.peak[p]) };
+        });
+        const histogram = {};
+        FRAME_BUCKETS_MS.forEach((bound, b) => {
+            histogram[`${b === 0 ? 0 : FRAME_BUCKETS_MS[b - 1]}-${bound}`] = this.histogram[b];
+        });
+        histogram[`>${FRAME_BUCKETS_MS[FRAME_BUCKETS_MS.length - 1]}`] = this.histogram[FRAME_BUCKETS_MS.length];
+        return {
+            simTime: round(simTime),
+            fps: this.intervalSum > 0 ? round(1000 * intervals / this.intervalSum) : 0,
+            frames: this.frames,
+            frameMs: { mean: round(this.intervalSum / Math.max(intervals, 1)), max: round(this.intervalMax) },
+            workMs: { mean: round(this.workSum / frames), max: round(this.workMax) },
+            frameHistogram: histogram,
+            phases: phases,
+            searches: this.searches,
+            expandedPerSearch: this.searches > 0 ? round(this.expanded / this.searches) : 0,
+            active: students.activeCount,
+            seated: seatedCount,
+            detailLevel: governor.level,
+            windowMs: round(now - this.windowStart)
+        };
+    }
+}
+
+const profiler = new Profiler();
+
+// --- Frame Governor ---
+// Keeps each frame's work (stepping plus drawing) within CONFIG.frameBudgetMs
+// by giving up drawing detail, one level at a time: 1 draws every other
+// student's path, 2 draws no paths, 3 and 4 redraw every 2nd and 3rd frame.
+// It only ever touches drawing; the fixed simulation steps are the same at
+// every level, so a seed still gives the same run.
+const DETAIL_PATH_STRIDE = [1, 2, 0, 0, 0]; // 0: no paths
+const DETAIL_DRAW_EVERY = [1, 1, 1, 2, 3];
+
+class FrameGovernor {
+    constructor() {
+        this.reset();
+    }
+
+    reset() {
+        this.level = 0;
+        this.work = 0; // Smoothed work per frame in ms
+        this.streak = 0; // Frames in a row over budget (> 0) or with headroom (< 0)
+        this.frame = 0;
+    }
+
+    // Whether this frame should draw
+    shouldDraw() {
+        return this.frame++ % DETAIL_DRAW_EVERY[this.level] === 0;
+    }
+
+    pathStride() {
+        return DETAIL_PATH_STRIDE[this.level];
+    }
+
+    // Work of the frame just finished; drop a level after ~10 frames over
+    // budget, restore one after a second of using under half of it
+    record(workMs) {
+        const budget = CONFIG.frameBudgetMs;
+        if (!(budget > 0)) return;
+        this.work += (workMs - this.work) * 0.2;
+        if (this.work > budget) this.streak = Math.max(this.streak, 0) + 1;
+        else if (this.work < budget / 2) this.streak = Math.min(this.streak, 0) - 1;
+        else this.streak = 0;
+        if (this.streak >= 10 && this.level < DETAIL_DRAW_EVERY.length - 1) {
+            this.level++;
+            this.streak = 0;
+        } else if (this.streak <= -60 && this.level > 0) {
+            this.level--;
+            this.streak = 0;
+        }
+    }
+}
+
+const governor = new FrameGovernor();
+
+// --- Main Loop ---
+// Advance the simulation by exactly one fixed step
+function simStep(dt) {
+    if (CONFIG.reservation.enabled) reservations.advance(reservations.slotOf(simTick));
+
+    // Spawn Logic
+    if (students.count < seats.length) {
+        spawnTimer += dt;
+        if (spawnTimer > currentSpawnInterval()) {
+            spawnTimer = 0;
+            if (CONFIG.admission.enabled) {
+                admission.sample(students);
+                admission.adapt();
+            }
+            // Find random empty seat that hasn't been assigned
+            assignSeatToNewStudent();
+        }
+    }
+
+    // Update Logic
+    profiler.enter(PHASE_UPDATE);
+    walkerHash.rebuild(students);
+    // Backwards, so swap-removing a seated student never skips one
+    for (let k = students.activeCount - 1; k >= 0; k--) {
+        updateStudent(students.active[k], dt);
+    }
+    profiler.leave();
+    recorder.sample(students);
+    congestion.sample(students);
+    simTime += dt;
+    simTick++;
+}
+
+// A run with nobody seated fails once even the longest walk from an entrance
+// to a seat through the empty hall, after the first spawn and the longest
+// entry delay, would have ended FIRST_SEAT_MARGIN seconds ago. Large halls
+// need far longer than the margin alone just to reach their first seat.
+const FIRST_SEAT_MARGIN = 10;
+
+function firstSeatTimeout() {
+    const walk = longestWalkTicks() * CONFIG.fixedStep + CONFIG.spawnInterval + 1; // Entry delays end within 1 s
+    return Math.ceil(walk) + FIRST_SEAT_MARGIN;
+}
+
+// Ticks of the slowest seat to reach from any entrance, each seat reached
+// the fastest way through the empty hall: Dijkstra over moveTicks() per
+// entrance. Needs buildMoveTicks() for the current speeds.
+function longestWalkTicks() {
+    const engine = pathEngine;
+    const ticks = new Float64Array(engine.size);
+    const heap = new CellHeap(engine.size);
+    let longest = 0;
+    for (const entrance of ENTRANCES) {
+        const origin = entrance.y * CONFIG.cols + entrance.x;
+        ticks.fill(Infinity);
+        ticks[origin] = 0;
+        heap.reset(ticks);
+        heap.push(origin);
+        while (heap.size > 0) {
+            const u = heap.pop();
+            for (let k = engine.exitStart[u]; k < engine.exitStart[u + 1]; k++) {
+                const v = engine.exits[k];
+                const t = ticks[u] + moveTicks(u, v);
+                if (t < ticks[v]) {
+                    const queued = heap.pos[v] !== -1;
+                    ticks[v] = t;
+                    if (queued) heap.decrease(v);
+                    else heap.push(v);
+                }
+            }
+        }
+        for (const seat of seats) {
+            const t = ticks[seat.y * CONFIG.cols + seat.x];
+            if (t < Infinity && t > longest) longest = t;
+        }
+    }
+    return longest;
+}
+
+// Returns true once the run is over
+function checkEndConditions() {
+    if (!failTriggered && seatedCount === 0 && elapsedSeconds() >= firstSeatDeadline) {
+        endGame(false);
+        return true;
+    }
+
+    if (seatedCount >= seats.length) {
+        endGame(true);
+        return true;
+    }
+    return false;
+}
+
+function gameLoop(timestamp) {
+    if (!isRunning) return;
+    if (isPaused) return;
+
+    const frameDt = Math.min(Math.max((timestamp - lastTime) / 1000, 0), CONFIG.maxFrameDelta);
+    lastTime = timestamp;
+    profiler.beginFrame(timestamp);
+    const frameStart = performance.now();
+
+    if (simSpeed === Infinity) {
+        // Fast-forward to completion: step within a wall-time budget, skip drawing
+        const budgetEnd = performance.now() + CONFIG.fastForwardBudgetMs;
+        do {
+            simStep(CONFIG.fixedStep);
+            if (checkEndConditions()) return;
+        } while (performance.now() < budgetEnd);
+    } else {
+        accumulator += frameDt * simSpeed;
+        while (accumulator >= CONFIG.fixedStep) {
+            simStep(CONFIG.fixedStep);
+            accumulator -= CONFIG.fixedStep;
+            if (checkEndConditions()) return;
+        }
+        if (governor.shouldDraw()) {
+            profiler.enter(PHASE_DRAW);
+            draw();
+            profiler.leave();
+        }
+        governor.record(performance.now() - frameStart);
+    }
+
+    // Timer
+    if (elapsedSeconds() !== lastReportedSecond) {
+        lastReportedSecond = elapsedSeconds();
+        host.time(lastReportedSecond);
+    }
+
+    profiler.endFrame();
+    animationId = scheduleFrame(gameLoop);
+}
+
+// Workers without requestAnimationFrame fall back to a 60 Hz timer
+const scheduleFrame = typeof requestAnimationFrame === 'function'
+    ? (callback) => requestAnimationFrame(callback)
+    : (callback) => setTimeout(() => callback(performance.now()), 1000 / 60);
+const cancelFrame = typeof cancelAnimationFrame === 'function'
+    ? (id) => cancelAnimationFrame(id)
+    : (id) => clearTimeout(id);
+
+// --- Rendering ---
+// Three layers: a static background prerendered once, a seat layer where only
+// seats whose occupied/assigned state changed are repainted, and the visible
+// canvas, which composites both and draws students and paths every frame.
+let staticLayer = null;
+let seatLayer = null;
+let seatCtx = null;
+let dirtySeats = [];
+let spriteAtlas = null; // One pre-rendered student dot per palette colour
+let pathFocus = null;   // Cursor position when only nearby paths are drawn
+let pathsNearCursorOnly = false;
+const SPRITE_SIZE = 20;
+const STUDENT_RADIUS = 8;
+
+// Offscreen canvas that works both in the page and inside a worker
+function createLayer(width = canvas.width, height = canvas.height) {
+    if (typeof document === 'undefined') return new OffscreenCanvas(width, height);
+    const layer = document.createElement('canvas');
+    layer.width = width;
+    layer.height = height;
+    return layer;
+}
+
+function renderStaticLayer() {
+    const layerCtx = staticLayer.getContext('2d');
+    layerCtx.clearRect(0, 0, staticLayer.width, staticLayer.height);
+
+    // Front area cells
+    layerCtx.fillStyle = '#d1d1d1';
+    for (let y = 0; y < CONFIG.rows; y++) {
+        for (let x = 0; x < CONFIG.cols; x++) {
+            if (grid[y][x].type === 'front') {
+                layerCtx.fillRect(gridOriginX(x), gridOriginY(y), CONFIG.cellSize, CONFIG.cellSize);
+            }
+        }
+    }
+
+    // Draw Professor Area
+    layerCtx.fillStyle = '#333';
+    const centerX = CONFIG.cols * CONFIG.cellSize / 2;
+    layerCtx.fillRect(centerX - 200, CONFIG.renderOffsetY + 10, 400, 20); // Blackboard
+    layerCtx.fillStyle = '#8B4513';
+    // Keep the desk within the front row so it doesn't overlap the first seating row
+    layerCtx.fillRect(centerX - 50, CONFIG.renderOffsetY + 25, 100, 18); // Desk
+
+    // Draw Entrances
+    layerCtx.fillStyle = '#00cc66';
+    ENTRANCES.forEach(e => {
+        layerCtx.fillRect(gridOriginX(e.x), gridOriginY(e.y) + 15, CONFIG.cellSize, 10);
+    });
+}
+
+function paintSeat(seat) {
+    const px = gridOriginX(seat.x) + 2;
+    const py = gridOriginY(seat.y) + 2 + CONFIG.seatYOffset;
+    const size = CONFIG.cellSize - 4;
+    seatCtx.clearRect(px, py, size, size);
+    // Red if occupied, inverted (dark) while a student is on the way, Grey if empty
+    seatCtx.fillStyle = seat.node.occupied ? '#ff4b4b' : (seat.assigned ? '#1f1f1f' : '#e0e0e0');
+    seatCtx.fillRect(px, py, size, size);
+    // Armrests
+    seatCtx.fillStyle = '#999';
+    seatCtx.fillRect(px, py + size - 2, size, 2);
+}
+
+function renderSeatLayer() {
+    seatCtx.clearRect(0, 0, seatLayer.width, seatLayer.height);
+    seats.forEach(paintSeat);
+    dirtySeats.length = 0;
+}
+
+function markSeatDirty(seat) {
+    dirtySeats.push(seat);
+}
+
+function buildSpriteAtlas() {
+    spriteAtlas = createLayer(SPRITE_SIZE * PALETTE.length, SPRITE_SIZE);
+    const atlasCtx = spriteAtlas.getContext('2d');
+    atlasCtx.strokeStyle = 'white';
+    atlasCtx.lineWidth = 1;
+    PALETTE.forEach((color, i) => {
+        atlasCtx.beginPath();
+        atlasCtx.fillStyle = color;
+        atlasCtx.arc(i * SPRITE_SIZE + SPRITE_SIZE / 2, SPRITE_SIZE / 2, STUDENT_RADIUS, 0, Math.PI * 2);
+        atlasCtx.fill();
+        atlasCtx.stroke();
+    });
+}
+
+// One dashed Path2D stroke per palette colour, then one drawImage per dot
+function drawStudents(ctx) {
+    const store = students;
+    const focus = pathsNearCursorOnly ? pathFocus : null;
+    const paths = new Array(PALETTE.length).fill(null);
+    const stride = isRunning ? governor.pathStride() : 1;
+    for (let k = 0; stride > 0 && k < store.activeCount; k++) {
+        const id = store.active[k];
+        if (id % stride !== 0) continue; // By id, so the same paths stay visible
+        const c = store.colorIndex[id];
+        if (!paths[c]) paths[c] = new Path2D();
+        traceStudentPath(id, paths[c], focus);
+    }
+
+    if (!pathsNearCursorOnly || focus) {
+        ctx.setLineDash([3, 3]);
+        ctx.lineWidth = 2;
+        for (let c = 0; c < paths.length; c++) {
+            if (!paths[c]) continue;
+            ctx.strokeStyle = PALETTE[c];
+            ctx.stroke(paths[c]);
+        }
+        ctx.setLineDash([]);
+    }
+
+    const half = SPRITE_SIZE / 2;
+    for (let k = 0; k < store.activeCount; k++) {
+        const id = store.active[k];
+        ctx.drawImage(spriteAtlas, store.colorIndex[id] * SPRITE_SIZE, 0, SPRITE_SIZE, SPRITE_SIZE,
+            store.x[id] - half, store.y[id] - half, SPRITE_SIZE, SPRITE_SIZE);
+    }
+}
+
+// Called from initGrid: the static layer is built once, seats are repainted on every reset
+function renderLayers() {
+    if (!staticLayer) {
+        staticLayer = createLayer();
+        renderStaticLayer();
+        seatLayer = createLayer();
+        seatCtx = seatLayer.getContext('2d');
+        buildSpriteAtlas();
+    }
+    renderSeatLayer();
+}
+
+function draw() {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+    for (let i = 0; i < dirtySeats.length; i++) paintSeat(dirtySeats[i]);
+    dirtySeats.length = 0;
+
+    ctx.drawImage(staticLayer, 0, 0);
+    ctx.drawImage(seatLayer, 0, 0);
+
+    if (congestion.visible) congestion.draw(ctx);
+
+    // Draw Students
+    drawStudents(ctx);
+}
+
+// --- Congestion Heatmap ---
+// Per-cell totals indexed like `grid` (y * cols + x): `dwell` counts the
+// steps walkers spent in a cell, `visits` the walkers that stepped into it.
+// Both are bumped once per walker per step and kept after the run ends. The
+// overlay is one pixel per cell put into a small layer and stretched over the
+// grid with a single drawImage, repainted at most every heatmapRefresh seconds.
+class CongestionMap {
+    constructor() {
+        this.visible = false;
+        this.lastCell = new Int32Array(0); // Per walker id, -1 before its first step
+        this.layer = null;
+        this.paintedAt = -Infinity;
+        this.reset();
+    }
+
+    reset() {
+        const size = CONFIG.cols * CONFIG.rows;
+        if (!this.dwell || this.dwell.length !== size) {
+            this.dwell = new Uint32Array(size);
+            this.visits = new Uint32Array(size);
+        } else {
+            this.dwell.fill(0);
+            this.visits.fill(0);
+        }
+        this.lastCell.fill(-1);
+        this.ticks = 0;
+        this.paintedAt = -Infinity;
+    }
+
+    sample(store) {
+        if (this.lastCell.length < store.capacity) {
+            const next = new Int32Array(store.capacity).fill(-1);
+            next.set(this.lastCell);
+            this.lastCell = next;
+        }
+        const cols = CONFIG.cols;
+        for (let k = 0; k < store.activeCount; k++) {
+            const id = store.active[k];
+            const cell = store.gridY[id] * cols + store.gridX[id];
+            this.dwell[cell]++;
+            if (this.lastCell[id] !== cell) {
+                this.lastCell[id] = cell;
+                this.visits[cell]++;
+            }
+        }
+        this.ticks++;
+    }
+
+    setVisible(visible) {
+        this.visible = visible;
+        this.paintedAt = -Infinity;
+    }
+
+    // Transparent where nobody stood, through yellow to opaque red at the busiest cell
+    paint() {
+        if (!this.layer) {
+            this.layer = createLayer(CONFIG.cols, CONFIG.rows);
+            this.layerCtx = this.layer.getContext('2d');
+            this.image = this.layerCtx.createImageData(CONFIG.cols, CONFIG.rows);
+        }
+        const dwell = this.dwell;
+        const pixels = this.image.data;
+        let max = 0;
+        for (let i = 0; i < dwell.length; i++) if (dwell[i] > max) max = dwell[i];
+        const scale = max > 0 ? 1 / Math.sqrt(max) : 0; // Square root keeps quieter cells visible
+        for (let i = 0, at = 0; i < dwell.length; i++, at += 4) {
+            const t = Math.sqrt(dwell[i]) * scale;
+            pixels[at] = 255;
+            pixels[at + 1] = 220 * (1 - t);
+            pixels[at + 2] = 0;
+            pixels[at + 3] = t > 0 ? 60 + 160 * t : 0;
+        }
+        this.layerCtx.putImageData(this.image, 0, 0);
+    }
+
+    draw(ctx) {
+        const now = performance.now();
+        if (now - this.paintedAt >= CONFIG.heatmapRefresh * 1000) {
+            this.paint();
+            this.paintedAt = now;
+        }
+        ctx.imageSmoothingEnabled = false;
+        ctx.drawImage(this.layer, 0, 0, CONFIG.cols, CONFIG.rows,
+            0, CONFIG.renderOffsetY, CONFIG.cols * CONFIG.cellSize, CONFIG.rows * CONFIG.cellSize);
+        ctx.imageSmoothingEnabled = true;
+    }
+
+    // Copies of the totals for the host (see congestion.py), or null before any step
+    snapshot(outcome) {
+        if (this.ticks === 0) return null;
+        this.paintedAt = -Infinity;
+        return {
+            layout: LAYOUT.key,
+            outcome,
+            cols: CONFIG.cols,
+            rows: CONFIG.rows,
+            dt: CONFIG.fixedStep,
+            ticks: this.ticks,
+            dwell: this.dwell.slice().buffer,
+            visits: this.visits.slice().buffer
+        };
+    }
+}
+
+const congestion = new CongestionMap();
+
+// --- Seat Assignment ---
+// Unordered set of seat indices with O(1) add, remove and random draw
+class SeatPool {
+    constructor(capacity) {
+        this.items = new Int32Array(capacity);
+        this.slot = new Int32Array(capacity).fill(-1);
+        this.size = 0;
+    }
+
+    fill(count) {
+        if (this.items.length < count) {
+            this.items = new Int32Array(count);
+            this.slot = new Int32Array(count);
+        }
+        for (let i = 0; i < count; i++) {
+            this.items[i] = i;
+            this.slot[i] = i;
+        }
+        this.size = count;
+    }
+
+    has(i) {
+        return this.slot[i] !== -1;
+    }
+
+    remove(i) {
+        const slot = this.slot[i];
+        if (slot === -1) return;
+        const last = this.items[--this.size];
+        this.items[slot] = last;
+        this.slot[last] = slot;
+        this.slot[i] = -1;
+    }
+
+    draw(r) {
+        return this.items[Math.floor(r * this.size)];
+    }
+}
+
+// freeSeats holds every unassigned seat. spacedSeats is the subset that also
+// has no taken seat beside it ("no occupied neighbour"); it is maintained as
+// seats are handed out rather than rescanned.
+const freeSeats = new SeatPool(CONFIG.seatTotal);
+const spacedSeats = new SeatPool(CONFIG.seatTotal);
+
+function seatAt(x, y) {
+    if (y < 0 || y >= CONFIG.rows || x < 0 || x >= CONFIG.cols) return null;
+    const node = grid[y][x];
+    return node.type === 'seat' ? node.seat : null;
+}
+
+function resetSeatPools() {
+    freeSeats.fill(seats.length);
+    spacedSeats.fill(seats.length);
+}
+
+function takeSeat(seat) {
+    seat.assigned = true;
+    freeSeats.remove(seat.index);
+    spacedSeats.remove(seat.index);
+    const left = seatAt(seat.x - 1, seat.y);
+    const right = seatAt(seat.x + 1, seat.y);
+    if (left) spacedSeats.remove(left.index);
+    if (right) spacedSeats.remove(right.index);
+    markSeatDirty(seat);
+}
+
+// Seat-selection policies. reset() runs at the start of every run (after the
+// rng is seeded); choose(entranceIndex) returns a free seat, or null to fall
+// back to a random free one. entranceFor(k), when present, picks the k-th
+// student's entrance instead of a random door; usesEntrance marks policies
+// whose choice depends on the entrance.
+function aisleDistance(seat) {
+    let left = 0;
+    while (seatAt(seat.x - left - 1, seat.y)) left++;
+    let right = 0;
+    while (seatAt(seat.x + right + 1, seat.y)) right++;
+    return Math.min(left, right);
+}
+
+// Fixed seat order by key, ties in random order; a cursor skips taken seats
+function orderedPolicy(key) {
+    let order = [];
+    let cursor = 0;
+    return {
+        reset() {
+            const keys = seats.map(key);
+            const tie = seats.map(() => rng());
+            order = seats.map(seat => seat.index).sort((a, b) => keys[a] - keys[b] || tie[a] - tie[b]);
+            cursor = 0;
+        },
+        choose() {
+            while (cursor < order.length && seats[order[cursor]].assigned) cursor++;
+            return cursor < order.length ? seats[order[cursor]] : null;
+        }
+    };
+}
+
+// One ordered policy per entrance, by path cost from that entrance
+function nearestEntrancePolicy() {
+    const perEntrance = ENTRANCES.map((_, e) => orderedPolicy(seat => entranceEstimate(e, seat)));
+    return {
+        usesEntrance: true,
+        reset() { perEntrance.forEach(policy => policy.reset()); },
+        choose(entranceIndex) { return perEntrance[entranceIndex].choose(); }
+    };
+}
+
+const SEAT_POLICIES = {
+    // README rule: prefer seats with no taken neighbour, plus a 1/250 chance
+    // to sit next to the previous student
+    spacing: {
+        reset() {},
+        choose() {
+            const pool = spacedSeats.size > 0 ? spacedSeats : freeSeats;
+            let target = seats[pool.draw(rng())];
+            const recentSeat = students.count > 0 ? seats[students.seat[students.count - 1]] : null;
+            const chance = Math.floor(rng() * 250) === 0;
+            if (chance && recentSeat) {
+                const buddySeat = [seatAt(recentSeat.x - 1, recentSeat.y), seatAt(recentSeat.x + 1, recentSeat.y)]
+                    .find(seat => seat && !seat.assigned);
+                if (buddySeat) target = buddySeat;
+            }
+            return target;
+        }
+    },
+    frontToBack: orderedPolicy(seat => seat.y),
+    backToFront: orderedPolicy(seat => -seat.y),
+    aislesInward: orderedPolicy(aisleDistance),
+    nearestEntrance: nearestEntrancePolicy(),
+    // Plays back SCHEDULE from optimizer.py
+    planned: {
+        reset() {},
+        entranceFor: (k) => SCHEDULE.entrances[k],
+        choose() {
+            const seat = seats[SCHEDULE.seats[students.count]];
+            return seat && !seat.assigned ? seat : null;
+        }
+    }
+};
+
+// Configured policy, or spacing when it is unknown or has no schedule to play
+function seatPolicyName() {
+    const name = CONFIG.seatPolicy;
+    if (!(name in SEAT_POLICIES) || (name === 'planned' && !SCHEDULE)) return 'spacing';
+    return name;
+}
+
+function activeSeatPolicy() {
+    return SEAT_POLICIES[seatPolicyName()];
+}
+
+// --- Admission Control ---
+// Samples the crowd at each entrance and on the aisles before every spawn.
+// The spawn interval shrinks while some door and the aisles have room and
+// grows once every door is crowded or the aisles are full, so arrivals track
+// what the hall can carry; each student goes through the door with the
+// lowest expected time to seat (queue at the door plus walk).
+class AdmissionController {
+    constructor() {
+        this.doorCrowd = new Int32Array(ENTRANCES.length);
+        this.aisleWalkers = 0;
+        this.aisleCells = 1;
+        this.interval = CONFIG.spawnInterval;
+    }
+
+    reset() {
+        let cells = 0;
+        for (let i = 0; i < pathEngine.type.length; i++) {
+            if (pathEngine.type[i] === CELL_AISLE) cells++;
+        }
+        this.aisleCells = Math.max(cells, 1);
+        this.interval = CONFIG.spawnInterval;
+    }
+
+    sample(store) {
+        const radius = CONFIG.admission.doorRadius;
+        this.doorCrowd.fill(0);
+        this.aisleWalkers = 0;
+        for (let k = 0; k < store.activeCount; k++) {
+            const id = store.active[k];
+            const x = pixelToGridX(store.x[id]);
+            const y = pixelToGridY(store.y[id]);
+            for (let e = 0; e < ENTRANCES.length; e++) {
+                if (Math.abs(x - ENTRANCES[e].x) <= radius && Math.abs(y - ENTRANCES[e].y) <= radius) {
+                    this.doorCrowd[e]++;
+                }
+            }
+            const node = grid[y] && grid[y][x];
+            if (node && node.type === 'aisle') this.aisleWalkers++;
+        }
+    }
+
+    // Next spawn interval from the latest sample
+    adapt() {
+        const settings = CONFIG.admission;
+        const doorLoad = Math.min(...this.doorCrowd) / settings.doorCapacity;
+        const aisleLoad = this.aisleWalkers / (this.aisleCells * settings.aisleDensity);
+        this.interval = Math.max(doorLoad, aisleLoad) >= 1
+            ? Math.min(this.interval * 1.25, settings.maxInterval)
+            : Math.max(this.interval * 0.9, settings.minInterval);
+    }
+
+    // Seconds from spawning at entrance e until seated at seat
+    expectedTime(e, seat) {
+        const walk = entranceEstimate(e, seat) * CONFIG.cellSize / (CONFIG.speeds.aisle * 60);
+        return this.doorCrowd[e] * CONFIG.admission.doorClearTime + walk;
+    }
+
+    // Entrance and seat for the next student under a policy without a fixed door
+    choose(policy) {
+        let best = null;
+        if (policy.usesEntrance) {
+            for (let e = 0; e < ENTRANCES.length; e++) {
+                const seat = policy.choose(e);
+                if (!seat) continue;
+                const time = this.expectedTime(e, seat);
+                if (!best || time < best.time) best = { entranceIndex: e, seat, time };
+            }
+            if (best) return best;
+        }
+        const seat = policy.choose(0) || seats[freeSeats.draw(rng())];
+        for (let e = 0; e < ENTRANCES.length; e++) {
+            const time = this.expectedTime(e, seat);
+            if (!best || time < best.time) best = { entranceIndex: e, seat, time };
+        }
+        return best;
+    }
+}
+
+const admission = new AdmissionController();
+
+function currentSpawnInterval() {
+    return CONFIG.admission.enabled ? admission.interval : CONFIG.spawnInterval;
+}
+
+function assignSeatToNewStudent() {
+    if (freeSeats.size === 0) return;
+    profiler.enter(PHASE_ASSIGN);
+    const { seat, entranceIndex } = chooseArrival();
+    profiler.leave();
+    const id = spawnStudent(seat.index, entranceIndex);
+    pathCostSum += students.pathCost[id];
+    peakWalkers = Math.max(peakWalkers, students.activeCount);
+}
+
+// Seat (taken here) and entrance for the next student under the active policy
+function chooseArrival() {
+    const policy = activeSeatPolicy();
+    let entranceIndex;
+    let target;
+    if (policy.entranceFor) {
+        entranceIndex = policy.entranceFor(students.count);
+        target = policy.choose(entranceIndex);
+    } else if (CONFIG.admission.enabled) {
+        ({ entranceIndex, seat: target } = admission.choose(policy));
+    } else {
+        entranceIndex = Math.floor(rng() * ENTRANCES.length);
+        target = policy.choose(entranceIndex);
+    }
+    target = target || seats[freeSeats.draw(rng())];
+    takeSeat(target);
+    return { seat: target, entranceIndex };
+}
+
+// --- Event-driven forecast ---
+// Fills the hall without frames. Seats, entrances, entry delays and spawn
+// timing come from the same code and rng draws as a run with the seed. Each
+// walker's arrival at its next route cell is an entry in a heap keyed by
+// fixed-step tick, the next spawn is one more, and the clock jumps from
+// entry to entry; a step takes the ticks moveTicks() gives (CONFIG.speeds).
+// When a student sits down, the forecast's own copy of the seat's cost and
+// speed class rises as markSeatOccupied raises the live grid's: later
+// students take the repaired entrance field's path, and anyone walking
+// through the seat slows to occupiedSeat. Walkers never get in each other's
+// way, and a walker keeps the route it set out on where a live run would
+// re-plan it around a newly taken seat, so the time is a congestion-free
+// estimate. The forecast borrows the seat pools and student store while no
+// run is active.
+let forecastEngine = null; // The move tables of pathEngine with the forecast's own cost and speed
+let forecastFields = []; // Per entrance, on forecastEngine
+let forecastEmpty = []; // Each field's dist and pred over the empty hall, restored before every run
+let forecastDue = new Float64Array(0); // Tick of each walker's next arrival; the last slot is the next spawn
+let forecastHeap = null;
+
+function forecastFill(seeds) {
+    if (isRunning) return null;
+    applyPendingSession();
+    buildMoveTicks();
+    const started = performance.now();
+    buildForecastFields();
+    const savedRng = rng;
+    const seconds = seeds.map(forecastRun);
+    rng = savedRng;
+    for (const seat of seats) seat.assigned = false;
+    resetSeatPools();
+    students.reset(seats.length);
+    dirtySeats.length = 0; // The seat layer already shows the empty hall
+    if (replay) replay.restore();
+    return { seeds, seconds, msPerRun: (performance.now() - started) / Math.max(seeds.length, 1) };
+}
+
+// Entrance fields over a private copy of the empty hall's costs, built once per grid
+function buildForecastFields() {
+    if (forecastEngine && forecastEngine.base === pathEngine) return;
+    const base = pathEngine;
+    forecastEngine = {
+        base,
+        cols: base.cols,
+        size: base.size,
+        exitStart: base.exitStart,
+        exits: base.exits,
+        entryStart: base.entryStart,
+        entries: base.entries,
+        cost: Float32Array.from(base.cost),
+        speed: Uint8Array.from(base.speed)
+    };
+    forecastFields = ENTRANCES.map(e => new CostField(forecastEngine, e.x, e.y));
+    forecastEmpty = forecastFields.map(field => ({ dist: field.dist.slice(), pred: field.pred.slice() }));
+}
+
+// Seconds until the last student sits for one seed, or null if some never can
+function forecastRun(seed) {
+    const total = seats.length;
+    const store = students;
+    store.reset(total);
+    rng = createRng(seed);
+    for (const seat of seats) seat.assigned = false;
+    resetSeatPools();
+    activeSeatPolicy().reset();
+    admission.reset();
+    const engine = forecastEngine;
+    engine.cost.set(engine.base.cost);
+    engine.speed.set(engine.base.speed);
+    forecastFields.forEach((field, e) => {
+        field.dist.set(forecastEmpty[e].dist);
+        field.pred.set(forecastEmpty[e].pred);
+    });
+
+    if (forecastDue.length < total + 1) {
+        forecastDue = new Float64Array(total + 1);
+        forecastHeap = new CellHeap(total + 1);
+    }
+    const due = forecastDue;
+    const heap = forecastHeap;
+    heap.reset(due);
+    const speed = engine.speed;
+    const fold = !CONFIG.admission.enabled; // Nothing samples positions between events
+    const spawnSlot = total;
+    // simStep spawns once spawnTimer passes the interval, before moving anyone;
+    // the half ticks put a spawn ahead of the arrivals of its tick
+    const spawnTicks = () => Math.floor(currentSpawnInterval() / CONFIG.fixedStep + 1e-9) + 1;
+    due[spawnSlot] = spawnTicks() - 1.5;
+    heap.push(spawnSlot);
+
+    // The entry due next stays on top of the heap and is re-keyed in place
+    // while it has more to do
+    let seated = 0;
+    let lastTick = 0;
+    while (heap.size > 0) {
+        const id = heap.items[0];
+        if (id === spawnSlot) {
+            const tick = due[id] + 0.5;
+            if (CONFIG.admission.enabled) {
+                admission.sample(store);
+                admission.adapt();
+            }
+            const { seat, entranceIndex } = chooseArrival();
+            const walker = forecastPlace(seat, entranceIndex);
+            if (store.count < total) {
+                due[spawnSlot] = tick + spawnTicks() - 0.5;
+                heap.update(spawnSlot);
+            } else {
+                heap.pop();
+            }
+            if (store.pathLength[walker] > 0) {
+                const entrance = ENTRANCES[entranceIndex];
+                const first = store.pathBuffer[store.pathStart[walker]];
+                due[walker] = tick + Math.ceil(store.entryDelay[walker] / CONFIG.fixedStep) +
+                    moveTicks(entrance.y * CONFIG.cols + entrance.x, first, speed);
+                heap.push(walker);
+            }
+            continue;
+        }
+
+        const tick = due[id];
+        const cell = store.pathBuffer[store.pathStart[id] + store.pathIndex[id]];
+        store.x[id] = cellCenterX(cell);
+        store.y[id] = cellCenterY(cell);
+        if (++store.pathIndex[id] < store.pathLength[id]) {
+            due[id] = tick + forecastLeg(id, cell, fold);
+            heap.update(id);
+            continue;
+        }
+        heap.pop();
+        store.retire(id);
+        forecastOccupy(cell);
+        seated++;
+        lastTick = tick;
+    }
+    return seated === total ? (lastTick + 1) * CONFIG.fixedStep : null;
+}
+
+// Ticks from `cell` to the walker's next route cell, pathIndex. With `fold`,
+// steps between two aisle cells, whose speed never changes, run on without
+// an event of their own, leaving pathIndex at the last cell reached.
+function forecastLeg(id, cell, fold) {
+    const store = students;
+    const speed = forecastEngine.speed;
+    const start = store.pathStart[id];
+    let next = store.pathBuffer[start + store.pathIndex[id]];
+    let ticks = moveTicks(cell, next, speed);
+    while (fold && store.pathIndex[id] + 1 < store.pathLength[id] && speed[next] === 0) {
+        const after = store.pathBuffer[start + store.pathIndex[id] + 1];
+        if (speed[after] !== 0) break;
+        ticks += moveTicks(next, after, speed);
+        store.pathIndex[id]++;
+        next = after;
+    }
+    return ticks;
+}
+
+// The forecast's markSeatOccupied: raise the seat's cost and speed class
+// and repair the entrance fields
+function forecastOccupy(cell) {
+    forecastEngine.cost[cell] = 4; // Node.getCost() of an occupied seat
+    forecastEngine.speed[cell] = 2;
+    forecastFields.forEach(field => field.cellChanged(cell));
+}
+
+// A walker at the entrance with the forecast field's path to its seat
+function forecastPlace(seat, entranceIndex) {
+    const store = students;
+    const id = store.add();
+    const entrance = ENTRANCES[entranceIndex];
+    store.x[id] = gridCenterX(entrance.x);
+    store.y[id] = gridCenterY(entrance.y);
+    store.seat[id] = seat.index;
+    store.entryDelay[id] = 0.5 + rng() * 0.5; // As drawn in placeStudent
+    const field = forecastFields[entranceIndex];
+    const length = field.pathLength(seat.x, seat.y);
+    const offset = store.reservePath(length);
+    field.writePath(seat.x, seat.y, store.pathBuffer, offset);
+    store.pathStart[id] = offset;
+    store.pathLength[id] = length;
+    store.pathIndex[id] = 0;
+    return id;
+}
+
+// --- Replay ---
+// Trace layout, all little-endian (replay.py reads the same bytes):
+//   header  REPLAY_HEADER_BYTES: magic, version, quant, cols, rows, cellSize,
+//           renderOffsetY, dt, seed, seats, ticks, agents, events, samples, outcome
+//   events  REPLAY_EVENT_BYTES each: tick u32, agent u32, seat u32, x i32,
+//           y i32, kind u8, entrance u8, colour u8, pad u8
+//   counts  u32 per tick: walkers sampled in that tick
+//   deltas  i8 (dx, dy) per sample, tick-major, walkers by ascending id
+// Positions are in 1/REPLAY_QUANT px. A walker is sampled from its spawn
+// tick (delta from the spawn event's x, y) through the tick it sits down.
+const REPLAY_MAGIC = 0x4C505253; // 'SRPL'
+const REPLAY_VERSION = 2; // 2: i32 spawn positions and u32 counts, for canvases past 8191 px
+const REPLAY_QUANT = 4;
+const REPLAY_HEADER_BYTES = 52;
+const REPLAY_EVENT_BYTES = 24;
+const REPLAY_SPAWN = 0;
+const REPLAY_SEATED = 1;
+const REPLAY_OUTCOMES = ['success', 'failure', 'reset'];
+
+class ReplayRecorder {
+    constructor() {
+        this.deltas = new Int8Array(1 << 16);
+        this.counts = new Uint32Array(1024);
+        this.qx = new Int32Array(256); // Last recorded position per walker
+        this.qy = new Int32Array(256);
+        this.events = [];
+        this.live = []; // Walker ids being sampled, ascending
+        this.leaving = [];
+        this.reset(0);
+    }
+
+    reset(seed) {
+        this.seed = seed;
+        this.samples = 0;
+        this.ticks = 0;
+        this.agents = 0;
+        this.events.length = 0;
+        this.live.length = 0;
+        this.leaving.length = 0;
+    }
+
+    spawn(id, seatIndex, entranceIndex, colorIndex, x, y) {
+        if (!CONFIG.recordReplay) return;
+        if (id >= this.qx.length) {
+            const grow = (column) => { const next = new Int32Array(id * 2); next.set(column); return next; };
+            this.qx = grow(this.qx);
+            this.qy = grow(this.qy);
+        }
+        this.qx[id] = Math.round(x * REPLAY_QUANT);
+        this.qy[id] = Math.round(y * REPLAY_QUANT);
+        this.events.push([this.ticks, id, seatIndex, this.qx[id], this.qy[id], REPLAY_SPAWN, entranceIndex, colorIndex]);
+        this.live.push(id); // Ids are handed out in order, so this keeps live sorted
+        this.agents = id + 1;
+    }
+
+    seated(id, seatIndex) {
+        if (!CONFIG.recordReplay) return;
+        this.events.push([this.ticks, id, seatIndex, 0, 0, REPLAY_SEATED, 0, 0]);
+        this.leaving.push(id);
+    }
+
+    // Record every live walker once per simulation step
+    sample(store) {
+        if (!CONFIG.recordReplay) return;
+        const live = this.live;
+        if (this.ticks === this.counts.length) {
+            const next = new Uint32Array(this.counts.length * 2);
+            next.set(this.counts);
+            this.counts = next;
+        }
+        this.counts[this.ticks++] = live.length;
+        if ((this.samples + live.length) * 2 > this.deltas.length) {
+            const next = new Int8Array(Math.max(this.deltas.length * 2, (this.samples + live.length) * 2));
+            next.set(this.deltas);
+            this.deltas = next;
+        }
+        let at = this.samples * 2;
+        for (let k = 0; k < live.length; k++) {
+            const id = live[k];
+            // Clamped steps carry the rest over to later ticks instead of drifting
+            const dx = Math.max(-127, Math.min(127, Math.round(store.x[id] * REPLAY_QUANT) - this.qx[id]));
+            const dy = Math.max(-127, Math.min(127, Math.round(store.y[id] * REPLAY_QUANT) - this.qy[id]));
+            this.qx[id] += dx;
+            this.qy[id] += dy;
+            this.deltas[at++] = dx;
+            this.deltas[at++] = dy;
+        }
+        this.samples += live.length;
+        if (this.leaving.length > 0) {
+            this.live = live.filter(id => !this.leaving.includes(id));
+            this.leaving.length = 0;
+        }
+    }
+
+    // The trace as an ArrayBuffer, or null if nothing was recorded
+    finish(outcome) {
+        if (!CONFIG.recordReplay || this.ticks === 0) return null;
+        const eventsAt = REPLAY_HEADER_BYTES;
+        const countsAt = eventsAt + this.events.length * REPLAY_EVENT_BYTES;
+        const deltasAt = countsAt + this.ticks * 4;
+        const buffer = new ArrayBuffer(deltasAt + this.samples * 2);
+        const view = new DataView(buffer);
+        view.setUint32(0, REPLAY_MAGIC, true);
+        view.setUint16(4, REPLAY_VERSION, true);
+        view.setUint16(6, REPLAY_QUANT, true);
+        view.setUint16(8, CONFIG.cols, true);
+        view.setUint16(10, CONFIG.rows, true);
+        view.setFloat32(12, CONFIG.cellSize, true);
+        view.setFloat32(16, CONFIG.renderOffsetY, true);
+        view.setFloat32(20, CONFIG.fixedStep, true);
+        view.setUint32(24, this.seed >>> 0, true);
+        view.setUint32(28, seats.length, true);
+        view.setUint32(32, this.ticks, true);
+        view.setUint32(36, this.agents, true);
+        view.setUint32(40, this.events.length, true);
+        view.setUint32(44, this.samples, true);
+        view.setUint8(48, REPLAY_OUTCOMES.indexOf(outcome));
+        this.events.forEach(([tick, agent, seat, x, y, kind, entrance, color], k) => {
+            const at = eventsAt + k * REPLAY_EVENT_BYTES;
+            view.setUint32(at, tick, true);
+            view.setUint32(at + 4, agent, true);
+            view.setUint32(at + 8, seat, true);
+            view.setInt32(at + 12, x, true);
+            view.setInt32(at + 16, y, true);
+            view.setUint8(at + 20, kind);
+            view.setUint8(at + 21, entrance);
+            view.setUint8(at + 22, color);
+        });
+        new Uint32Array(buffer, countsAt, this.ticks).set(this.counts.subarray(0, this.ticks));
+        new Int8Array(buffer, deltasAt, this.samples * 2).set(this.deltas.subarray(0, this.samples * 2));
+        return buffer;
+    }
+}
+
+const recorder = new ReplayRecorder();
+
+// Decodes a trace once into absolute positions, then shows any tick by
+// setting seat flags from the events and filling `students` with that tick's
+// walkers, so the normal renderer draws it. Seeking forward only applies the
+// events in between.
+class ReplayPlayer {
+    constructor(buffer) {
+        const view = new DataView(buffer);
+        if (view.getUint32(0, true) !== REPLAY_MAGIC || view.getUint16(4, true) !== REPLAY_VERSION) {
+            throw new Error('Not a seating replay');
+        }
+        const quant = view.getUint16(6, true);
+        this.dt = view.getFloat32(20, true);
+        this.ticks = view.getUint32(32, true);
+        if (view.getUint32(28, true) !== seats.length) throw new Error('Replay is for a different layout');
+        const agents = view.getUint32(36, true);
+        const eventCount = view.getUint32(40, true);
+        const samples = view.getUint32(44, true);
+        const countsAt = REPLAY_HEADER_BYTES + eventCount * REPLAY_EVENT_BYTES;
+        const counts = new Uint32Array(buffer, countsAt, this.ticks);
+        const deltas = new Int8Array(buffer, countsAt + this.ticks * 4, samples * 2);
+
+        this.eventTick = new Uint32Array(eventCount);
+        this.eventSeat = new Uint32Array(eventCount);
+        this.eventKind = new Uint8Array(eventCount);
+        this.color = new Uint8Array(agents);
+        const qx = new Int32Array(agents);
+        const qy = new Int32Array(agents);
+        for (let k = 0; k < eventCount; k++) {
+            const at = REPLAY_HEADER_BYTES + k * REPLAY_EVENT_BYTES;
+            this.eventTick[k] = view.getUint32(at, true);
+            this.eventSeat[k] = view.getUint32(at + 8, true);
+            this.eventKind[k] = view.getUint8(at + 20);
+            if (this.eventKind[k] === REPLAY_SPAWN) {
+                const agent = view.getUint32(at + 4, true);
+                qx[agent] = view.getInt32(at + 12, true);
+                qy[agent] = view.getInt32(at + 16, true);
+                this.color[agent] = view.getUint8(at + 22);
+            }
+        }
+
+        // Replay the recorder's bookkeeping to turn deltas into positions
+        this.first = new Uint32Array(this.ticks + 1); // First sample of each tick
+        this.agent = new Int32Array(samples);
+        this.x = new Float32Array(samples);
+        this.y = new Float32Array(samples);
+        let live = [];
+        let e = 0;
+        let s = 0;
+        for (let t = 0; t < this.ticks; t++) {
+            const leaving = [];
+            for (; e < eventCount && this.eventTick[e] === t; e++) {
+                const agent = view.getUint32(REPLAY_HEADER_BYTES + e * REPLAY_EVENT_BYTES + 4, true);
+                if (this.eventKind[e] === REPLAY_SPAWN) live.push(agent);
+                else leaving.push(agent);
+            }
+            this.first[t] = s;
+            for (let k = 0; k < counts[t]; k++, s++) {
+                const agent = live[k];
+                qx[agent] += deltas[2 * s];
+                qy[agent] += deltas[2 * s + 1];
+                this.agent[s] = agent;
+                this.x[s] = qx[agent] / quant;
+                this.y[s] = qy[agent] / quant;
+            }
+            if (leaving.length > 0) live = live.filter(agent => !leaving.includes(agent));
+        }
+        this.first[this.ticks] = s;
+        this.tick = -1;
+        this.nextEvent = 0;
+        this.seated = 0;
+    }
+
+    // Re-apply the current tick after the grid and store were borrowed (see forecastFill)
+    restore() {
+        const t = this.tick;
+        this.tick = this.ticks;
+        if (t >= 0) this.seek(t);
+    }
+
+    seek(t) {
+        t = Math.max(0, Math.min(this.ticks - 1, t | 0));
+        if (t < this.tick) {
+            seats.forEach(seat => {
+                seat.assigned = false;
+                seat.node.occupied = false;
+            });
+            this.nextEvent = 0;
+            this.seated = 0;
+            renderSeatLayer();
+        }
+        for (; this.nextEvent < this.eventTick.length && this.eventTick[this.nextEvent] <= t; this.nextEvent++) {
+            const seat = seats[this.eventSeat[this.nextEvent]];
+            if (this.eventKind[this.nextEvent] === REPLAY_SPAWN) {
+                seat.assigned = true;
+            } else {
+                seat.node.occupied = true;
+                this.seated++;
+            }
+            markSeatDirty(seat);
+        }
+        this.tick = t;
+
+        const store = students;
+        store.reset(seats.length);
+        for (let s = this.first[t]; s < this.first[t + 1]; s++) {
+            const id = store.add();
+            store.x[id] = this.x[s];
+            store.y[id] = this.y[s];
+            store.colorIndex[id] = this.color[this.agent[s]];
+            store.state[id] = STUDENT_MOVING;
+            store.pathLength[id] = 0;
+            store.pathIndex[id] = 0;
+        }
+        draw();
+        host.progress(this.seated, seats.length);
+        host.time(Math.floor((t + 1) * this.dt));
+    }
+}
+
+let replay = null; // ReplayPlayer for the last finished run
+let replayClock = 0; // Seconds into the replay
+let replaySpeed = 0; // Replay seconds per real second; 0 while stopped
+let replayLast = 0;
+let replayFrame;
+
+function replayLoop(timestamp) {
+    const frameDt = Math.min(Math.max((timestamp - replayLast) / 1000, 0), CONFIG.maxFrameDelta);
+    replayLast = timestamp;
+    replayClock += frameDt * replaySpeed;
+    replay.seek(Math.floor(replayClock / replay.dt));
+    const ended = replay.tick >= replay.ticks - 1;
+    host.replayTick(replay.tick, !ended);
+    if (ended) replaySpeed = 0;
+    else replayFrame = scheduleFrame(replayLoop);
+}
+
+// Play the last run's replay at `speed` times real time; 0 stops it
+function playReplay(speed) {
+    if (!replay || isRunning) return;
+    cancelFrame(replayFrame);
+    replaySpeed = speed > 0 ? speed : 0;
+    if (replaySpeed === 0) return;
+    if (replay.tick >= replay.ticks - 1) replayClock = 0;
+    replayLast = performance.now();
+    replayFrame = scheduleFrame(replayLoop);
+}
+
+function seekReplayTick(tick) {
+    if (!replay || isRunning) return;
+    replay.seek(tick);
+    replayClock = replay.tick * replay.dt;
+}
+
+// --- Run Control ---
+// Entry points for whoever embeds the core: the page in in-page mode, or the
+// worker message handler. `host` receives progress, timer, end-of-run,
+// profiler, replay, congestion and forecast events.
+let host = null;
+
+function attachCanvas(target) {
+    canvas = target;
+    ctx = canvas.getContext('2d');
+    initGrid();
+    draw();
+}
+
+// Session from updateSession; applied only between runs
+function applyPendingSession() {
+    if (!pendingSession) return;
+    applySession(pendingSession);
+    SCHEDULE = pendingSession.schedule || null;
+    pendingSession = null;
+}
+
+function startRun(seed) {
+    applyPendingSession();
+    initGrid(); // Reset grid
+    firstSeatDeadline = firstSeatTimeout();
+    students.reset(seats.length);
+    seatedCount = 0;
+    spawnTimer = 0;
+    simTime = 0;
+    simTick = 0;
+    accumulator = 0;
+    lastReportedSecond = -1;
+    currentSeed = seed;
+    rng = createRng(seed);
+    playReplay(0);
+    replay = null;
+    recorder.reset(seed);
+    congestion.reset();
+    activeSeatPolicy().reset();
+    admission.reset();
+    pathCostSum = 0;
+    peakWalkers = 0;
+    isRunning = true;
+    isPaused = false;
+    failTriggered = false;
+    host.progress(seatedCount, seats.length);
+    lastTime = performance.now();
+    profiler.restart();
+    governor.reset();
+    gameLoop(performance.now());
+}
+
+function setPaused(paused) {
+    if (!isRunning || isPaused === paused) return;
+    isPaused = paused;
+    if (!isPaused) {
+        lastTime = performance.now();
+        profiler.lastTimestamp = -1;
+        animationId = scheduleFrame(gameLoop);
+    }
+}
+
+function stopRun() {
+    endGame(false, true);
+}
+
+function endGame(isSuccess, fromReset) {
+    const finishedIn = elapsedSeconds();
+    const stats = {
+        layout: LAYOUT.key,
+        policy: seatPolicyName(),
+        admission: CONFIG.admission.enabled,
+        cooperative: CONFIG.reservation.enabled,
+        seed: currentSeed,
+        seconds: finishedIn,
+        seats: seatedCount,
+        meanPathCost: students.count > 0 ? pathCostSum / students.count : 0,
+        peakWalkers
+    };
+    const outcome = isSuccess ? 'success' : (fromReset ? 'reset' : 'failure');
+    const trace = recorder.finish(outcome);
+    const heatmap = congestion.snapshot(outcome);
+    isRunning = false;
+    isPaused = false;
+    failTriggered = !isSuccess && !fromReset;
+    cancelFrame(animationId);
+    initGrid();
+    students.reset(seats.length);
+    seatedCount = 0;
+    draw();
+    host.progress(seatedCount, seats.length);
+    if (trace) {
+        replay = new ReplayPlayer(trace);
+        replayClock = 0;
+        host.replay(trace, replay.ticks);
+    }
+    if (heatmap) host.congestion(heatmap);
+    host.ended(outcome, finishedIn, stats);
+}
+
+// Timer runs on the simulation clock, so results don't depend on frame rate
+function elapsedSeconds() {
+    return Math.floor(simTime);
+}
+
+function setSimulationSpeed(value) {
+    simSpeed = value === 'max' ? Infinity : parseFloat(value);
+    accumulator = 0;
+}
+
+function showPathsNearCursorOnly(enabled) {
+    pathsNearCursorOnly = enabled;
+    if (!isRunning || isPaused) draw();
+}
+
+function setPathFocus(point) {
+    pathFocus = point;
+}
+
+// New config or schedule from the host without reloading the engine. The
+// layout and the canvas-level settings stay as loaded (the host reloads the
+// page for those); everything else takes effect from the next run.
+function updateSession(session) {
+    pendingSession = session;
+}
+
+function setProfilerEnabled(enabled) {
+    profiler.setEnabled(enabled);
+}
+
+function showCongestion(enabled) {
+    congestion.setVisible(enabled);
+    if (!isRunning || isPaused) draw();
+}
+
+// Predicted fill times for the given seeds (see forecastFill); skipped during a run
+function forecast(seeds) {
+    const result = forecastFill(seeds);
+    if (result) host.forecast(result);
+}
@@ -0,0 +1,365 @@
+// --- Page Controller ---
+// Owns the buttons, timer display and best time. The engine runs in a Web
+// Worker drawing into a transferred OffscreenCanvas when the browser supports
+// it, so a burst of pathfinding never blocks the controls; otherwise the same
+// core (seating_engine.js, loaded before this file) runs in this page.
+// The bootstrap in component/index.html provides self.SEATING_SESSION and
+// self.SEATING_ASSETS, and self.SEATING_COMPONENT when Python is listening:
+// later renders then deliver new settings and the server-side best time
+// without reloading, and results go back through setValue.
+let engine = null;
+let running = false;
+let paused = false;
+let highScore = null;
+let metricsSent = 0;
+let replayPlaying = false;
+let replayUrl = null;
+let replaysSent = 0;
+let congestionSent = 0;
+const FORECAST_SEEDS = 8; // Seeds the idle forecast averages when none is typed
+// Sent to Python with every update, so the component value carries all of
+// this page load's runs, the last run's replay and congestion map and the
+// latest fill-time forecast; loadId tells reloads apart
+const componentValue = {
+    loadId: Math.random().toString(36).slice(2), metrics: null, runs: [], replay: null, congestion: null, forecast: null
+};
+
+const pageHost = {
+    progress: updateUI,
+    time: (seconds) => { document.getElementById('timer').innerText = formatTime(seconds); },
+    ended: onRunEnded,
+    metrics: showMetrics,
+    replay: onReplay,
+    replayTick: onReplayTick,
+    congestion: onCongestion,
+    forecast: showForecast
+};
+
+function createWorkerEngine(canvas) {
+    const worker = new Worker(new URL(SEATING_ASSETS.worker, document.baseURI).href);
+    worker.postMessage({
+        type: 'configure',
+        session: self.SEATING_SESSION || {},
+        gridUrl: new URL(SEATING_ASSETS.grid, document.baseURI).href,
+        engineUrl: new URL(SEATING_ASSETS.engine, document.baseURI).href
+    });
+    const offscreen = canvas.transferControlToOffscreen();
+    worker.onmessage = (event) => {
+        const msg = event.data;
+        if (msg.type === 'progress') pageHost.progress(msg.seated, msg.total);
+        else if (msg.type === 'time') pageHost.time(msg.seconds);
+        else if (msg.type === 'ended') pageHost.ended(msg.outcome, msg.seconds, msg.stats);
+        else if (msg.type === 'metrics') pageHost.metrics(msg.snapshot);
+        else if (msg.type === 'replay') pageHost.replay(msg.buffer, msg.ticks);
+        else if (msg.type === 'replayTick') pageHost.replayTick(msg.tick, msg.playing);
+        else if (msg.type === 'congestion') pageHost.congestion(msg.map);
+        else if (msg.type === 'forecast') pageHost.forecast(msg.result);
+    };
+    worker.postMessage({ type: 'attach', canvas: offscreen }, [offscreen]);
+    return {
+        start: (seed) => worker.postMessage({ type: 'start', seed }),
+        setPaused: (value) => worker.postMessage({ type: 'pause', paused: value }),
+        reset: () => worker.postMessage({ type: 'reset' }),
+        setSpeed: (value) => worker.postMessage({ type: 'speed', value }),
+        setPathsNearCursor: (enabled) => worker.postMessage({ type: 'pathsNearCursor', enabled }),
+        setFocus: (point) => worker.postMessage({ type: 'focus', point }),
+        setProfiling: (enabled) => worker.postMessage({ type: 'profile', enabled }),
+        setCongestion: (enabled) => worker.postMessage({ type: 'congestion', enabled }),
+        playReplay: (speed) => worker.postMessage({ type: 'replayPlay', speed }),
+        seekReplay: (tick) => worker.postMessage({ type: 'replaySeek', tick }),
+        updateSession: (session) => worker.postMessage({ type: 'session', session }),
+        forecast: (seeds) => worker.postMessage({ type: 'forecast', seeds })
+    };
+}
+
+function createPageEngine(canvas) {
+    host = pageHost;
+    attachCanvas(canvas);
+    return {
+        start: startRun,
+        setPaused: setPaused,
+        reset: stopRun,
+        setSpeed: setSimulationSpeed,
+        setPathsNearCursor: showPathsNearCursorOnly,
+        setFocus: setPathFocus,
+        setProfiling: setProfilerEnabled,
+        setCongestion: showCongestion,
+        playReplay: playReplay,
+        seekReplay: seekReplayTick,
+        updateSession: updateSession,
+        forecast: forecast
+    };
+}
+
+function init() {
+    const canvas = document.getElementById('simCanvas');
+    canvas.width = CONFIG.cols * CONFIG.cellSize;
+    canvas.height = CONFIG.rows * CONFIG.cellSize + 100;
+    document.getElementById('seat-total').innerText = CONFIG.seatTotal;
+    const workerCapable = CONFIG.useWorker && typeof Worker !== 'undefined' &&
+        typeof OffscreenCanvas !== 'undefined' && typeof canvas.transferControlToOffscreen === 'function';
+    engine = null;
+    if (workerCapable) {
+        try {
+            engine = createWorkerEngine(canvas);
+        } catch (err) {
+            console.warn('Web Worker engine unavailable, running in-page', err);
+        }
+    }
+    if (!engine) engine = createPageEngine(canvas);
+
+    canvas.addEventListener('mousemove', e => {
+        const rect = canvas.getBoundingClientRect();
+        engine.setFocus({ x: e.clientX - rect.left, y: e.clientY - rect.top });
+    });
+    canvas.addEventListener('mouseleave', () => engine.setFocus(null));
+
+    const component = self.SEATING_COMPONENT;
+    const args = (component && component.args) || self.SEATING_ARGS || {};
+    showHighScore(args.highScore);
+    if (component) {
+        component.onRender = (next) => {
+            dropReceived(next.received);
+            engine.updateSession(next.session);
+            showHighScore(next.highScore);
+            window.requestForecast();
+        };
+    }
+    window.requestForecast();
+}
+
+function updateUI(seated, total) {
+    document.getElementById('seated-count').innerText = seated;
+    const progress = Math.floor((seated / total) * 100);
+    document.getElementById('progress').innerText = progress;
+}
+
+// --- Controls ---
+window.toggleGame = function() {
+    let btn = document.getElementById('action-btn');
+
+    if (!running && btn.innerText.includes("START")) {
+        // Start Game
+        running = true;
+        paused = false;
+        document.getElementById('status-msg').style.display = 'none';
+        btn.innerText = "RESET";
+        btn.className = ""; // Remove start class (make it red)
+        document.getElementById('pause-btn').disabled = false;
+        document.getElementById('pause-btn').innerText = 'PAUSE';
+        setReplayControls(false);
+        const seed = seedRun();
+        engine.forecast([seed]);
+        engine.start(seed);
+    } else if (running) {
+        // Reset Game
+        engine.reset();
+    } else {
+        onRunEnded('reset', 0);
+    }
+};
+
+window.togglePause = function() {
+    if (!running) return;
+    paused = !paused;
+    document.getElementById('pause-btn').innerText = paused ? 'RESUME' : 'PAUSE';
+    engine.setPaused(paused);
+};
+
+window.setSimSpeed = function(value) {
+    engine.setSpeed(value);
+};
+
+window.setPathsNearCursor = function(enabled) {
+    engine.setPathsNearCursor(enabled);
+};
+
+window.setProfiling = function(enabled) {
+    engine.setProfiling(enabled);
+    const overlay = document.getElementById('profiler-overlay');
+    overlay.innerText = 'Profiling: first snapshot after the next frames...';
+    overlay.style.display = enabled ? 'block' : 'none';
+};
+
+window.setCongestion = function(enabled) {
+    engine.setCongestion(enabled);
+};
+
+// Fill-time forecast for the typed seed, or averaged over a few seeds
+window.requestForecast = function() {
+    const typed = parseInt(document.getElementById('seed-input').value, 10);
+    engine.forecast(Number.isFinite(typed) ? [typed] : Array.from({ length: FORECAST_SEEDS }, (_, k) => k + 1));
+};
+
+window.toggleReplay = function() {
+    replayPlaying = !replayPlaying;
+    engine.playReplay(replayPlaying ? parseFloat(document.getElementById('replay-speed').value) : 0);
+    document.getElementById('replay-btn').innerText = replayPlaying ? 'STOP' : 'PLAY';
+};
+
+window.setReplaySpeed = function(value) {
+    if (replayPlaying) engine.playReplay(parseFloat(value));
+};
+
+window.scrubReplay = function(value) {
+    if (replayPlaying) window.toggleReplay();
+    engine.seekReplay(parseInt(value, 10));
+};
+
+// --- Replay ---
+// The engine hands over a finished run's trace; it can be scrubbed in the
+// canvas, downloaded as a .srpl file and is sent to Python (see replay.py)
+function onReplay(buffer, ticks) {
+    const slider = document.getElementById('replay-slider');
+    slider.max = ticks - 1;
+    slider.value = 0;
+    if (replayUrl) URL.revokeObjectURL(replayUrl);
+    replayUrl = URL.createObjectURL(new Blob([buffer], { type: 'application/octet-stream' }));
+    const link = document.getElementById('replay-download');
+    link.href = replayUrl;
+    link.download = `seating-${document.getElementById('seed-input').value || 'run'}.srpl`;
+    link.innerText = `Download trace (${(buffer.byteLength / 1024).toFixed(0)} KB)`;
+    const id = `${componentValue.loadId}:${++replaysSent}`;
+    componentValue.replay = { id, ticks, bytes: buffer.byteLength, data: toBase64(buffer) };
+    setReplayControls(true);
+}
+
+function onReplayTick(tick, playing) {
+    document.getElementById('replay-slider').value = tick;
+    if (!playing && replayPlaying) {
+        replayPlaying = false;
+        document.getElementById('replay-btn').innerText = 'PLAY';
+    }
+}
+
+function setReplayControls(enabled) {
+    replayPlaying = false;
+    document.getElementById('replay-btn').innerText = 'PLAY';
+    document.getElementById('replay-btn').disabled = !enabled;
+    document.getElementById('replay-slider').disabled = !enabled;
+    document.getElementById('replay-download').style.display = enabled ? 'inline' : 'none';
+}
+
+// --- Congestion ---
+// Per-cell totals of the run that just ended, sent to Python (see congestion.py)
+function onCongestion(map) {
+    const id = `${componentValue.loadId}:${++congestionSent}`;
+    componentValue.congestion = Object.assign({}, map, { id, dwell: toBase64(map.dwell), visits: toBase64(map.visits) });
+}
+
+function toBase64(buffer) {
+    const bytes = new Uint8Array(buffer);
+    let binary = '';
+    for (let i = 0; i < bytes.length; i += 0x8000) {
+        binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+    }
+    return btoa(binary);
+}
+
+// Profiler snapshot from the engine: shown in the overlay and, inside the
+// Streamlit component, sent to Python for charting
+function showMetrics(snapshot) {
+    const lines = [
+        `FPS ${snapshot.fps.toFixed(1)}  frame ${snapshot.frameMs.mean.toFixed(1)} ms (max ${snapshot.frameMs.max.toFixed(1)})`,
+        `work ${snapshot.workMs.mean.toFixed(2)} ms/frame (max ${snapshot.workMs.max.toFixed(2)})`,
+        'phase          mean    max  ms/frame'
+    ];
+    Object.entries(snapshot.phases).forEach(([name, t]) => {
+        lines.push(`${name.padEnd(12)}${t.mean.toFixed(3).padStart(7)}${t.max.toFixed(3).padStart(7)}`);
+    });
+    lines.push(`searches ${snapshot.searches}  expanded/search ${snapshot.expandedPerSearch}`);
+    lines.push(`active ${snapshot.active}  seated ${snapshot.seated}  detail level ${snapshot.detailLevel}`);
+    lines.push('frame ms: ' + Object.entries(snapshot.frameHistogram).map(([b, n]) => `${b}:${n}`).join(' '));
+    document.getElementById('profiler-overlay').innerText = lines.join('\n');
+
+    componentValue.metrics = Object.assign({ seq: ++metricsSent }, snapshot);
+    sendComponentValue();
+}
+
+// Event-driven estimate from the engine (forecastFill), shown before and during a run
+function showForecast(result) {
+    const done = result.seconds.filter(seconds => seconds !== null);
+    const label = document.getElementById('forecast');
+    if (done.length === 0) {
+        label.innerText = '--:--';
+    } else {
+        const mean = done.reduce((sum, seconds) => sum + seconds, 0) / done.length;
+        label.innerText = formatTime(Math.round(mean));
+        label.title = `Congestion-free estimate over ${done.length} seed(s), ` +
+            `${formatTime(Math.round(Math.min(...done)))}-${formatTime(Math.round(Math.max(...done)))}, ` +
+            `${result.msPerRun.toFixed(2)} ms per run`;
+    }
+    componentValue.forecast = result;
+    sendComponentValue();
+}
+
+// Python lists the payloads it has stored (seating_game's `received`); stop resending those
+function dropReceived(received) {
+    const replay = componentValue.replay;
+    if (received && replay && replay.data && received.replay === replay.id) {
+        componentValue.replay = { id: replay.id, ticks: replay.ticks, bytes: replay.bytes };
+    }
+    const map = componentValue.congestion;
+    if (received && map && map.dwell && received.congestion === map.id) {
+        componentValue.congestion = Object.assign({}, map, { dwell: undefined, visits: undefined });
+    }
+}
+
+function sendComponentValue() {
+    if (self.SEATING_COMPONENT) self.SEATING_COMPONENT.setValue(componentValue);
+}
+
+function onRunEnded(outcome, seconds, stats) {
+    running = false;
+    paused = false;
+    if (outcome === 'success') {
+        maybeSetHighScore(seconds);
+        setStatus(`Success: All seats filled in ${formatTime(seconds)}. ` +
+            `Mean path cost ${stats.meanPathCost.toFixed(1)}, peak ${stats.peakWalkers} walking (${stats.policy}).`, true);
+        componentValue.runs.push(Object.assign({ id: componentValue.runs.length }, stats));
+    } else if (outcome === 'failure') {
+        setStatus(`Failure: No seats filled after ${formatTime(seconds)}.`, true);
+    }
+    document.getElementById('timer').innerText = "00:00";
+    document.getElementById('action-btn').innerText = outcome === 'success' ? "RESET (Finished!)" : "START SIMULATION";
+    document.getElementById('action-btn').className = "start";
+    document.getElementById('pause-btn').disabled = true;
+    sendComponentValue();
+}
+
+// Seed for the next run: the typed seed, or a fresh one shown in the box
+function seedRun() {
+    const input = document.getElementById('seed-input');
+    const typed = parseInt(input.value, 10);
+    const seed = Number.isFinite(typed) ? typed : Math.floor(Math.random() * 1e9);
+    input.value = seed;
+    return seed;
+}
+
+function formatTime(totalSeconds) {
+    const mins = Math.floor(totalSeconds / 60).toString().padStart(2, '0');
+    const secs = (totalSeconds % 60).toString().padStart(2, '0');
+    return `${mins}:${secs}`;
+}
+
+function setStatus(message, show) {
+    const status = document.getElementById('status-msg');
+    status.innerText = message;
+    status.style.display = show ? 'block' : 'none';
+}
+
+// Best time kept by Python across reruns and sessions; a faster run shows
+// right away and Python confirms it on the next render
+function showHighScore(seconds) {
+    if (seconds === null || seconds === undefined) return;
+    highScore = seconds;
+    document.getElementById('high-score').innerText = formatTime(seconds);
+}
+
+function maybeSetHighScore(seconds) {
+    if (highScore === null || seconds < highScore) showHighScore(seconds);
+}
+
+// Initialize on load; the component bootstrap may add this script after load
+if (document.readyState === 'complete') init();
+else window.onload = init;
@@ -0,0 +1,41 @@
+// --- Worker entry point ---
+// The page keeps the DOM and controls. Its first message carries the session
+// settings and the layout and engine URLs; after loading both, commands arrive as
+// messages and the canvas is the OffscreenCanvas transferred from the page.
+self.onmessage = (event) => {
+    const msg = event.data;
+    if (msg.type !== 'configure') return;
+    self.SEATING_SESSION = msg.session;
+    importScripts(msg.gridUrl, msg.engineUrl);
+    host = {
+        progress: (seated, total) => postMessage({ type: 'progress', seated, total }),
+        time: (seconds) => postMessage({ type: 'time', seconds }),
+        ended: (outcome, seconds, stats) => postMessage({ type: 'ended', outcome, seconds, stats }),
+        metrics: (snapshot) => postMessage({ type: 'metrics', snapshot }),
+        // The worker keeps its trace for scrubbing; the page gets a copy
+        replay: (buffer, ticks) => postMessage({ type: 'replay', buffer, ticks }),
+        replayTick: (tick, playing) => postMessage({ type: 'replayTick', tick, playing }),
+        congestion: (map) => postMessage({ type: 'congestion', map }, [map.dwell, map.visits]),
+        forecast: (result) => postMessage({ type: 'forecast', result })
+    };
+    self.onmessage = handleCommand;
+};
+
+function handleCommand(event) {
+    const msg = event.data;
+    switch (msg.type) {
+        case 'attach': attachCanvas(msg.canvas); break;
+        case 'start': startRun(msg.seed); break;
+        case 'pause': setPaused(msg.paused); break;
+        case 'reset': stopRun(); break;
+        case 'speed': setSimulationSpeed(msg.value); break;
+        case 'pathsNearCursor': showPathsNearCursorOnly(msg.enabled); break;
+        case 'focus': setPathFocus(msg.point); break;
+        case 'profile': setProfilerEnabled(msg.enabled); break;
+        case 'congestion': showCongestion(msg.enabled); break;
+        case 'session': updateSession(msg.session); break;
+        case 'replayPlay': playReplay(msg.speed); break;
+        case 'replaySeek': seekReplayTick(msg.tick); break;
+        case 'forecast': forecast(msg.seeds); break;
+    }
+}
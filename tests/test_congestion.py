@@ -0,0 +1,41 @@
+import base64
+
+import numpy as np
+import pytest
+
+from congestion import load_congestion
+
+
+def encode(counts):
+    return base64.b64encode(np.asarray(counts, dtype="<u4").tobytes()).decode("ascii")
+
+
+def value(dwell, visits, rows=2, cols=3):
+    """The ``congestion`` entry of a component value, as CongestionMap.snapshot sends it."""
+    return {"layout": "abc123", "outcome": "success", "dt": 0.5, "ticks": 10,
+            "rows": rows, "cols": cols, "dwell": encode(dwell), "visits": encode(visits)}
+
+
+def test_round_trip():
+    heat = load_congestion(value([0, 4, 0, 6, 0, 2], [0, 2, 0, 3, 0, 0]))
+    assert heat.dwell.tolist() == [[0, 4, 0], [6, 0, 2]]
+    assert heat.duration == 5.0
+    assert heat.seconds()[1, 0] == 3.0
+    assert heat.wait_per_visit().tolist() == [[0, 1, 0], [1, 0, 0]]
+    assert heat.busiest(2) == [(0, 1), (1, 0)]
+
+    summary = heat.summary()
+    assert summary["student-seconds walking"] == 6.0
+    assert summary["busiest cell"] == "(0, 1)"
+
+
+def test_image_is_white_where_nobody_walked():
+    image = load_congestion(value([0, 4, 0, 6, 0, 2], [0, 2, 0, 3, 0, 0])).image(cell_px=2)
+    assert image.shape == (4, 6, 3) and image.dtype == np.uint8
+    assert image[0, 0].tolist() == [255, 255, 255]
+    assert image[2, 0].tolist() != [255, 255, 255]
+
+
+def test_rejects_maps_of_another_grid():
+    with pytest.raises(ValueError, match="does not match a 3x2 grid"):
+        load_congestion(value([1] * 6, [1] * 5))
@@ -0,0 +1,71 @@
+import shutil
+
+import pytest
+
+from benchmark import bench_engine, hall_config, page_layout, run_engine
+from simulation import SimConfig
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run static/seating_engine.js")
+
+
+@pytest.mark.parametrize("config", [{}, {"reservation": {"enabled": True}}], ids=["avoidance", "cooperative"])
+def test_planner_hall_fills(config):
+    # 80x60 is past hierarchyMinCells, so paths come from the cluster planner,
+    # and the first walkers need longer than the old fixed 10 s to sit down
+    runs = bench_engine(page_layout(hall_config(80, 60)), "planner_hall", config, pairs=0, seeds=(3,), repeats=0)
+    step = runs["engine/planner_hall/sim_step"]
+    assert step["outcomes"] == ["success"]
+    assert step["fill_times"][0] > 10
+
+
+def test_forecast_hands_out_the_run_seats():
+    # Over ten seeds the spacing policy's 1-in-250 friend rule fires, and each
+    # forecast follows a run of another seed that left its seats behind
+    _, runs = run_engine(page_layout(SimConfig()), {"seatPolicy": "spacing"}, seatOrderSeeds=list(range(10)))
+    for seed, orders in enumerate(runs["seatOrders"]):
+        assert len(orders["run"]) == 250
+        assert orders["forecast"] == orders["run"], seed
+
+
+def test_repaired_routes_cost_what_a_fresh_search_finds():
+    # Walls dropped on walkers' routes every 2 s, on top of the seats filling,
+    # so most walkers get repaired in place more than once
+    _, runs = run_engine(page_layout(SimConfig()), repairSeeds=[1, 2], blockEvery=120)
+    repairs = runs["repairs"]
+    assert repairs["outcomes"] == ["success", "success"]
+    assert sum(kept for *_, kept in repairs["costs"]) > 50
+    for route, fresh, _ in repairs["costs"]:
+        assert route == pytest.approx(fresh)
+
+
+@pytest.fixture(scope="module")
+def planner_costs():
+    _, runs = run_engine(page_layout(hall_config(160, 100)), plannerPairs=300)
+    return runs["planner"]
+
+
+@pytest.mark.parametrize("hall", ["empty", "halfFull"])
+def test_planner_paths_stay_near_optimal(planner_costs, hall):
+    costs = planner_costs[hall]
+    for _, path, exact in costs:
+        assert exact <= path + 1e-6
+        assert path <= 1.2 * exact
+    assert sum(path / exact for _, path, exact in costs) / len(costs) < 1.01
+
+
+def test_planner_invalidates_paths_through_taken_seats(planner_costs):
+    # Filling every other seat re-prices most routes; a cluster left clean by
+    # cellChanged would report its old portal costs for the new path
+    changed = [a[2] != b[2] for a, b in zip(planner_costs["empty"], planner_costs["halfFull"])]
+    assert sum(changed) > len(changed) / 2
+    for reported, path, _ in planner_costs["empty"] + planner_costs["halfFull"]:
+        assert reported == pytest.approx(path)
+
+
+def test_cooperative_walkers_never_share_a_cell():
+    # Reserved cells hold from the move into them until the move out, so
+    # outside doors and seats no tick sees two walkers on one
+    config = {"reservation": {"enabled": True}}
+    _, runs = run_engine(page_layout(SimConfig()), config, conflictSeeds=[1, 2, 3])
+    assert runs["conflicts"]["outcomes"] == ["success"] * 3
+    assert runs["conflicts"]["conflicts"] == []
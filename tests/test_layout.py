@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import json
+
+import numpy as np
+import pytest
+
+from layout import compile_layout
+from simulation import SEAT, build_moves
+
+# A small hall with a cross aisle; every key of utils.DEFAULT_LAYOUT
+LAYOUT = {
+    "cols": 14,
+    "rows": 12,
+    "seatTotal": 40,
+    "frontRows": 2,
+    "backRows": 2,
+    "seatBlocks": [[1, 5], [8, 12]],
+    "aisleRows": [5],
+    "curve": 0,
+    "entrances": [{"x": 0, "y": 11}, {"x": 7, "y": 11}],
+}
+
+
+def decode(text, dtype="<i4"):
+    return np.frombuffer(base64.b64decode(text), dtype=dtype)
+
+
+def csr_lists(offsets, targets):
+    return [targets[offsets[c]:offsets[c + 1]].tolist() for c in range(len(offsets) - 1)]
+
+
+def test_seats_in_row_major_order():
+    compiled = compile_layout(LAYOUT)
+    assert len(compiled.seats) == 40
+    assert np.all(np.diff(compiled.seats) > 0)
+    assert np.all(compiled.cell_type.ravel()[compiled.seats] == SEAT)
+
+
+def test_move_tables_match_the_simulation():
+    compiled = compile_layout(LAYOUT)
+    exits, entries = build_moves(compiled.cell_type)
+    assert csr_lists(compiled.exit_offsets, compiled.exits) == exits
+    # build_moves fills entries while scanning sources, so only their order differs
+    assert [sorted(cells) for cells in csr_lists(compiled.entry_offsets, compiled.entries)] == \
+        [sorted(cells) for cells in entries]
+
+
+def test_json_round_trip():
+    compiled = compile_layout(LAYOUT)
+    grid = compiled.to_json()
+    assert grid["key"] == compiled.key
+
+    packed = decode(grid["cells"], np.uint8)
+    cells = ((packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3).ravel()
+    assert np.array_equal(cells[:compiled.cell_type.size], compiled.cell_type.ravel())
+    for key, values in [("seats", compiled.seats), ("exitOffsets", compiled.exit_offsets),
+                        ("exits", compiled.exits), ("entryOffsets", compiled.entry_offsets),
+                        ("entries", compiled.entries)]:
+        assert np.array_equal(decode(grid[key]), values), key
+
+
+def test_script_named_by_content():
+    compiled = compile_layout(LAYOUT)
+    name, text = compiled.to_script()
+    assert name == hashlib.sha256(text.encode()).hexdigest()[:12] + ".js"
+    prefix = "self.SEATING_GRID = "
+    assert text.startswith(prefix) and text.endswith(";\n")
+    assert json.loads(text[len(prefix):-2]) == compiled.to_json()
+    assert compile_layout({**LAYOUT, "curve": 1}).to_script()[0] != name
+
+
+def test_entrances_must_be_on_an_aisle():
+    with pytest.raises(ValueError, match="outside the grid"):
+        compile_layout({**LAYOUT, "entrances": [{"x": 14, "y": 11}]})
+    with pytest.raises(ValueError, match="not on an aisle"):
+        compile_layout({**LAYOUT, "entrances": [{"x": 1, "y": 2}]})
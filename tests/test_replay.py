@@ -0,0 +1,82 @@
+import base64
+
+import numpy as np
+import pytest
+
+from replay import EVENT, HEADER, MAGIC, SEATED, SPAWN, VERSION, load_replay
+
+QUANT = 4
+
+
+def encode(events, counts, deltas, ticks, agents, version=VERSION, cols=360, rows=20):
+    """Trace bytes laid out as ReplayRecorder.finish writes them."""
+    header = np.zeros(1, dtype=HEADER)
+    header[0] = (MAGIC, version, QUANT, cols, rows, 25, 30, 1 / 60, 42,
+                 agents, ticks, agents, len(events), len(deltas), 0, (0, 0, 0))
+    table = np.array(events, dtype=EVENT)
+    return (header.tobytes() + table.tobytes() + np.asarray(counts, dtype='<u4').tobytes()
+            + np.asarray(deltas, dtype=np.int8).tobytes())
+
+
+@pytest.fixture
+def trace_bytes():
+    # Walker 0 spawns past x = 8191.75 px, which int16 quarter-pixels could not hold,
+    # and sits at tick 2; walker 1 spawns at tick 1 and is still walking at the end
+    events = [
+        (0, 0, 7, 35550, 200, SPAWN, 0, 3, 0),
+        (1, 1, 9, 100, 400, SPAWN, 2, 5, 0),
+        (2, 0, 7, 0, 0, SEATED, 0, 3, 0),
+    ]
+    deltas = [(0, 0), (4, -2), (0, 0), (4, -2), (-8, 8)]  # Tick-major, walkers by id
+    return encode(events, [1, 2, 2], deltas, ticks=3, agents=2)
+
+
+def test_round_trip(trace_bytes):
+    trace = load_replay(trace_bytes)
+    assert trace.outcome == 'success'
+    assert trace.duration == pytest.approx(3 / 60)
+    assert trace.counts.tolist() == [1, 2, 2]
+    assert trace.events['x'][0] == 35550
+
+    first, last = trace.spans()
+    assert first.tolist() == [0, 1]
+    assert last.tolist() == [2, 2]
+
+    tick, agent, x, y = trace.positions()
+    assert tick.tolist() == [0, 1, 1, 2, 2]
+    assert agent.tolist() == [0, 0, 1, 0, 1]
+    assert x.tolist() == [8887.5, 8888.5, 25.0, 8889.5, 23.0]
+    assert y.tolist() == [50.0, 49.5, 100.0, 49.0, 102.0]
+
+
+def test_cell_counts(trace_bytes):
+    counts = load_replay(trace_bytes).cell_counts()
+    assert counts.shape == (20, 360)
+    assert counts.sum() == 5
+    assert counts[0, 355] == 3
+    assert counts[2, 1] == 1 and counts[2, 0] == 1
+
+
+def test_file_and_base64_sources(trace_bytes, tmp_path):
+    path = tmp_path / 'seating-42.srpl'
+    path.write_bytes(trace_bytes)
+    from_file = load_replay(path)
+    from_value = load_replay(base64.b64decode(base64.b64encode(trace_bytes)))
+    assert np.array_equal(from_file.deltas, from_value.deltas)
+    assert np.array_equal(from_file.positions()[2], from_value.positions()[2])
+
+
+def test_rejects_other_files(trace_bytes):
+    with pytest.raises(ValueError, match='Not a seating replay trace'):
+        load_replay(b'PK\x03\x04' + trace_bytes[4:])
+
+
+def test_rejects_old_version():
+    old = encode([], [0], [], ticks=1, agents=0, version=1)
+    with pytest.raises(ValueError, match='version 1 is not supported'):
+        load_replay(old)
+
+
+def test_rejects_truncated_trace(trace_bytes):
+    with pytest.raises(ValueError, match='Truncated'):
+        load_replay(trace_bytes[:-1])
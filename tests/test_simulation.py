@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import simulation
+from simulation import (SEAT, CostField, SeatPool, SimConfig, Simulation, build_grid, build_moves, cell_cost,
+                        simulate, simulate_many)
+
+# Two 4-seat blocks, one cross aisle, two doors
+SMALL = SimConfig(cols=12, rows=10, seat_total=40, seat_blocks=((1, 4), (7, 10)), aisle_rows=(5,),
+                  entrances=((0, 9), (11, 9)))
+
+
+def fresh_field(config, occupied_cells, origin=0):
+    cell_type, _ = build_grid(config)
+    occupied = np.zeros(cell_type.size, dtype=bool)
+    occupied[list(occupied_cells)] = True
+    exits, entries = build_moves(cell_type)
+    x, y = config.entrances[origin]
+    return CostField(y * config.cols + x, cell_cost(cell_type.ravel(), occupied).tolist(), exits, entries)
+
+
+def test_field_repair_matches_rebuild():
+    cell_type, seats = build_grid(SMALL)
+    cells = (seats[:, 1] * SMALL.cols + seats[:, 0]).tolist()
+    field_ = fresh_field(SMALL, [])
+    taken = []
+    for cell in np.random.default_rng(0).permutation(cells)[:25].tolist():
+        field_.cost[cell] = 4.0
+        field_.cell_changed(cell)
+        taken.append(cell)
+        assert field_.dist == fresh_field(SMALL, taken).dist
+    # Every backtrace walks legal moves and adds up to the distance it reports
+    exits, _ = build_moves(cell_type)
+    for cell in cells:
+        path = field_.path_to(cell)
+        assert path[-1] == cell
+        steps = [field_.origin] + path
+        assert all(b in exits[a] for a, b in zip(steps, steps[1:]))
+        assert sum(field_.cost[c] for c in path) == pytest.approx(field_.dist[cell])
+
+
+def test_field_repairs_expand_less_than_rebuilds():
+    field_ = fresh_field(SimConfig(), [])
+    built = field_.expanded
+    _, seats = build_grid(SimConfig())
+    for x, y in seats[:50]:
+        cell = int(y) * SimConfig().cols + int(x)
+        field_.cost[cell] = 4.0
+        field_.cell_changed(cell)
+    assert field_.expanded - built < 50 * built / 10
+
+
+def test_seat_pool():
+    pool = SeatPool(5)
+    pool.remove(1)
+    pool.remove(4)
+    pool.remove(1)  # Already gone
+    assert len(pool) == 3
+    assert sorted(pool.items) == [0, 2, 3]
+    assert {pool.draw(r) for r in (0.0, 0.34, 0.67, 0.999)} == {0, 2, 3}
+
+
+def test_seeded_run_fills_and_repeats():
+    first = simulate(seed=7)
+    assert first.seated == first.seats == 250
+    assert first.ticks == round(first.fill_time * 60)
+    assert sum(first.entrance_counts) == 250
+    assert simulate(seed=7) == first
+    assert simulate(seed=8).fill_time != first.fill_time
+
+
+def test_run_occupies_every_seat():
+    sim = Simulation(SMALL, seed=1)
+    sim.run()
+    assert sim.occupied.ravel()[sim.seat_cell].all()
+    assert (sim.cell_type.ravel()[sim.seat_cell] == SEAT).all()
+    assert sorted(sim.seat[:sim.agents].tolist()) == list(range(len(sim.seats)))
+
+
+def test_batch_matches_separate_runs():
+    seeds = [0, 3, 11]
+    assert simulate_many(SMALL, seeds) == [simulate(SMALL, seed) for seed in seeds]
+
+
+def test_batch_matches_separate_runs_when_bucketed(monkeypatch):
+    # Each hall keeps its own buckets, so crowded halls never push each other
+    monkeypatch.setattr(simulation, "DENSE_PAIR_LIMIT", 0)
+    seeds = [2, 5]
+    assert simulate_many(SMALL, seeds) == [simulate(SMALL, seed) for seed in seeds]